@@ -0,0 +1,219 @@
+"""Fleet profit-and-loss and reward analytics over the prediction contract's bet history
+
+Bet history comes from getUserRounds (one call per wallet per USER_ROUNDS_PAGE bets) and round
+outcomes from rounds(epoch). Settled rounds never change, so they are kept in ROUNDS_CACHE_FILE
+and only new epochs are fetched. Everything after loading is one NumPy pass over every
+(wallet, epoch) bet, however many thousands of epochs that covers.
+
+Amounts are float64 BNB - fine for reporting, nothing computed here is ever sent.
+Needs NumPy (pip install numpy); the bot itself runs without it.
+"""
+import os
+import time
+
+import numpy as np
+
+import manager_Version4 as manager
+
+ROUNDS_CACHE_FILE = "rounds_cache.npz"
+USER_ROUNDS_PAGE = 1000
+ROUND_FIELDS = ("epoch", "close_ts", "outcome", "total", "reward_base", "reward", "oracle_called")
+ROUND_DTYPES = (np.int64, np.int64, np.int8, np.float64, np.float64, np.float64, np.bool_)
+BET_FIELDS = ("wallet", "epoch", "position", "amount", "claimed")
+BET_DTYPES = (np.int32, np.int64, np.int8, np.float64, np.bool_)
+POSITIONS = ("bull", "bear")  # ledger position 0 / 1
+
+
+def _columns(rows, fields, dtypes):
+    """List of row tuples -> {field: array}"""
+    columns = list(zip(*rows)) if rows else [()] * len(fields)
+    return {field: np.array(column, dtype=dtype) for field, column, dtype in zip(fields, columns, dtypes)}
+
+
+def _round_row(epoch, data):
+    """rounds(epoch) tuple -> row of ROUND_FIELDS (PancakePredictionV2 Round struct order)"""
+    lock_price, close_price = data[4], data[5]
+    outcome = (close_price > lock_price) - (close_price < lock_price)  # 1 bull won, -1 bear won, 0 tie
+    return epoch, data[3], outcome, data[8] / 1e18, data[11] / 1e18, data[12] / 1e18, data[13]
+
+
+def load_rounds_cache(path=ROUNDS_CACHE_FILE):
+    """Settled rounds saved by an earlier run against the same contract, or None"""
+    try:
+        with np.load(path) as data:
+            if str(data["contract"]) != manager.PREDICTION_CONTRACT.lower():
+                return None
+            return {field: data[field] for field in ROUND_FIELDS}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def save_rounds_cache(rounds, path=ROUNDS_CACHE_FILE):
+    settled = rounds["oracle_called"]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, contract=np.array(manager.PREDICTION_CONTRACT.lower()),
+                 **{field: rounds[field][settled] for field in ROUND_FIELDS})
+    os.replace(tmp_path, path)
+
+
+def fetch_bets(wallets):
+    """Every bet of every wallet as {field: array}; wallet is the index into `wallets`"""
+    prediction = manager.prediction_contract
+
+    def wallet_bets(wallet):
+        epochs, bets, cursor = [], [], 0
+        while True:
+            page_epochs, page_bets, cursor = prediction.functions.getUserRounds(
+                wallet.address, cursor, USER_ROUNDS_PAGE
+            ).call()
+            epochs.extend(page_epochs)
+            bets.extend(page_bets)
+            if len(page_epochs) < USER_ROUNDS_PAGE:
+                return epochs, bets
+
+    rows = []
+    for index, (epochs, bets) in enumerate(manager.fan_out(wallet_bets, wallets)):
+        rows.extend((index, epoch, position, amount / 1e18, claimed)
+                    for epoch, (position, amount, claimed) in zip(epochs, bets))
+    return _columns(rows, BET_FIELDS, BET_DTYPES)
+
+
+def fetch_rounds(epochs, cache_path=ROUNDS_CACHE_FILE):
+    """Outcome arrays for the given epochs, sorted by epoch - only epochs not cached as settled hit the RPC"""
+    prediction = manager.prediction_contract
+    cached = load_rounds_cache(cache_path)
+    missing = np.setdiff1d(epochs, cached["epoch"]) if cached else np.unique(epochs)
+    rows = manager.fan_out(lambda epoch: _round_row(epoch, prediction.functions.rounds(epoch).call()),
+                           [int(epoch) for epoch in missing])
+    fetched = _columns(rows, ROUND_FIELDS, ROUND_DTYPES)
+    if cached:
+        fetched = {field: np.concatenate([cached[field], fetched[field]]) for field in ROUND_FIELDS}
+    order = np.argsort(fetched["epoch"])
+    rounds = {field: column[order] for field, column in fetched.items()}
+    if rows:
+        save_rounds_cache(rounds, cache_path)
+    return rounds
+
+
+def compute_pnl(bets, rounds, wallet_count, now, buffer_seconds):
+    """P&L, win rate, pending claims and treasury fees per wallet, per direction and in total
+
+    A winning bet pays amount * rewardAmount / rewardBaseCalAmount, i.e. after the treasury fee;
+    a tie loses; a round that was never settled past closeTimestamp + bufferSeconds is refunded.
+    Bets in rounds that are still running count as unsettled and are left out of P&L.
+    """
+    index = np.searchsorted(rounds["epoch"], bets["epoch"])
+    settled = rounds["oracle_called"][index]
+    outcome = rounds["outcome"][index]
+    base = rounds["reward_base"][index]
+    has_base = base > 0
+    net_multiplier = np.divide(rounds["reward"][index], base, out=np.zeros_like(base), where=has_base)
+    gross_multiplier = np.divide(rounds["total"][index], base, out=np.zeros_like(base), where=has_base)
+
+    amount = bets["amount"]
+    bull = bets["position"] == 0
+    won = settled & (((outcome == 1) & bull) | ((outcome == -1) & ~bull))
+    refunded = ~settled & (now > rounds["close_ts"][index] + buffer_seconds)
+    unsettled = ~settled & ~refunded
+
+    payout = np.where(won, amount * net_multiplier, 0.0)
+    payout = np.where(refunded, amount, payout)
+    columns = {
+        "bets": np.ones_like(amount),
+        "staked": amount,
+        "pnl": np.where(unsettled, 0.0, payout - amount),
+        "wins": won.astype(np.float64),
+        "decided": settled.astype(np.float64),
+        "pending_claims": np.where((won | refunded) & ~bets["claimed"], payout, 0.0),
+        "pending_claim_bets": ((won | refunded) & ~bets["claimed"]).astype(np.float64),
+        "fees": np.where(won, amount * (gross_multiplier - net_multiplier), 0.0),
+        "unsettled": np.where(unsettled, amount, 0.0),
+    }
+
+    def group(keys, size):
+        stats = {name: np.bincount(keys, weights=values, minlength=size) for name, values in columns.items()}
+        stats["win_rate"] = np.divide(stats["wins"], stats["decided"], out=np.zeros(size), where=stats["decided"] > 0)
+        return stats
+
+    totals = {name: float(values.sum()) for name, values in columns.items()}
+    totals["win_rate"] = totals["wins"] / totals["decided"] if totals["decided"] else 0.0
+    return {
+        "totals": totals,
+        "by_direction": group(bets["position"].astype(np.intp), len(POSITIONS)),
+        "by_wallet": group(bets["wallet"].astype(np.intp), wallet_count),
+        "epochs": (int(bets["epoch"].min()), int(bets["epoch"].max())) if len(amount) else None,
+    }
+
+
+def fleet_pnl(wallet_manager, cache_path=ROUNDS_CACHE_FILE):
+    """Load the fleet's history from the chain and run compute_pnl over it"""
+    start = time.perf_counter()
+    wallets = wallet_manager.wallets
+    bets = fetch_bets(wallets)
+    rounds = fetch_rounds(bets["epoch"], cache_path)
+    loaded = time.perf_counter()
+    buffer_seconds = manager.prediction_contract.functions.bufferSeconds().call()
+    report = compute_pnl(bets, rounds, len(wallets), manager.chain_clock.now(), buffer_seconds)
+    report["wallet_names"] = [wallet.name for wallet in wallets]
+    report["load_seconds"] = loaded - start
+    report["compute_seconds"] = time.perf_counter() - loaded
+    return report
+
+
+def _line(label, stats, i=None):
+    pick = (lambda name: stats[name]) if i is None else (lambda name: stats[name][i])
+    return (f"{label}: {int(pick('bets'))} bets, staked {pick('staked'):.4f}, P&L {pick('pnl'):+.4f} BNB, "
+            f"win rate {pick('win_rate') * 100:.1f}%")
+
+
+def format_report(report, top=5):
+    """Text summary for the console and Telegram"""
+    totals = report["totals"]
+    if not totals["bets"]:
+        return "📊 No bets found for the fleet"
+    first_epoch, last_epoch = report["epochs"]
+    roi = totals["pnl"] / totals["staked"] * 100 if totals["staked"] else 0.0
+    lines = [
+        f"📊 FLEET P&L (epochs {first_epoch}-{last_epoch}, before gas)",
+        f"💰 Staked {totals['staked']:.4f} BNB | P&L {totals['pnl']:+.4f} BNB ({roi:+.2f}%)",
+        f"🎯 Win rate {totals['win_rate'] * 100:.1f}% ({int(totals['wins'])}/{int(totals['decided'])} settled bets)",
+        f"🎁 Pending claims: {totals['pending_claims']:.4f} BNB in {int(totals['pending_claim_bets'])} bets",
+        f"🏦 Treasury fees on wins: {totals['fees']:.4f} BNB",
+    ]
+    if totals["unsettled"]:
+        lines.append(f"⏳ Unsettled: {totals['unsettled']:.4f} BNB")
+    by_direction = report["by_direction"]
+    lines.append("")
+    lines.append(_line("⬆️ BULL", by_direction, 0))
+    lines.append(_line("⬇️ BEAR", by_direction, 1))
+
+    by_wallet = report["by_wallet"]
+    active = np.flatnonzero(by_wallet["bets"])
+    order = active[np.argsort(by_wallet["pnl"][active])[::-1]]
+    names = report["wallet_names"]
+    lines.append(f"\n👛 {len(active)} wallets with bets - best:")
+    lines.extend(_line(f"  {names[i]}", by_wallet, i) for i in order[:top])
+    if len(order) > top:
+        lines.append("👛 worst:")
+        lines.extend(_line(f"  {names[i]}", by_wallet, i) for i in order[-top:][::-1])
+    lines.append(f"\n⏱️ loaded in {report['load_seconds']:.2f}s, computed in {report['compute_seconds'] * 1000:.1f} ms")
+    return "\n".join(lines)
+
+
+def report_as_dict(report):
+    """JSON-friendly version (daemon / benchmarks): totals, per direction and every wallet with bets"""
+    by_wallet = report["by_wallet"]
+    stats = [name for name in by_wallet if name != "win_rate"] + ["win_rate"]
+    return {
+        "totals": report["totals"],
+        "epochs": report["epochs"],
+        "by_direction": {
+            position: {name: float(report["by_direction"][name][i]) for name in stats}
+            for i, position in enumerate(POSITIONS)
+        },
+        "by_wallet": {
+            report["wallet_names"][i]: {name: float(by_wallet[name][i]) for name in stats}
+            for i in np.flatnonzero(by_wallet["bets"])
+        },
+    }
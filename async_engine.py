@@ -0,0 +1,623 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from web3 import AsyncWeb3, Web3
+from web3.providers import AsyncHTTPProvider
+from web3.middleware import ExtraDataToPOAMiddleware
+
+import manager_Version4 as manager
+from manager_Version4 import balance_cache, get_signer, get_main_signer, in_flight, log_event
+
+# How many RPCs/transactions may be in flight at once on the event loop
+MAX_IN_FLIGHT = 200
+SEND_LOCK_POLL = 0.01  # seconds between tries at a wallet's thread-side send lock
+
+
+class AsyncChain:
+    """AsyncWeb3 connection, contracts, nonce tracking and in-flight limit shared by the async managers"""
+
+    def __init__(self, rpc_url=None, max_in_flight=MAX_IN_FLIGHT, provider=None):
+        self.web3 = AsyncWeb3(provider or AsyncHTTPProvider(rpc_url or manager.RPC_URL,
+                                                            exception_retry_configuration=None))
+        self.web3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+        self.web3.middleware_onion.remove("validation")  # see manager_Version4.get_chain()
+        self.web3.middleware_onion.add(manager.RpcAccountingMiddleware, "rpc_accounting")
+        self.web3.middleware_onion.add(manager.RpcLimiterMiddleware, "rpc_limiter")
+        self.prediction_contract = self.web3.eth.contract(
+            address=Web3.to_checksum_address(manager.PREDICTION_CONTRACT), abi=manager.PREDICTION_ABI
+        )
+        self.usdt_contract = self.web3.eth.contract(
+            address=Web3.to_checksum_address(manager.USDT_CONTRACT), abi=manager.ERC20_ABI
+        )
+        self.router_contract = self.web3.eth.contract(
+            address=Web3.to_checksum_address(manager.PANCAKE_ROUTER), abi=manager.ROUTER_ABI
+        )
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self._nonces = {}  # address -> next nonce to use
+        self._nonce_locks = {}
+        self._queued = Counter()  # address -> sends waiting on or holding its nonce lock
+        self._thread_locks = {}  # address -> thread-side lock held for the current burst of sends
+
+    async def close(self):
+        await self.web3.provider.disconnect()
+
+    async def call(self, awaitable):
+        """Await an RPC while holding an in-flight slot"""
+        async with self.semaphore:
+            return await awaitable
+
+    async def get_balances(self, address):
+        """(bnb_wei, usdt_wei) through the shared balance cache"""
+        address = Web3.to_checksum_address(address)
+        cached = balance_cache.get(address)
+        if cached is not None:
+            return cached
+        generation = balance_cache.generation(address)
+        bnb_wei, usdt_wei = await asyncio.gather(
+            self.call(self.web3.eth.get_balance(address)),
+            self.call(self.usdt_contract.functions.balanceOf(address).call())
+        )
+        balance_cache.store(address, bnb_wei, usdt_wei, generation)
+        return bnb_wei, usdt_wei
+
+    async def send(self, sender, sign, *touched_addresses):
+        """Take the sender's next nonce, sign with `await sign(nonce)` and broadcast, all under its lock
+
+        Transactions from one address therefore reach the node in nonce order and callers only
+        overlap their receipt waits. The bot's threads send from the same wallets, so the sender's
+        thread-side lock (transaction_lock for the main wallet, else manager.send_lock) is also held
+        from the first 'pending' nonce read until no send from the address is left queued; the next
+        burst reads 'pending' again. A failed broadcast drops the counter so it is re-read too.
+        """
+        lock = self._nonce_locks.setdefault(sender, asyncio.Lock())
+        self._queued[sender] += 1
+        try:
+            async with lock:
+                if sender not in self._thread_locks:
+                    self._thread_locks[sender] = await self._acquire_thread_lock(sender)
+                if sender not in self._nonces:
+                    self._nonces[sender] = await self.call(self.web3.eth.get_transaction_count(sender, 'pending'))
+                nonce = self._nonces[sender]
+                signed_tx = await sign(nonce)
+                try:
+                    tx_hash = await self.call(self.web3.eth.send_raw_transaction(signed_tx.raw_transaction))
+                except Exception:
+                    self._nonces.pop(sender, None)
+                    raise
+                self._nonces[sender] = nonce + 1
+        finally:
+            self._queued[sender] -= 1
+            if not self._queued[sender]:
+                del self._queued[sender]
+                self._nonces.pop(sender, None)
+                thread_lock = self._thread_locks.pop(sender, None)
+                if thread_lock is not None:
+                    thread_lock.release()
+        balance_cache.invalidate(sender, *touched_addresses)
+        in_flight.add(tx_hash, (sender, *touched_addresses))
+        return tx_hash
+
+    @staticmethod
+    async def _acquire_thread_lock(sender):
+        """Take the sender's thread-side lock without blocking the event loop - the loop's thread owns it"""
+        if sender.lower() == (manager.MAIN_WALLET_ADDRESS or "").lower():
+            thread_lock = manager.transaction_lock
+        else:
+            thread_lock = manager.send_lock(sender)
+        while not thread_lock.acquire(blocking=False):
+            await asyncio.sleep(SEND_LOCK_POLL)
+        return thread_lock
+
+    async def wait(self, tx_hash, *touched_addresses):
+        # Receipt polling does not hold an in-flight slot, only its individual polls would
+        receipt = await self.web3.eth.wait_for_transaction_receipt(tx_hash)
+        balance_cache.invalidate(*touched_addresses)
+        in_flight.done(tx_hash)
+        return receipt
+
+    async def transfer(self, signer, to_address, value):
+        """Send a plain 21000-gas BNB transfer and wait for it, returns the receipt"""
+        async def sign(nonce):
+            return signer.sign_transaction({
+                'to': Web3.to_checksum_address(to_address),
+                'value': value,
+                'gas': 21000,
+                'gasPrice': Web3.to_wei('0.1', 'gwei'),
+                'nonce': nonce,
+                'chainId': manager.CHAIN_ID
+            })
+
+        tx_hash = await self.send(signer.address, sign, to_address)
+        return tx_hash, await self.wait(tx_hash, signer.address, to_address)
+
+
+class AsyncWalletManager:
+    def __init__(self, chain, wallet_manager=None):
+        self.chain = chain
+        # Wallet storage, creation and deletion stay on the synchronous manager - they never touch the chain
+        self.wallet_manager = wallet_manager or manager.WalletManager()
+
+    @property
+    def wallets(self):
+        return self.wallet_manager.wallets
+
+    async def get_wallet_balances(self, wallet_info):
+        """Like WalletManager.get_wallet_balances: raises rather than keeping stale balances"""
+        wallet_info.bnb_wei, wallet_info.usdt_wei = await self.chain.get_balances(wallet_info.address)
+        return wallet_info
+
+    async def get_all_balances(self):
+        """Refresh every wallet concurrently, returns the wallets that could be read"""
+        results = await asyncio.gather(*(self.get_wallet_balances(wallet) for wallet in self.wallets),
+                                       return_exceptions=True)
+        for wallet, result in zip(self.wallets, results):
+            if isinstance(result, Exception):
+                print(f"⚠️ Error getting balances for {wallet['name']}: {result}")
+        return [result for result in results if not isinstance(result, Exception)]
+
+    async def list_wallets(self):
+        if not self.wallets:
+            print("📝 No wallets created yet.")
+            return
+        await self.get_all_balances()
+        self.wallet_manager.list_wallets()
+
+    async def empty_wallet(self, wallet_index, main_wallet_address):
+        try:
+            if not (0 <= wallet_index < len(self.wallets)):
+                print("❌ Invalid wallet index")
+                return False
+            wallet = self.wallets[wallet_index]
+            total_balance, _ = await self.chain.get_balances(wallet.address)
+            gas_fee = Web3.to_wei('0.0001', 'ether')
+            if total_balance <= gas_fee:
+                print(f"❌ Wallet '{wallet['name']}' balance too low to cover gas fees")
+                return False
+            amount_to_send = total_balance - gas_fee
+            tx_hash, receipt = await self.chain.transfer(get_signer(wallet), main_wallet_address, amount_to_send)
+            if receipt.status == 1:
+                amount_bnb = Web3.from_wei(amount_to_send, 'ether')
+                print(f"✅ Emptied {wallet['name']}: {amount_bnb:.6f} BNB, TX: {Web3.to_hex(tx_hash)}")
+                await asyncio.to_thread(manager.send_telegram_message, (
+                    f"💸 Wallet Emptied!\n\n"
+                    f"👤 Wallet: {wallet['name']}\n"
+                    f"💰 Amount: {amount_bnb:.6f} BNB\n"
+                    f"📧 Sent to: Main Wallet\n"
+                    f"🔗 TX: {Web3.to_hex(tx_hash)}\n"
+                    f"⏰ Time: {datetime.now().strftime('%H:%M:%S')}"
+                ))
+                return True
+            print(f"❌ Transaction failed for {wallet['name']}")
+            return False
+        except Exception as e:
+            print(f"❌ Error emptying wallet: {e}")
+            return False
+
+
+async def drain_all_wallets_async(chain, wallet_manager, main_wallet_address):
+    """Drain every sub-wallet to the main wallet with all transfers in flight at once"""
+    main_address = Web3.to_checksum_address(main_wallet_address)
+    gas_fee = 21000 * Web3.to_wei('0.1', 'gwei')
+
+    async def drain_one(wallet):
+        address = wallet.address
+        if address == main_address:
+            return False
+        try:
+            total_balance_wei, _ = await chain.get_balances(address)
+            if total_balance_wei <= gas_fee:
+                return False
+            value = total_balance_wei - gas_fee
+            _, receipt = await chain.transfer(get_signer(wallet), main_address, value)
+            if receipt.status == 1:
+                print(f"✅ Drained {wallet['name']}! Sent: {Web3.from_wei(value, 'ether'):.8f} BNB")
+                return True
+            print(f"❌ Drain failed for {wallet['name']}")
+        except Exception as e:
+            print(f"❌ Error while draining {wallet['name']}: {e}")
+        return False
+
+    results = await asyncio.gather(*(drain_one(wallet) for wallet in wallet_manager.wallets))
+    drained = sum(results)
+    if drained:
+        await asyncio.to_thread(manager.send_telegram_message, "💀 All wallets drained! Dust sent to main wallet.")
+    else:
+        print("🦴 No wallets had dust to drain.")
+    return drained
+
+
+async def distribute_wealth_async(chain, wallet_manager, main_wallet_address):
+    """Non-interactive distribute: 95% of main wallet BNB split equally
+
+    Transfers go out one after another in nonce order (see AsyncChain.send); only their receipt
+    waits run concurrently.
+    """
+    try:
+        if not wallet_manager.wallets:
+            print("❌ No wallets available to distribute to.")
+            return False
+
+        main_address = Web3.to_checksum_address(main_wallet_address)
+        main_balance, _ = await chain.get_balances(main_address)
+        if main_balance < manager.DISTRIBUTE_MIN_WEI:
+            print(f"❌ Main wallet balance too low: {Web3.from_wei(main_balance, 'ether'):.6f} BNB")
+            return False
+
+        # Same integer-wei split as manager.distribute_wealth
+        num_wallets = len(wallet_manager.wallets)
+        total_to_distribute = main_balance * 95 // 100
+        total_gas_needed = manager.DISTRIBUTE_GAS_RESERVE_WEI * num_wallets
+        if total_to_distribute < total_gas_needed:
+            print(f"❌ Not enough balance to cover gas fees. "
+                  f"Need at least {Web3.from_wei(total_gas_needed, 'ether'):.6f} BNB")
+            return False
+        value = (total_to_distribute - total_gas_needed) // num_wallets
+        amount_per_wallet = Web3.from_wei(value, 'ether')
+
+        signer = get_main_signer()
+        results = await asyncio.gather(
+            *(chain.transfer(signer, wallet.address, value) for wallet in wallet_manager.wallets),
+            return_exceptions=True
+        )
+        successful_transfers = sum(
+            1 for result in results if not isinstance(result, Exception) and result[1].status == 1
+        )
+        for wallet, result in zip(wallet_manager.wallets, results):
+            if isinstance(result, Exception):
+                print(f"   ❌ Error sending to {wallet['name']}: {result}")
+
+        print(f"🎉 DISTRIBUTION COMPLETE! {successful_transfers}/{num_wallets} wallets, "
+              f"{amount_per_wallet:.6f} BNB each")
+        if successful_transfers > 0:
+            await asyncio.to_thread(manager.send_telegram_message, (
+                f"💰 Wealth Distribution Complete!\n\n"
+                f"✅ Successful: {successful_transfers}/{num_wallets} wallets\n"
+                f"💸 Per wallet: {amount_per_wallet:.6f} BNB\n"
+                f"💎 Total distributed: {successful_transfers * amount_per_wallet:.6f} BNB\n"
+                f"⏰ Time: {datetime.now().strftime('%H:%M:%S')}"
+            ))
+        return successful_transfers > 0
+    except Exception as e:
+        print(f"❌ Error during wealth distribution: {e}")
+        return False
+
+
+class AsyncSwapManager:
+    def __init__(self, chain):
+        self.chain = chain
+        self._pairs = {}  # see manager_Version4.swap_pair
+
+    async def _pair(self, token_a, token_b):
+        key = tuple(sorted((token_a.lower(), token_b.lower())))
+        if key not in self._pairs:
+            web3 = self.chain.web3
+            factory_address = await self.chain.call(self.chain.router_contract.functions.factory().call())
+            factory = web3.eth.contract(address=factory_address, abi=manager.FACTORY_ABI)
+            pair_address = await self.chain.call(factory.functions.getPair(
+                Web3.to_checksum_address(token_a), Web3.to_checksum_address(token_b)
+            ).call())
+            pair = web3.eth.contract(address=pair_address, abi=manager.PAIR_ABI)
+            self._pairs[key] = (pair, (await self.chain.call(pair.functions.token0().call())).lower())
+        return self._pairs[key]
+
+    async def quote(self, amount_in_wei, path):
+        """manager_Version4.swap_quote on the event loop: quote and reserves read concurrently"""
+        pair, token0 = await self._pair(path[0], path[-1])
+        amounts, reserves = await asyncio.gather(
+            self.chain.call(self.chain.router_contract.functions.getAmountsOut(amount_in_wei, path).call()),
+            self.chain.call(pair.functions.getReserves().call())
+        )
+        impact, slippage = manager.swap_slippage(amount_in_wei,
+                                                 reserves[0] if path[0].lower() == token0 else reserves[1])
+        return manager.SwapQuote(amount_in_wei, amounts[-1], manager.apply_slippage(amounts[-1], slippage),
+                                 impact, slippage)
+
+    async def _execute_swap(self, quote, path, recipient_address):
+        """Send the swap, re-quoting and resending up to SWAP_RETRIES times if it reverts; receipt or None"""
+        main_address = Web3.to_checksum_address(manager.MAIN_WALLET_ADDRESS)
+        recipient_address = Web3.to_checksum_address(recipient_address)
+        for attempt in range(manager.SWAP_RETRIES + 1):
+            if attempt:
+                quote = await self.quote(quote.amount_in, path)
+            deadline = int(time.time()) + manager.SWAP_DEADLINE
+            tx_params = {
+                'from': main_address,
+                'gas': 300000,
+                'gasPrice': Web3.to_wei('0.1', 'gwei'),
+                'chainId': manager.CHAIN_ID
+            }
+            if path[0].lower() == manager.WBNB.lower():
+                tx_params['value'] = quote.amount_in
+                swap = self.chain.router_contract.functions.swapExactETHForTokens(
+                    quote.min_out, path, recipient_address, deadline
+                )
+            else:
+                swap = self.chain.router_contract.functions.swapExactTokensForETH(
+                    quote.amount_in, quote.min_out, path, recipient_address, deadline
+                )
+
+            async def sign(nonce):
+                return get_main_signer().sign_transaction(await swap.build_transaction({**tx_params, 'nonce': nonce}))
+
+            touched = {main_address, recipient_address}
+            tx_hash = await self.chain.send(main_address, sign, *(touched - {main_address}))
+            receipt = await self.chain.wait(tx_hash, *touched)
+            manager.count_swap("sent")
+            if receipt.status == 1:
+                return receipt
+            manager.count_swap("reverted")
+            log_event("swap_reverted", f"↩️ Swap reverted (min out {quote.min_out / 1e18:.6f}, "
+                                       f"{quote.slippage:.2%} slippage)", logging.WARNING,
+                      tx=Web3.to_hex(tx_hash), attempt=attempt + 1)
+        manager.count_swap("failed")
+        return None
+
+    async def get_usdt_to_bnb_rate(self, usdt_amount):
+        try:
+            amounts = await self.chain.call(self.chain.router_contract.functions.getAmountsOut(
+                int(usdt_amount * 1e18), [manager.USDT_CONTRACT, manager.WBNB]
+            ).call())
+            return amounts[1] / 1e18
+        except Exception as e:
+            print(f"⚠️ Error getting swap rate: {e}")
+            return 0
+
+    async def _ensure_allowance(self, main_address, usdt_amount_wei):
+        allowance = await self.chain.call(
+            self.chain.usdt_contract.functions.allowance(main_address, manager.PANCAKE_ROUTER).call()
+        )
+        if allowance >= usdt_amount_wei:
+            return
+        async def sign(nonce):
+            approve_tx = await self.chain.usdt_contract.functions.approve(
+                manager.PANCAKE_ROUTER, usdt_amount_wei * 2
+            ).build_transaction({
+                'from': main_address,
+                'gas': 100000,
+                'gasPrice': Web3.to_wei('0.1', 'gwei'),
+                'nonce': nonce,
+                'chainId': manager.CHAIN_ID
+            })
+            return get_main_signer().sign_transaction(approve_tx)
+
+        tx_hash = await self.chain.send(main_address, sign)
+        await self.chain.wait(tx_hash, main_address)
+
+    async def swap_usdt_to_bnb(self, usdt_amount, recipient_address):
+        """USDT from the main wallet to BNB at recipient_address (slippage from the price impact)"""
+        try:
+            main_address = Web3.to_checksum_address(manager.MAIN_WALLET_ADDRESS)
+            path = [manager.USDT_CONTRACT, manager.WBNB]
+            (_, usdt_balance), quote = await asyncio.gather(
+                self.chain.get_balances(main_address), self.quote(int(usdt_amount * 1e18), path)
+            )
+            if usdt_balance / 1e18 < usdt_amount:
+                log_event("swap_rejected", f"❌ Insufficient USDT balance. Have: {usdt_balance / 1e18:.2f}, "
+                                           f"Need: {usdt_amount}", logging.WARNING,
+                          usdt=usdt_amount, usdt_balance=usdt_balance / 1e18)
+                return False
+
+            usdt_amount_wei = int(usdt_amount * 1e18)
+            await self._ensure_allowance(main_address, usdt_amount_wei)
+
+            receipt = await self._execute_swap(quote, path, recipient_address)
+            if receipt is not None:
+                tx_hash = Web3.to_hex(receipt.transactionHash)
+                log_event("swap_done", f"✅ Swap completed! TX: {tx_hash}",
+                          usdt=usdt_amount, recipient=recipient_address, tx=tx_hash)
+                return True
+            log_event("swap_failed", "❌ Swap failed!", logging.ERROR, usdt=usdt_amount)
+            return False
+        except Exception as e:
+            log_event("swap_failed", f"❌ Error during swap: {e}", logging.ERROR, usdt=usdt_amount, error=str(e))
+            return False
+
+    async def swap_usdt_to_bnb_main_wallet(self, usdt_amount):
+        return await self.swap_usdt_to_bnb(usdt_amount, manager.MAIN_WALLET_ADDRESS)
+
+    async def swap_bnb_to_usdt_main_wallet(self, bnb_amount):
+        """BNB from the main wallet to USDT (slippage from the price impact)"""
+        try:
+            main_address = Web3.to_checksum_address(manager.MAIN_WALLET_ADDRESS)
+            bnb_amount_wei = int(bnb_amount * 1e18)
+            path = [manager.WBNB, manager.USDT_CONTRACT]
+            (bnb_balance, _), quote = await asyncio.gather(
+                self.chain.get_balances(main_address), self.quote(bnb_amount_wei, path)
+            )
+            if bnb_balance < bnb_amount_wei:
+                print(f"❌ Insufficient BNB balance. You have {bnb_balance / 1e18:.4f} BNB.")
+                return False
+
+            receipt = await self._execute_swap(quote, path, main_address)
+            if receipt is not None:
+                print(f"✅ Swap completed! TX: https://bscscan.com/tx/{Web3.to_hex(receipt.transactionHash)}")
+                return True
+            print("❌ Swap failed.")
+            return False
+        except Exception as e:
+            print(f"❌ Error during main wallet BNB→USDT swap: {e}")
+            return False
+
+
+class AsyncBettingManager:
+    def __init__(self, chain):
+        self.chain = chain
+
+    async def place_bet(self, wallet_info, direction, bet_amount_bnb):
+        """Place a bet using the specified wallet"""
+        try:
+            prediction = self.chain.prediction_contract
+            address = wallet_info.address
+            current_epoch, (balance, _) = await asyncio.gather(
+                self.chain.call(prediction.functions.currentEpoch().call()),
+                self.chain.get_balances(address)
+            )
+            round_data = await self.chain.call(prediction.functions.rounds(current_epoch).call())
+            manager.round_tracker.update(current_epoch, round_data)
+            lock_timestamp = round_data[2]
+            if int(time.time()) >= lock_timestamp:
+                log_event("bet_rejected", "⚠️ Current round is locked, cannot place bets", logging.WARNING,
+                          wallet=wallet_info.name, epoch=current_epoch, reason="locked")
+                return False
+
+            bet_amount_wei = Web3.to_wei(bet_amount_bnb, 'ether')
+            if balance < bet_amount_wei + manager.BET_GAS_RESERVE_WEI:
+                log_event("bet_rejected", f"❌ Insufficient balance in {wallet_info['name']}. "
+                                          f"Have: {balance / 1e18:.6f} BNB", logging.WARNING,
+                          wallet=wallet_info.name, epoch=current_epoch, reason="balance", balance=balance / 1e18)
+                return False
+
+            if direction.lower() == 'up':
+                function = prediction.functions.betBull(current_epoch)
+            else:
+                function = prediction.functions.betBear(current_epoch)
+
+            async def sign(nonce):
+                tx = await function.build_transaction({
+                    'from': address,
+                    'value': bet_amount_wei,
+                    'gas': 200000,
+                    'gasPrice': Web3.to_wei('0.1', 'gwei'),
+                    'nonce': nonce,
+                    'chainId': manager.CHAIN_ID
+                })
+                return get_signer(wallet_info).sign_transaction(tx)
+
+            tx_hash = await self.chain.send(address, sign)
+            manager.bet_ledger.record(wallet_info, current_epoch, direction, bet_amount_wei)
+            log_event("bet_sent", f"🚀 Bet placed! {wallet_info['name']} {direction.upper()} round {current_epoch}, "
+                                  f"TX: {Web3.to_hex(tx_hash)}",
+                      wallet=wallet_info.name, direction=direction.lower(), bnb=bet_amount_bnb,
+                      epoch=current_epoch, tx=Web3.to_hex(tx_hash))
+            return True
+        except Exception as e:
+            log_event("bet_failed", f"❌ Error placing bet: {e}", logging.ERROR, wallet=wallet_info.name, error=str(e))
+            return False
+
+
+class AsyncRewardManager:
+    def __init__(self, chain, scan_epochs=5):
+        self.chain = chain
+        self.scan_epochs = scan_epochs
+
+    async def get_claimable_epochs(self, wallet_address):
+        """Get all recent epochs where wallet has claimable rewards, every epoch checked concurrently"""
+        try:
+            prediction = self.chain.prediction_contract
+            wallet_address = Web3.to_checksum_address(wallet_address)
+            current_epoch = await self.chain.call(prediction.functions.currentEpoch().call())
+            epochs = range(max(1, current_epoch - self.scan_epochs), current_epoch)
+
+            async def check(epoch):
+                user_round, claimable = await asyncio.gather(
+                    self.chain.call(prediction.functions.ledger(epoch, wallet_address).call()),
+                    self.chain.call(prediction.functions.claimable(epoch, wallet_address).call())
+                )
+                if user_round[1] > 0 and not user_round[2] and claimable:
+                    return {
+                        'epoch': epoch,
+                        'bet_amount': Web3.from_wei(user_round[1], 'ether'),
+                        'position': 'BULL' if user_round[0] == 0 else 'BEAR',
+                        'claimed': user_round[2]
+                    }
+                return None
+
+            results = await asyncio.gather(*(check(epoch) for epoch in epochs), return_exceptions=True)
+            for epoch, result in zip(epochs, results):
+                if isinstance(result, Exception):
+                    print(f"⚠️ Could not check epoch {epoch} for {wallet_address}: {result}")
+            return [result for result in results if isinstance(result, dict)]
+        except Exception as e:
+            print(f"❌ Error getting claimable epochs: {e}")
+            return []
+
+    async def get_claimable_amount(self, wallet_address, epoch):
+        """Get the claimable amount for a specific epoch"""
+        try:
+            prediction = self.chain.prediction_contract
+            wallet_address = Web3.to_checksum_address(wallet_address)
+            user_round, round_data = await asyncio.gather(
+                self.chain.call(prediction.functions.ledger(epoch, wallet_address).call()),
+                self.chain.call(prediction.functions.rounds(epoch).call())
+            )
+            if user_round[1] > 0 and not user_round[2]:
+                reward_base, reward_amount, oracle_called = round_data[11], round_data[12], round_data[13]
+                if not oracle_called:  # refund
+                    user_reward = user_round[1]
+                else:
+                    user_reward = (user_round[1] * reward_amount) // reward_base if reward_base > 0 else 0
+                return Web3.from_wei(user_reward, 'ether')
+            return 0
+        except Exception as e:
+            print(f"⚠️ Error calculating claimable amount: {e}")
+            return 0
+
+    async def claim_rewards(self, wallet_info, epochs_to_claim=None):
+        """Claim every claimable epoch of a wallet in a single claim() transaction"""
+        try:
+            wallet_address = Web3.to_checksum_address(wallet_info['address'])
+            if epochs_to_claim is None:
+                claimable_epochs = await self.get_claimable_epochs(wallet_address)
+                epochs_to_claim = [epoch['epoch'] for epoch in claimable_epochs]
+            if not epochs_to_claim:
+                return True
+
+            estimates = await asyncio.gather(
+                *(self.get_claimable_amount(wallet_address, epoch) for epoch in epochs_to_claim)
+            )
+            total_claimed = sum(estimates)
+
+            async def sign(nonce):
+                claim_tx = await self.chain.prediction_contract.functions.claim(epochs_to_claim).build_transaction({
+                    'from': wallet_address,
+                    'gas': 200000 + 50000 * (len(epochs_to_claim) - 1),
+                    'gasPrice': Web3.to_wei('0.1', 'gwei'),
+                    'nonce': nonce,
+                    'chainId': manager.CHAIN_ID
+                })
+                return get_signer(wallet_info).sign_transaction(claim_tx)
+
+            tx_hash = await self.chain.send(wallet_address, sign)
+            receipt = await self.chain.wait(tx_hash, wallet_address)
+            if receipt.status != 1:
+                log_event("claim_failed", f"❌ Claim failed for {wallet_info['name']}", logging.ERROR,
+                          wallet=wallet_info['name'], epochs=list(epochs_to_claim), tx=Web3.to_hex(tx_hash))
+                return False
+
+            log_event("claim_done", f"✅ {wallet_info['name']}: claimed {len(epochs_to_claim)} epochs, "
+                                    f"~{total_claimed:.6f} BNB",
+                      wallet=wallet_info['name'], epochs=list(epochs_to_claim), bnb=total_claimed,
+                      tx=Web3.to_hex(tx_hash))
+            await asyncio.to_thread(manager.send_telegram_message, (
+                f"🎁 Rewards Claimed!\n\n"
+                f"👤 Wallet: {wallet_info['name']}\n"
+                f"✅ Epochs claimed: {len(epochs_to_claim)}\n"
+                f"💰 Total rewards: {total_claimed:.6f} BNB\n"
+                f"⏰ Time: {datetime.now().strftime('%H:%M:%S')}"
+            ))
+            return True
+        except Exception as e:
+            log_event("claim_failed", f"❌ Error during reward claiming: {e}", logging.ERROR,
+                      wallet=wallet_info['name'], error=str(e))
+            return False
+
+    async def claim_all_wallets(self, wallets):
+        """Scan and claim every wallet concurrently"""
+        return await asyncio.gather(*(self.claim_rewards(wallet) for wallet in wallets))
+
+    async def show_claimable_rewards(self, wallet_info):
+        """Show all claimable rewards for a wallet"""
+        claimable_epochs = await self.get_claimable_epochs(wallet_info['address'])
+        if not claimable_epochs:
+            print(f"🎉 No claimable rewards found for {wallet_info['name']}!")
+            return []
+        estimates = await asyncio.gather(
+            *(self.get_claimable_amount(wallet_info['address'], epoch['epoch']) for epoch in claimable_epochs)
+        )
+        for epoch_data, estimated_reward in zip(claimable_epochs, estimates):
+            print(f"🎯 Epoch {epoch_data['epoch']} {epoch_data['position']}: "
+                  f"bet {epoch_data['bet_amount']:.6f} BNB, reward ~{estimated_reward:.6f} BNB")
+        print(f"💰 TOTAL ESTIMATED REWARDS: {sum(estimates):.6f} BNB")
+        return claimable_epochs
@@ -0,0 +1,236 @@
+# pragma version ~=0.4.0
+# PancakePredictionV2 stand-in: same selectors, storage layout of rounds/ledger and reward maths.
+# The benchmark operator drives rounds with executeRound() instead of an oracle and a timer,
+# so rounds lock and close whenever the operator calls it.
+
+struct Round:
+    epoch: uint256
+    startTimestamp: uint256
+    lockTimestamp: uint256
+    closeTimestamp: uint256
+    lockPrice: int256
+    closePrice: int256
+    lockOracleId: uint256
+    closeOracleId: uint256
+    totalAmount: uint256
+    bullAmount: uint256
+    bearAmount: uint256
+    rewardBaseCalAmount: uint256
+    rewardAmount: uint256
+    oracleCalled: bool
+
+struct BetInfo:
+    position: uint8
+    amount: uint256
+    claimed: bool
+
+MAX_USER_ROUNDS: constant(uint256) = 4096
+MAX_CLAIM: constant(uint256) = 256
+
+event BetBull:
+    sender: indexed(address)
+    epoch: indexed(uint256)
+    amount: uint256
+
+event BetBear:
+    sender: indexed(address)
+    epoch: indexed(uint256)
+    amount: uint256
+
+event Claim:
+    sender: indexed(address)
+    epoch: indexed(uint256)
+    amount: uint256
+
+event StartRound:
+    epoch: indexed(uint256)
+
+event LockRound:
+    epoch: indexed(uint256)
+    roundId: indexed(uint256)
+    price: int256
+
+event EndRound:
+    epoch: indexed(uint256)
+    roundId: indexed(uint256)
+    price: int256
+
+rounds: public(HashMap[uint256, Round])
+ledger: public(HashMap[uint256, HashMap[address, BetInfo]])
+userRounds: HashMap[address, DynArray[uint256, MAX_USER_ROUNDS]]
+currentEpoch: public(uint256)
+intervalSeconds: public(uint256)
+bufferSeconds: public(uint256)
+minBetAmount: public(uint256)
+treasuryFee: public(uint256)
+treasuryAmount: public(uint256)
+operatorAddress: public(address)
+oracleRoundId: uint256
+
+
+@deploy
+def __init__(interval_seconds: uint256, treasury_fee: uint256):
+    self.intervalSeconds = interval_seconds
+    self.bufferSeconds = 30
+    self.minBetAmount = 10 ** 12
+    self.treasuryFee = treasury_fee
+    self.operatorAddress = msg.sender
+
+
+@internal
+def _bet(epoch: uint256, position: uint8, amount: uint256):
+    assert epoch == self.currentEpoch, "Bet is too early/late"
+    assert block.timestamp >= self.rounds[epoch].startTimestamp and block.timestamp < self.rounds[epoch].lockTimestamp, "Round not bettable"
+    assert amount >= self.minBetAmount, "Bet amount must be greater than minBetAmount"
+    assert self.ledger[epoch][msg.sender].amount == 0, "Can only bet once per round"
+    self.rounds[epoch].totalAmount += amount
+    if position == 0:
+        self.rounds[epoch].bullAmount += amount
+    else:
+        self.rounds[epoch].bearAmount += amount
+    self.ledger[epoch][msg.sender] = BetInfo(position=position, amount=amount, claimed=False)
+    self.userRounds[msg.sender].append(epoch)
+
+
+@external
+@payable
+def betBull(epoch: uint256):
+    self._bet(epoch, 0, msg.value)
+    log BetBull(sender=msg.sender, epoch=epoch, amount=msg.value)
+
+
+@external
+@payable
+def betBear(epoch: uint256):
+    self._bet(epoch, 1, msg.value)
+    log BetBear(sender=msg.sender, epoch=epoch, amount=msg.value)
+
+
+@internal
+@view
+def _claimable(epoch: uint256, user: address) -> bool:
+    bet: BetInfo = self.ledger[epoch][user]
+    r: Round = self.rounds[epoch]
+    if not r.oracleCalled or bet.amount == 0 or bet.claimed or r.lockPrice == r.closePrice:
+        return False
+    return (r.closePrice > r.lockPrice and bet.position == 0) or (r.closePrice < r.lockPrice and bet.position == 1)
+
+
+@internal
+@view
+def _refundable(epoch: uint256, user: address) -> bool:
+    bet: BetInfo = self.ledger[epoch][user]
+    r: Round = self.rounds[epoch]
+    return not r.oracleCalled and not bet.claimed and bet.amount != 0 and block.timestamp > r.closeTimestamp + self.bufferSeconds
+
+
+@external
+@view
+def claimable(epoch: uint256, user: address) -> bool:
+    return self._claimable(epoch, user)
+
+
+@external
+@view
+def refundable(epoch: uint256, user: address) -> bool:
+    return self._refundable(epoch, user)
+
+
+@external
+def claim(epochs: DynArray[uint256, MAX_CLAIM]):
+    reward: uint256 = 0
+    for epoch: uint256 in epochs:
+        assert self.rounds[epoch].startTimestamp != 0, "Round has not started"
+        assert block.timestamp > self.rounds[epoch].closeTimestamp, "Round has not ended"
+        add_to_reward: uint256 = 0
+        if self.rounds[epoch].oracleCalled:
+            assert self._claimable(epoch, msg.sender), "Not eligible for claim"
+            r: Round = self.rounds[epoch]
+            add_to_reward = self.ledger[epoch][msg.sender].amount * r.rewardAmount // r.rewardBaseCalAmount
+        else:
+            assert self._refundable(epoch, msg.sender), "Not eligible for refund"
+            add_to_reward = self.ledger[epoch][msg.sender].amount
+        self.ledger[epoch][msg.sender].claimed = True
+        reward += add_to_reward
+        log Claim(sender=msg.sender, epoch=epoch, amount=add_to_reward)
+    if reward > 0:
+        send(msg.sender, reward)
+
+
+@external
+@view
+def getUserRounds(user: address, cursor: uint256, size: uint256) -> (DynArray[uint256, MAX_USER_ROUNDS], DynArray[BetInfo, MAX_USER_ROUNDS], uint256):
+    epochs: DynArray[uint256, MAX_USER_ROUNDS] = []
+    bets: DynArray[BetInfo, MAX_USER_ROUNDS] = []
+    length: uint256 = len(self.userRounds[user])
+    end: uint256 = min(cursor + size, length)
+    for i: uint256 in range(cursor, end, bound=MAX_USER_ROUNDS):
+        epoch: uint256 = self.userRounds[user][i]
+        epochs.append(epoch)
+        bets.append(self.ledger[epoch][user])
+    return epochs, bets, max(end, cursor)
+
+
+@external
+@view
+def getUserRoundsLength(user: address) -> uint256:
+    return len(self.userRounds[user])
+
+
+@internal
+def _start_round(epoch: uint256):
+    self.rounds[epoch].epoch = epoch
+    self.rounds[epoch].startTimestamp = block.timestamp
+    self.rounds[epoch].lockTimestamp = block.timestamp + self.intervalSeconds
+    self.rounds[epoch].closeTimestamp = block.timestamp + 2 * self.intervalSeconds
+    log StartRound(epoch=epoch)
+
+
+@internal
+def _calculate_rewards(epoch: uint256):
+    r: Round = self.rounds[epoch]
+    treasury_amt: uint256 = 0
+    base: uint256 = 0
+    reward: uint256 = 0
+    if r.closePrice > r.lockPrice:
+        base = r.bullAmount
+        treasury_amt = r.totalAmount * self.treasuryFee // 10000
+        reward = r.totalAmount - treasury_amt
+    elif r.closePrice < r.lockPrice:
+        base = r.bearAmount
+        treasury_amt = r.totalAmount * self.treasuryFee // 10000
+        reward = r.totalAmount - treasury_amt
+    else:
+        treasury_amt = r.totalAmount
+    self.rounds[epoch].rewardBaseCalAmount = base
+    self.rounds[epoch].rewardAmount = reward
+    self.treasuryAmount += treasury_amt
+
+
+@external
+def executeRound(price: int256):
+    """Lock the current round at `price`, close the previous one at `price` and start the next"""
+    assert msg.sender == self.operatorAddress, "Not operator"
+    self.oracleRoundId += 1
+    epoch: uint256 = self.currentEpoch
+    if epoch > 0:
+        self.rounds[epoch].lockPrice = price
+        self.rounds[epoch].lockOracleId = self.oracleRoundId
+        self.rounds[epoch].lockTimestamp = block.timestamp
+        self.rounds[epoch].closeTimestamp = block.timestamp + self.intervalSeconds
+        log LockRound(epoch=epoch, roundId=self.oracleRoundId, price=price)
+    if epoch > 1:
+        self.rounds[epoch - 1].closeTimestamp = block.timestamp
+        self.rounds[epoch - 1].closePrice = price
+        self.rounds[epoch - 1].closeOracleId = self.oracleRoundId
+        self.rounds[epoch - 1].oracleCalled = True
+        self._calculate_rewards(epoch - 1)
+        log EndRound(epoch=epoch - 1, roundId=self.oracleRoundId, price=price)
+    self.currentEpoch = epoch + 1
+    self._start_round(epoch + 1)
+
+
+@external
+def setIntervalSeconds(interval_seconds: uint256):
+    assert msg.sender == self.operatorAddress, "Not operator"
+    self.intervalSeconds = interval_seconds
@@ -0,0 +1,99 @@
+# pragma version ~=0.4.0
+# Constant-product USDT/WBNB pool behind the PancakeSwap router interface (0.25% fee)
+
+interface IERC20:
+    def transfer(to: address, amount: uint256) -> bool: nonpayable
+    def transferFrom(owner: address, to: address, amount: uint256) -> bool: nonpayable
+
+event Swap:
+    sender: indexed(address)
+    amount0In: uint256
+    amount1In: uint256
+    amount0Out: uint256
+    amount1Out: uint256
+    to: indexed(address)
+
+usdt: public(address)
+wbnb: public(address)
+reserveUsdt: public(uint256)
+reserveBnb: public(uint256)
+
+
+@deploy
+def __init__(usdt: address, wbnb: address):
+    self.usdt = usdt
+    self.wbnb = wbnb
+
+
+@external
+@payable
+def addLiquidity(usdt_amount: uint256):
+    """Caller must have approved usdt_amount; msg.value is the BNB side"""
+    extcall IERC20(self.usdt).transferFrom(msg.sender, self, usdt_amount)
+    self.reserveUsdt += usdt_amount
+    self.reserveBnb += msg.value
+
+
+@internal
+@view
+def _amount_out(amount_in: uint256, reserve_in: uint256, reserve_out: uint256) -> uint256:
+    amount_in_with_fee: uint256 = amount_in * 9975
+    return amount_in_with_fee * reserve_out // (reserve_in * 10000 + amount_in_with_fee)
+
+
+@external
+@view
+def factory() -> address:
+    return self
+
+
+@external
+@view
+def getPair(token_a: address, token_b: address) -> address:
+    return self
+
+
+@external
+@view
+def token0() -> address:
+    return self.usdt
+
+
+@external
+@view
+def getReserves() -> (uint112, uint112, uint32):
+    return convert(self.reserveUsdt, uint112), convert(self.reserveBnb, uint112), convert(block.timestamp % 2 ** 32, uint32)
+
+
+@external
+@view
+def getAmountsOut(amount_in: uint256, path: DynArray[address, 2]) -> DynArray[uint256, 2]:
+    if path[0] == self.usdt:
+        return [amount_in, self._amount_out(amount_in, self.reserveUsdt, self.reserveBnb)]
+    return [amount_in, self._amount_out(amount_in, self.reserveBnb, self.reserveUsdt)]
+
+
+@external
+def swapExactTokensForETH(amount_in: uint256, amount_out_min: uint256, path: DynArray[address, 2], to: address, deadline: uint256) -> DynArray[uint256, 2]:
+    assert block.timestamp <= deadline, "PancakeRouter: EXPIRED"
+    amount_out: uint256 = self._amount_out(amount_in, self.reserveUsdt, self.reserveBnb)
+    assert amount_out >= amount_out_min, "PancakeRouter: INSUFFICIENT_OUTPUT_AMOUNT"
+    extcall IERC20(self.usdt).transferFrom(msg.sender, self, amount_in)
+    self.reserveUsdt += amount_in
+    self.reserveBnb -= amount_out
+    send(to, amount_out)
+    log Swap(sender=msg.sender, amount0In=amount_in, amount1In=0, amount0Out=0, amount1Out=amount_out, to=to)
+    return [amount_in, amount_out]
+
+
+@external
+@payable
+def swapExactETHForTokens(amount_out_min: uint256, path: DynArray[address, 2], to: address, deadline: uint256) -> DynArray[uint256, 2]:
+    assert block.timestamp <= deadline, "PancakeRouter: EXPIRED"
+    amount_out: uint256 = self._amount_out(msg.value, self.reserveBnb, self.reserveUsdt)
+    assert amount_out >= amount_out_min, "PancakeRouter: INSUFFICIENT_OUTPUT_AMOUNT"
+    self.reserveBnb += msg.value
+    self.reserveUsdt -= amount_out
+    extcall IERC20(self.usdt).transfer(to, amount_out)
+    log Swap(sender=msg.sender, amount0In=0, amount1In=msg.value, amount0Out=amount_out, amount1Out=0, to=to)
+    return [msg.value, amount_out]
@@ -0,0 +1,112 @@
+"""Fake Telegram Bot API: serves queued updates to getUpdates and records sendMessage calls"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from local_chain import free_port
+
+
+class FakeTelegram:
+    def __init__(self, chat_id=1, user_id=1):
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._updates = []  # (update, queued_at)
+        self._next_update_id = 1
+        self.sent = []  # (text, chat_id, sent_at)
+        self._cond = threading.Condition()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _params(self):
+                params = {key: values[-1] for key, values in parse_qs(urlparse(self.path).query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    body = self.rfile.read(length).decode()
+                    if self.headers.get("Content-Type", "").startswith("application/json"):
+                        params.update(json.loads(body))
+                    else:
+                        params.update({key: values[-1] for key, values in parse_qs(body).items()})
+                return params
+
+            def _reply(self, result):
+                payload = json.dumps({"ok": True, "result": result}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _dispatch(self):
+                method = urlparse(self.path).path.rsplit("/", 1)[-1]
+                params = self._params()
+                if method == "getUpdates":
+                    self._reply(fake._get_updates(int(params.get("offset", 0))))
+                elif method == "sendMessage":
+                    fake._record(params.get("text", ""), params.get("chat_id"))
+                    self._reply({"message_id": len(fake.sent)})
+                else:
+                    self._reply(True)
+
+            do_GET = _dispatch
+            do_POST = _dispatch
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def env(self):
+        return {
+            "TELEGRAM_API_URL": self.url,
+            "TELEGRAM_TOKEN": "bench",
+            "TELEGRAM_CHAT_ID": str(self.chat_id),
+        }
+
+    def push_message(self, text, chat_id=None, user_id=None, date=None):
+        """Queue an incoming chat message, returns the time it was queued"""
+        with self._cond:
+            update = {
+                "update_id": self._next_update_id,
+                "message": {
+                    "message_id": self._next_update_id,
+                    "date": int(date if date is not None else time.time()),
+                    "chat": {"id": chat_id or self.chat_id, "type": "private"},
+                    "from": {"id": user_id or self.user_id, "is_bot": False, "first_name": "bench"},
+                    "text": text,
+                },
+            }
+            self._next_update_id += 1
+            queued_at = time.perf_counter()
+            self._updates.append(update)
+            return queued_at
+
+    def _get_updates(self, offset):
+        with self._cond:
+            self._updates = [update for update in self._updates if update["update_id"] >= offset]
+            return list(self._updates)
+
+    def _record(self, text, chat_id):
+        with self._cond:
+            self.sent.append((text, chat_id, time.perf_counter()))
+            self._cond.notify_all()
+
+    def wait_for(self, predicate, since_index=0, timeout=60):
+        """Block until a sent message matching predicate arrives, returns (text, sent_at) or None"""
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                for text, _, sent_at in self.sent[since_index:]:
+                    if predicate(text):
+                        return text, sent_at
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def close(self):
+        self.server.shutdown()
@@ -0,0 +1,227 @@
+"""Local stand-in chain for benchmarks: eth-tester (in-process) or anvil, behind a counting JSON-RPC front"""
+import json
+import os
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+CONTRACTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "contracts")
+WBNB = "0xbb4CdB9CBd36B01bD1cBaEBF2De08d9173bc095c"
+ROUND_INTERVAL = 300  # seconds, like the real prediction contract
+TREASURY_FEE = 300  # 3%
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def compile_contract(name):
+    """Compile benchmarks/contracts/<name>.vy, returns (abi, bytecode)"""
+    import vyper
+    from vyper.compiler.settings import Settings
+    with open(os.path.join(CONTRACTS_DIR, f"{name}.vy")) as f:
+        output = vyper.compile_code(f.read(), output_formats=["abi", "bytecode"],
+                                    settings=Settings(evm_version="shanghai"))
+    return output["abi"], output["bytecode"]
+
+
+class _FrontServer(ThreadingHTTPServer):
+    # Real endpoints don't refuse connections under a burst, so allow a deep accept backlog
+    request_queue_size = 256
+
+
+class RpcFront:
+    """Local JSON-RPC endpoint that counts every method call before handing it to the chain
+
+    Setting max_rps makes it answer HTTP 429 above that many requests per second, like a
+    metered provider; rejected requests are counted in `rejected`, not in `counts`.
+    """
+
+    def __init__(self, handle_request):
+        self.handle_request = handle_request
+        self.counts = Counter()
+        self._counts_lock = threading.Lock()
+        self.max_rps = None
+        self.rejected = 0
+        self._recent = deque()  # arrival times within the last second
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        front = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                requests_in = body if isinstance(body, list) else [body]
+                if not front._admit(len(requests_in)):
+                    self.send_response(429)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                with front._counts_lock:
+                    for request in requests_in:
+                        front.counts[request["method"]] += 1
+                responses = [front.handle_request(request) for request in requests_in]
+                payload = json.dumps(responses if isinstance(body, list) else responses[0]).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = _FrontServer(("127.0.0.1", self.port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def _admit(self, count):
+        if not self.max_rps:
+            return True
+        with self._counts_lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 1:
+                self._recent.popleft()
+            if len(self._recent) + count > self.max_rps:
+                self.rejected += 1
+                return False
+            self._recent.extend([now] * count)
+            return True
+
+    def snapshot(self):
+        with self._counts_lock:
+            return Counter(self.counts)
+
+    def close(self):
+        self.server.shutdown()
+
+
+class LocalChain:
+    """Starts a dev chain, deploys the mock Prediction/USDT/router contracts and funds accounts
+
+    kind="tester" runs py-evm in-process (no external binary), kind="anvil" needs `anvil` on PATH.
+    """
+
+    def __init__(self, kind="tester"):
+        self.kind = kind
+        self._process = None
+        self._lock = threading.Lock()
+        if kind == "tester":
+            self._start_tester()
+        elif kind == "anvil":
+            self._start_anvil()
+        else:
+            raise ValueError(f"Unknown chain kind: {kind}")
+        self.front = RpcFront(self._handle)
+        self.web3 = Web3(Web3.HTTPProvider(self.front.url))
+        self.chain_id = self.web3.eth.chain_id
+        self.deployer = self.web3.eth.accounts[0]
+
+    def _start_tester(self):
+        from eth_tester import EthereumTester, PyEVMBackend
+        from web3.providers.eth_tester import EthereumTesterProvider
+        backend = PyEVMBackend(genesis_parameters=PyEVMBackend.generate_genesis_params(
+            overrides={"gas_limit": 100_000_000}
+        ))
+        self.tester = EthereumTester(backend)
+        # Requests go through web3's own eth-tester formatting so the front speaks plain JSON-RPC
+        self._tester_web3 = Web3(EthereumTesterProvider(self.tester))
+        # Blocks stay far below the gas target, so a few empty blocks bring the base fee under 0.1 gwei
+        self.tester.mine_blocks(40)
+
+    def _start_anvil(self):
+        if not shutil.which("anvil"):
+            raise RuntimeError("anvil not found on PATH (install foundry or use --chain tester)")
+        self.anvil_port = free_port()
+        self._process = subprocess.Popen(
+            ["anvil", "--port", str(self.anvil_port), "--chain-id", "56", "--block-base-fee-per-gas", "0",
+             "--gas-limit", "100000000", "--balance", "10000000", "--silent"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        self.anvil_url = f"http://127.0.0.1:{self.anvil_port}"
+        self._session = requests.Session()
+        for _ in range(100):
+            try:
+                self._session.post(self.anvil_url, json={"jsonrpc": "2.0", "id": 1, "method": "eth_chainId"})
+                return
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        raise RuntimeError("anvil did not start")
+
+    def _handle(self, request):
+        if self.kind == "anvil":
+            return self._session.post(self.anvil_url, json=request).json()
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            # eth-tester is not thread safe
+            with self._lock:
+                result = self._tester_web3.manager.request_blocking(request["method"], request.get("params", []))
+            response["result"] = json.loads(Web3.to_json(result))
+        except ContractLogicError as e:
+            response["error"] = {"code": 3, "message": str(e.message or e), "data": e.data}
+        except Exception as e:
+            response["error"] = {"code": -32000, "message": str(e)}
+        return response
+
+    def deploy(self, name, *args):
+        abi, bytecode = compile_contract(name)
+        factory = self.web3.eth.contract(abi=abi, bytecode=bytecode)
+        receipt = self.web3.eth.wait_for_transaction_receipt(
+            factory.constructor(*args).transact({"from": self.deployer})
+        )
+        return self.web3.eth.contract(address=receipt.contractAddress, abi=abi)
+
+    def deploy_mocks(self, liquidity_usdt=6_000_000, liquidity_bnb=10_000):
+        """Deploy USDT, a USDT/BNB pool behind the router interface and the prediction contract"""
+        self.usdt = self.deploy("MockUSDT")
+        self.router = self.deploy("MockRouter", self.usdt.address, WBNB)
+        self.prediction = self.deploy("MockPrediction", ROUND_INTERVAL, TREASURY_FEE)
+        self.transact(self.usdt.functions.mint(self.deployer, liquidity_usdt * 10 ** 18))
+        self.transact(self.usdt.functions.approve(self.router.address, 2 ** 256 - 1))
+        self.transact(self.router.functions.addLiquidity(liquidity_usdt * 10 ** 18),
+                      value=liquidity_bnb * 10 ** 18)
+
+    def transact(self, function, value=0):
+        tx_hash = function.transact({"from": self.deployer, "value": value})
+        return self.web3.eth.wait_for_transaction_receipt(tx_hash)
+
+    def fund(self, address, bnb_wei=0, usdt_wei=0):
+        if bnb_wei:
+            self.web3.eth.wait_for_transaction_receipt(self.web3.eth.send_transaction(
+                {"from": self.deployer, "to": address, "value": bnb_wei}
+            ))
+        if usdt_wei:
+            self.transact(self.usdt.functions.mint(address, usdt_wei))
+
+    def execute_round(self, price):
+        """Operator step: lock the current round, close the previous one, start the next
+
+        The mock has no timer - the locked round's lockTimestamp and the closed round's
+        closeTimestamp are set to the current block, so benchmarks never wait on wall time.
+        """
+        self.transact(self.prediction.functions.executeRound(price))
+
+    def env(self):
+        """Environment that points manager_Version4 at this chain"""
+        return {
+            "BSC_RPC_URL": self.front.url,
+            "BSC_CHAIN_ID": str(self.chain_id),
+            "PREDICTION_CONTRACT": self.prediction.address,
+            "USDT_CONTRACT": self.usdt.address,
+            "PANCAKE_ROUTER": self.router.address,
+        }
+
+    def close(self):
+        self.front.close()
+        if self._process:
+            self._process.terminate()
+            self._process.wait()
@@ -0,0 +1,972 @@
+"""Offline end-to-end benchmarks: the real managers against a local chain and a fake Telegram API
+
+    python benchmarks/run_benchmarks.py                        # eth-tester chain, scales 10 100 1000
+    python benchmarks/run_benchmarks.py --scales 10 100 --chain anvil
+    python benchmarks/run_benchmarks.py --compare              # diff the last two stored runs
+
+Every run is appended to benchmarks/results.jsonl together with the git commit, so changes
+can be compared over time. RPC calls per item are checked against benchmarks/rpc_budgets.json
+and the run exits non-zero when a scenario goes over budget.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from eth_account import Account
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from local_chain import LocalChain, RpcFront, free_port  # noqa: E402
+from fake_telegram import FakeTelegram  # noqa: E402
+
+RESULTS_FILE = os.path.join(BENCH_DIR, "results.jsonl")
+BUDGETS_FILE = os.path.join(BENCH_DIR, "rpc_budgets.json")
+DEFAULT_SCALES = [10, 100, 1000]
+ETHER = 10 ** 18
+
+
+class Bench:
+    """Shared state for one benchmark run"""
+
+    def __init__(self, chain, telegram, workdir, verbose, budgets=None):
+        self.chain = chain
+        self.telegram = telegram
+        self.workdir = workdir
+        self.verbose = verbose
+        self.budgets = budgets or {}
+        self.violations = []
+        self.results = {}
+        self.price = 30_000_000_000
+
+        self.main_account = Account.create()
+        chain.fund(self.main_account.address, bnb_wei=100_000 * ETHER, usdt_wei=10_000_000 * ETHER)
+        chain.execute_round(self.price)
+
+        os.environ.update(chain.env())
+        os.environ.update(telegram.env())
+        os.environ["MAIN_PRIVATE_KEY"] = self.main_account.key.to_0x_hex()
+        os.environ["MAIN_WALLET_ADDRESS"] = self.main_account.address
+        import manager_Version4
+        import async_engine
+        self.manager = manager_Version4
+        self.async_engine = async_engine
+        # Same queue-backed event log as the bot; the console half only when --verbose
+        self.events_file = os.path.join(workdir, "events.jsonl")
+        manager_Version4.setup_logging(log_file=self.events_file, console=verbose)
+
+    @contextlib.contextmanager
+    def quiet(self):
+        if self.verbose:
+            yield
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield
+
+    @contextlib.contextmanager
+    def scenario_dir(self, name):
+        """Each scenario gets its own wallet file"""
+        path = os.path.join(self.workdir, name)
+        os.makedirs(path, exist_ok=True)
+        previous = os.getcwd()
+        os.chdir(path)
+        try:
+            yield
+        finally:
+            os.chdir(previous)
+
+    def measure(self, operation, func, *args, **kwargs):
+        """Run func once under `operation`, returns (result, seconds, rpc calls by label)
+
+        Labels come from the bot's RPC accounting middleware (eth_call split by function).
+        """
+        manager = self.manager
+        before = manager.rpc_accounting.snapshot()
+        start = time.perf_counter()
+        with self.quiet(), manager.operation(operation):
+            result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        return result, elapsed, self.rpc_usage(operation, before)
+
+    def rpc_usage(self, operation, before):
+        usage = self.manager.rpc_accounting.usage_since(operation, before)
+        return {label: calls for label, (calls, _) in usage.items()}
+
+    def gas_used_since(self, block_number):
+        """Gas of every transaction mined after block_number - the local chain only carries ours"""
+        web3 = self.chain.web3
+        return sum(
+            web3.eth.get_transaction_receipt(tx_hash)["gasUsed"]
+            for number in range(block_number + 1, web3.eth.block_number + 1)
+            for tx_hash in web3.eth.get_block(number)["transactions"]
+        )
+
+    def new_wallets(self, count, bnb_wei=0):
+        wallet_manager = self.manager.WalletManager()
+        with self.quiet():
+            wallet_manager.create_wallets_bulk(count)
+        for wallet in wallet_manager.wallets:
+            self.chain.fund(wallet["address"], bnb_wei=bnb_wei)
+        return wallet_manager
+
+    def record(self, name, elapsed, calls, items=1, **extra):
+        total_calls = sum(calls.values())
+        self.results[name] = {
+            "seconds": round(elapsed, 4),
+            "items": items,
+            "per_second": round(items / elapsed, 2) if elapsed else None,
+            "rpc_calls": total_calls,
+            "rpc_calls_per_item": round(total_calls / items, 2),
+            "rpc_methods": dict(sorted(calls.items())),
+            **extra,
+        }
+        gas = f"  {extra['gas_used'] / items:,.0f} gas/item" if "gas_used" in extra else ""
+        print(f"  {name:<28} {elapsed:9.3f}s  {total_calls:7d} RPC  "
+              f"({total_calls / items:.1f}/item, {items / elapsed:.1f} items/s){gas}")
+        self.check_budget(name, calls, items)
+
+    def check_budget(self, name, calls, items):
+        """Compare per-item RPC calls with rpc_budgets.json (keyed by scenario without the scale suffix)"""
+        budget = self.budgets.get(re.sub(r"_\d+$", "", name))
+        if not budget:
+            return
+        per_item = {label: count / items for label, count in calls.items()}
+        per_item["total"] = sum(calls.values()) / items
+        for label, limit in budget.items():
+            used = per_item.get(label, 0)
+            if used > limit:
+                self.violations.append(f"{name}: {label} {used:.2f}/item > budget {limit}")
+                print(f"  ❌ over budget: {label} {used:.2f}/item (budget {limit})")
+
+
+def bench_bet_latency(bench, iterations):
+    """/bet end to end: message queued on the fake Telegram -> 'BET PLACED' reply sent"""
+    manager = bench.manager
+    with bench.scenario_dir("bet"):
+        wallet_manager = bench.new_wallets(iterations)
+        bench.chain.execute_round(bench.price)
+        # What the bot's status refresher keeps warm: the chain clock, the current round and the swap pair
+        manager.chain_clock.sync(timeout=0)
+        manager.round_tracker.refresh(force=True)
+        manager.swap_pair(manager.USDT_CONTRACT, manager.WBNB)
+
+        stop = threading.Event()
+
+        def telegram_monitor():
+            while not stop.is_set():
+                manager.check_telegram_commands()
+
+        latencies = []
+        calls_per_bet = []
+        rpc_before = manager.rpc_accounting.snapshot()
+        with bench.quiet():
+            monitor = threading.Thread(target=telegram_monitor, daemon=True)
+            monitor.start()
+            for i in range(iterations):
+                wallet_number = len(wallet_manager.wallets) - iterations + i + 1
+                direction = "up" if i % 2 else "down"
+                mark = len(bench.telegram.sent)
+                before = bench.chain.front.snapshot()
+                queued_at = bench.telegram.push_message(f"/bet {wallet_number}/50/{direction}")
+                reply = bench.telegram.wait_for(lambda text: "BET PLACED" in text or "❌" in text, mark)
+                if reply is None or "BET PLACED" not in reply[0]:
+                    raise RuntimeError(f"/bet did not complete: {reply}")
+                latencies.append(reply[1] - queued_at)
+                calls = bench.chain.front.snapshot()
+                calls.subtract(before)
+                calls_per_bet.append(sum(calls.values()))
+            stop.set()
+            monitor.join()
+        bet_calls = bench.rpc_usage("bet", rpc_before)
+
+    latencies.sort()
+    bench.results["bet_latency"] = {
+        "iterations": iterations,
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1),
+        "rpc_calls_per_bet": round(statistics.mean(calls_per_bet), 1),
+        "rpc_methods": dict(sorted(bet_calls.items())),
+        "stage_p50_ms": {
+            stage: round(p50 * 1000, 1) for stage, p50, _, _ in manager.latency_metrics.percentiles().get("bet", [])
+        },
+    }
+    print(f"  {'bet_latency':<28} p50 {bench.results['bet_latency']['p50_ms']} ms, "
+          f"p95 {bench.results['bet_latency']['p95_ms']} ms, "
+          f"{bench.results['bet_latency']['rpc_calls_per_bet']} RPC/bet")
+    print("    stages (p50 ms): " + ", ".join(
+        f"{stage} {ms}" for stage, ms in bench.results["bet_latency"]["stage_p50_ms"].items()
+    ))
+    bench.check_budget("bet_latency", bet_calls, iterations)
+
+
+def bench_bet_admission(bench):
+    """/bet commands admission control must turn away: a stale message and one too close to lock
+
+    Records the time to the rejection reply; the RPC budget checks no transaction was sent.
+    """
+    manager = bench.manager
+    stop = threading.Event()
+
+    def telegram_monitor():
+        while not stop.is_set():
+            manager.check_telegram_commands()
+
+    with bench.scenario_dir("bet"):
+        monitor = threading.Thread(target=telegram_monitor, daemon=True)
+        monitor.start()
+        margin = manager.ADMISSION_MARGIN
+        try:
+            cases = {
+                "stale": {"date": time.time() - 3600},
+                "too_late": {},  # every round is too short once the margin exceeds the round interval
+            }
+            for case, message in cases.items():
+                manager.ADMISSION_MARGIN = 10 ** 6 if case == "too_late" else margin
+                mark = len(bench.telegram.sent)
+                before = manager.rpc_accounting.snapshot()
+                queued_at = bench.telegram.push_message("/bet 1/50/up", **message)
+                reply = bench.telegram.wait_for(lambda text: "❌" in text or "BET PLACED" in text, mark)
+                if reply is None or "BET PLACED" in reply[0]:
+                    raise RuntimeError(f"admission let a {case} /bet through: {reply}")
+                bench.record(f"bet_admission_{case}", reply[1] - queued_at, bench.rpc_usage("bet", before))
+        finally:
+            manager.ADMISSION_MARGIN = margin
+            stop.set()
+            monitor.join()
+
+
+def bench_telegram_fairness(bench, burst=6):
+    """Two operators in the bot's chat: A queues `burst` /bet at once, B one right after
+
+    In arrival order B would wait for all of A's bets; served round-robin, B's bet should finish
+    no later than A's second. Also checks that a stranger's /bet is ignored, and that a flood from
+    one user is cut at TELEGRAM_USER_BURST with a single reply.
+    """
+    manager = bench.manager
+    router = manager.telegram_router
+    operator_a, operator_b, flooder, stranger = 1001, 1002, 1003, 777
+    with bench.scenario_dir("telegram_fairness"):
+        wallet_manager = bench.new_wallets(burst + 1)
+        bench.chain.execute_round(bench.price)
+        manager.chain_clock.sync(timeout=0)
+        manager.round_tracker.refresh(force=True)
+
+        stop = threading.Event()
+
+        def telegram_monitor():
+            while not stop.is_set():
+                manager.check_telegram_commands()
+
+        done = lambda text: "BET PLACED" in text or text.startswith("❌")
+        stats_before = dict(router.status())
+        rpc_before = manager.rpc_accounting.snapshot()
+        with bench.quiet():
+            monitor = threading.Thread(target=telegram_monitor, daemon=True)
+            monitor.start()
+            try:
+                mark = len(bench.telegram.sent)
+                bench.telegram.push_message("/bet 1/50/up", chat_id=stranger, user_id=stranger)
+                queued_at = None
+                for i in range(burst):
+                    at = bench.telegram.push_message(f"/bet {i + 1}/50/{'up' if i % 2 else 'down'}",
+                                                     user_id=operator_a)
+                    queued_at = queued_at or at
+                bench.telegram.push_message(f"/bet {burst + 1}/50/up", user_id=operator_b)
+                deadline = time.time() + 60
+                while (sum(done(text) for text, _, _ in bench.telegram.sent[mark:]) < burst + 1
+                       and time.time() < deadline):
+                    time.sleep(0.05)
+                replies = [(text, sent_at) for text, _, sent_at in bench.telegram.sent[mark:] if done(text)]
+                stranger_replies = [text for text, chat_id, _ in bench.telegram.sent if chat_id == str(stranger)]
+
+                flood_mark = len(bench.telegram.sent)
+                for _ in range(manager.TELEGRAM_USER_BURST + 3):
+                    bench.telegram.push_message("/bet 9999/1/up", user_id=flooder)
+                expected = manager.TELEGRAM_USER_BURST + 1  # "invalid wallet" for each queued one, one "slow down"
+                deadline = time.time() + 30
+                while len(bench.telegram.sent) - flood_mark < expected and time.time() < deadline:
+                    time.sleep(0.05)
+                time.sleep(0.2)  # anything beyond the expected replies would show up by now
+                flood_replies = [text for text, _, _ in bench.telegram.sent[flood_mark:]]
+            finally:
+                stop.set()
+                monitor.join()
+        calls = bench.rpc_usage("bet", rpc_before)
+
+    b_name = wallet_manager.wallets[burst]["name"]
+    placed = [(text, sent_at) for text, sent_at in replies if "BET PLACED" in text]
+    if len(placed) != burst + 1:
+        raise RuntimeError(f"only {len(placed)}/{burst + 1} /bet placed: {[text for text, _ in replies]}")
+    b_position = next(i for i, (text, _) in enumerate(placed) if b_name in text)
+    a_latencies = sorted(sent_at - queued_at for text, sent_at in placed if b_name not in text)
+    stats = {key: value - stats_before.get(key, 0) for key, value in router.status().items()}
+    bench.record(f"telegram_fair_{burst}", placed[-1][1] - queued_at, calls, burst + 1,
+                 b_ms=round((placed[b_position][1] - queued_at) * 1000, 1), b_position=b_position,
+                 a_p50_ms=round(statistics.median(a_latencies) * 1000, 1),
+                 a_max_ms=round(a_latencies[-1] * 1000, 1),
+                 refused=stats["refused"], limited=stats["limited"],
+                 flood_warnings=sum(text.startswith("⏳") for text in flood_replies))
+    result = bench.results[f"telegram_fair_{burst}"]
+    print(f"    operator B finished {b_position + 1}/{burst + 1} after {result['b_ms']} ms "
+          f"(A p50 {result['a_p50_ms']} ms), {result['refused']} refused, {result['limited']} rate-limited")
+    if b_position > 1:
+        bench.violations.append(f"telegram_fair_{burst}: operator B served after {b_position} of A's bets")
+    if stats["refused"] != 1 or stranger_replies:
+        bench.violations.append(f"telegram_fair_{burst}: stranger's /bet not refused silently")
+    if stats["limited"] != 3 or result["flood_warnings"] != 1 or len(flood_replies) != expected:
+        bench.violations.append(f"telegram_fair_{burst}: flood not cut at TELEGRAM_USER_BURST "
+                                f"({stats['limited']} limited, {len(flood_replies)} replies)")
+
+
+def bench_drain(bench, scale):
+    manager = bench.manager
+    main_address = bench.main_account.address
+    with bench.scenario_dir(f"drain_{scale}"):
+        wallet_manager = bench.new_wallets(scale, bnb_wei=ETHER // 100)
+        _, elapsed, calls = bench.measure("drain", manager.drain_all_wallets, wallet_manager, main_address)
+        bench.record(f"drain_sync_{scale}", elapsed, calls, scale)
+
+        for wallet in wallet_manager.wallets:
+            bench.chain.fund(wallet["address"], bnb_wei=ETHER // 100)
+        manager.balance_cache.invalidate(*[wallet["address"] for wallet in wallet_manager.wallets])
+
+        async def drain_async():
+            chain = bench.async_engine.AsyncChain()
+            try:
+                return await bench.async_engine.drain_all_wallets_async(chain, wallet_manager, main_address)
+            finally:
+                await chain.close()
+
+        _, elapsed, calls = bench.measure("drain", asyncio.run, drain_async())
+        bench.record(f"drain_async_{scale}", elapsed, calls, scale)
+
+
+def bench_drain_throttled(bench, scale, max_rps):
+    """Drain against an endpoint that answers 429 above max_rps: every wallet must still be drained"""
+    manager = bench.manager
+    limiter = manager.rpc_limiter
+    with bench.scenario_dir(f"drain_throttled_{scale}"):
+        wallet_manager = bench.new_wallets(scale, bnb_wei=ETHER // 100)
+        before = dict(rejected=bench.chain.front.rejected, retries=limiter.retries)
+        bench.chain.front.max_rps = max_rps
+        try:
+            _, elapsed, calls = bench.measure("drain", manager.drain_all_wallets, wallet_manager,
+                                              bench.main_account.address)
+        finally:
+            bench.chain.front.max_rps = None
+        learned_rps = limiter.bucket.rate
+        # The learned cap would otherwise carry over into the unthrottled scenarios after this one
+        limiter.bucket.set_rate(manager.RPC_CREDITS_PER_SECOND)
+        drained = sum(1 for wallet in wallet_manager.wallets
+                      if bench.chain.web3.eth.get_balance(wallet["address"]) < ETHER // 1000)
+        bench.record(f"drain_throttled_{scale}", elapsed, calls, scale, max_rps=max_rps, drained=drained,
+                     http_429=bench.chain.front.rejected - before["rejected"],
+                     retries=limiter.retries - before["retries"],
+                     concurrency_limit=round(limiter.concurrency.limit, 1), learned_rps=round(learned_rps, 1))
+        if drained < scale:
+            bench.violations.append(f"drain_throttled_{scale}: only {drained}/{scale} wallets drained")
+            print(f"  ❌ only {drained}/{scale} wallets drained under throttling")
+
+
+def bench_distribute(bench, scale):
+    """Equal funding of `scale` wallets: one transfer per wallet (sync and async) vs the disperse contract"""
+    manager = bench.manager
+    main_address = bench.main_account.address
+    if not manager.DISPERSE_CONTRACT:
+        with bench.quiet():
+            manager.deploy_disperse_contract()
+    with bench.scenario_dir(f"distribute_{scale}"):
+        wallet_manager = bench.new_wallets(scale)
+        web3 = bench.chain.web3
+
+        def run(name, fn, *args, **kwargs):
+            # Same integer-wei split as manager.distribute_wealth; every wallet must receive exactly that
+            main_balance = web3.eth.get_balance(main_address)
+            value = (main_balance * 95 // 100 - manager.DISTRIBUTE_GAS_RESERVE_WEI * scale) // scale
+            before = [web3.eth.get_balance(wallet["address"]) for wallet in wallet_manager.wallets]
+            start_block = web3.eth.block_number
+            _, elapsed, calls = bench.measure("distribute", fn, *args, **kwargs)
+            bench.record(f"{name}_{scale}", elapsed, calls, scale, gas_used=bench.gas_used_since(start_block))
+            short = sum(1 for wallet, balance in zip(wallet_manager.wallets, before)
+                        if web3.eth.get_balance(wallet["address"]) - balance != value)
+            if short:
+                bench.violations.append(f"{name}_{scale}: {short}/{scale} wallets did not receive their share")
+                print(f"  ❌ {short}/{scale} wallets did not receive their share")
+            # distribute sends 95% of the main wallet away - top it up for the next run
+            bench.chain.fund(main_address, bnb_wei=100_000 * ETHER)
+            manager.balance_cache.invalidate(main_address)
+
+        run("distribute_sync", manager.distribute_wealth, wallet_manager, main_address, confirm=False)
+
+        async def distribute_async():
+            chain = bench.async_engine.AsyncChain()
+            try:
+                return await bench.async_engine.distribute_wealth_async(chain, wallet_manager, main_address)
+            finally:
+                await chain.close()
+
+        run("distribute_async", lambda: asyncio.run(distribute_async()))
+        run("distribute_disperse", manager.distribute_wealth, wallet_manager, main_address,
+            confirm=False, disperse=True)
+
+
+def bench_rebalance(bench, scale, target=ETHER // 100):
+    """Fleet at mixed balances to one target: a quarter above it, a quarter below, half already on it
+
+    Only the wallets off target get a transfer; a second run finds nothing to do and costs just the
+    batched balance reads. Fails the run if any wallet ends up outside the tolerance.
+    """
+    manager = bench.manager
+    main_address = bench.main_account.address
+    tolerance = manager.REBALANCE_TOLERANCE_WEI
+    with bench.scenario_dir(f"rebalance_{scale}"):
+        wallet_manager = bench.new_wallets(scale)
+        for i, wallet in enumerate(wallet_manager.wallets):
+            bench.chain.fund(wallet["address"], bnb_wei=(target // 2, target * 3 // 2, target, target + tolerance // 2)[i % 4])
+        manager.balance_cache.invalidate(*[wallet["address"] for wallet in wallet_manager.wallets])
+
+        for name in (f"rebalance_{scale}", f"rebalance_noop_{scale}"):
+            start_block = bench.chain.web3.eth.block_number
+            result, elapsed, calls = bench.measure("rebalance", manager.rebalance_wallets, wallet_manager,
+                                                   main_address, target, confirm=False)
+            bench.record(name, elapsed, calls, scale, transfers=result["drained"] + result["topped_up"],
+                         untouched=result["untouched"], gas_used=bench.gas_used_since(start_block))
+        off_target = sum(1 for wallet in wallet_manager.wallets
+                         if abs(bench.chain.web3.eth.get_balance(wallet["address"]) - target) > tolerance)
+        if off_target:
+            bench.violations.append(f"rebalance_{scale}: {off_target}/{scale} wallets off target")
+            print(f"  ❌ {off_target}/{scale} wallets off target after rebalance")
+
+
+def bench_swap_batching(bench, count=5):
+    """`count` /bet swaps arriving together: one router swap each vs one coalesced swap + one disperse
+
+    Latency per command is from the moment all of them were queued until its own BNB arrived.
+    """
+    manager = bench.manager
+    if not manager.DISPERSE_CONTRACT:
+        with bench.quiet():
+            manager.deploy_disperse_contract()
+    usdt = 20
+    with bench.scenario_dir("swap_batching"):
+        wallet_manager = bench.new_wallets(2 * count)
+        individual, batched = wallet_manager.wallets[:count], wallet_manager.wallets[count:]
+
+        def run(name, wallets, swap):
+            latencies = [None] * len(wallets)
+            start = time.perf_counter()
+
+            def one(i):
+                if not swap(usdt, wallets[i]["address"]):
+                    raise RuntimeError(f"{name}: swap to {wallets[i]['name']} failed")
+                latencies[i] = time.perf_counter() - start
+
+            before = bench.chain.front.snapshot()
+            start_block = bench.chain.web3.eth.block_number
+            with bench.quiet():
+                list(manager.fan_out(one, range(len(wallets)), workers=len(wallets)))
+            elapsed = time.perf_counter() - start
+            calls = bench.chain.front.snapshot()
+            calls.subtract(before)
+            gas_used = bench.gas_used_since(start_block)
+            funded = sum(bench.chain.web3.eth.get_balance(wallet["address"]) > 0 for wallet in wallets)
+            latencies.sort()
+            bench.record(name, elapsed, {method: n for method, n in calls.items() if n}, len(wallets),
+                         p50_ms=round(statistics.median(latencies) * 1000, 1), max_ms=round(latencies[-1] * 1000, 1),
+                         gas_used=gas_used, funded=funded)
+
+        swap_manager = manager.SwapManager()
+
+        def swap_individually(usdt_amount, address):
+            with manager.transaction_lock:  # what Telegram bets do without batching
+                return swap_manager.swap_usdt_to_bnb(usdt_amount, address)
+
+        run(f"swap_individual_{count}", individual, swap_individually)
+        batcher = manager.SwapBatcher(window=0.05)
+        run(f"swap_batched_{count}", batched, batcher.swap)
+
+
+def bench_swap_slippage(bench, count=20, usdt=20, trade_usdt=6000, trade_interval=0.02):
+    """Swaps while another trader keeps moving the pool: the old fixed 0.1% min_out without retries,
+    the same 0.1% with re-quoted retries, and the default SWAP_SLIPPAGE_BUFFER below the quote with
+    retries
+
+    The trader swaps about 0.1% of the pool either way every `trade_interval` seconds, so the
+    price moves between a quote and its swap. Records reverted transactions per swap sent, swaps
+    that never went through and latency per swap.
+    """
+    manager = bench.manager
+    chain = bench.chain
+    path_in, path_out = [chain.usdt.address, manager.WBNB], [manager.WBNB, chain.usdt.address]
+    trade_bnb = trade_usdt * ETHER * chain.router.functions.reserveBnb().call() // chain.router.functions.reserveUsdt().call()
+    chain.transact(chain.usdt.functions.mint(chain.deployer, 1000 * trade_usdt * ETHER))
+    policies = {
+        "fixed": {"SWAP_SLIPPAGE_BUFFER": 0.001, "SWAP_RETRIES": 0},
+        "requote": {"SWAP_SLIPPAGE_BUFFER": 0.001, "SWAP_RETRIES": manager.SWAP_RETRIES},
+        "buffer": {"SWAP_SLIPPAGE_BUFFER": manager.SWAP_SLIPPAGE_BUFFER, "SWAP_RETRIES": manager.SWAP_RETRIES},
+    }
+    defaults = {name: getattr(manager, name) for name in policies["buffer"]}
+    with bench.scenario_dir("swap_slippage"):
+        wallet_manager = bench.new_wallets(count * len(policies))
+        stop = threading.Event()
+
+        def trader():
+            rng = random.Random(7)
+            while not stop.wait(trade_interval):
+                if rng.random() < 0.5:
+                    chain.transact(chain.router.functions.swapExactTokensForETH(
+                        trade_usdt * ETHER, 0, path_in, chain.deployer, 2 ** 63), 0)
+                else:
+                    chain.transact(chain.router.functions.swapExactETHForTokens(
+                        0, path_out, chain.deployer, 2 ** 63), trade_bnb)
+
+        market = threading.Thread(target=trader, daemon=True)
+        market.start()
+        swap_manager = manager.SwapManager()
+        try:
+            for index, (policy, settings) in enumerate(policies.items()):
+                wallets = wallet_manager.wallets[index * count:(index + 1) * count]
+                for name, value in settings.items():
+                    setattr(manager, name, value)
+                stats_before = dict(manager.swap_stats)
+                rpc_before = manager.rpc_accounting.snapshot()
+                latencies, failed = [], 0
+                start = time.perf_counter()
+                with bench.quiet(), manager.operation("swap_slippage"):
+                    for wallet in wallets:
+                        swap_start = time.perf_counter()
+                        if swap_manager.swap_usdt_to_bnb_receipt(usdt, wallet["address"]) is None:
+                            failed += 1
+                        latencies.append(time.perf_counter() - swap_start)
+                elapsed = time.perf_counter() - start
+                stats = {key: manager.swap_stats[key] - stats_before.get(key, 0) for key in ("sent", "reverted")}
+                latencies.sort()
+                bench.record(f"swap_slippage_{policy}_{count}", elapsed, bench.rpc_usage("swap_slippage", rpc_before),
+                             count, sent=stats["sent"], reverted=stats["reverted"],
+                             revert_rate=round(stats["reverted"] / stats["sent"], 3) if stats["sent"] else 0.0,
+                             failed=failed, p50_ms=round(statistics.median(latencies) * 1000, 1),
+                             p95_ms=round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+                             max_ms=round(latencies[-1] * 1000, 1))
+                print(f"    {stats['reverted']}/{stats['sent']} swaps reverted, {failed}/{count} failed")
+        finally:
+            for name, value in defaults.items():
+                setattr(manager, name, value)
+            stop.set()
+            market.join()
+    if bench.results[f"swap_slippage_buffer_{count}"]["failed"]:
+        bench.violations.append(f"swap_slippage_buffer_{count}: swaps failed despite re-quoting")
+
+
+def bench_broadcast(bench, count=10):
+    """Signed transfers sent to one slow relay vs fanned out to local stand-ins: slow, fast,
+    medium and one that is down
+
+    Like real nodes that heard the transaction over gossip, the relays answer "already known" for a
+    transaction the chain already has.
+    """
+    manager = bench.manager
+    chain = bench.chain
+
+    def relay(delay):
+        def handle(request):
+            time.sleep(delay)
+            response = chain._handle(request)
+            if "nonce" in response.get("error", {}).get("message", "").lower():
+                response["error"]["message"] = "already known"
+            return response
+        return handle
+
+    fronts = [RpcFront(relay(0.2)), RpcFront(relay(0.01)), RpcFront(relay(0.05))]
+    slow, fast, medium = (front.url for front in fronts)
+    down = f"http://127.0.0.1:{free_port()}"
+    try:
+        with bench.scenario_dir("broadcast"):
+            wallet_manager = bench.new_wallets(1, bnb_wei=ETHER)
+            wallet = wallet_manager.wallets[0]
+            signer = manager.get_signer(wallet)
+            nonce = chain.web3.eth.get_transaction_count(wallet["address"])
+            for name, urls in (("broadcast_single", [slow]), ("broadcast_multi", [slow, fast, medium, down])):
+                broadcaster = manager.Broadcaster(urls, include_primary=False)
+                latencies = []
+                before = sum(front.snapshot()["eth_sendRawTransaction"] for front in fronts)
+                for _ in range(count):
+                    signed_tx = signer.sign_transaction({
+                        "to": bench.main_account.address, "value": 1, "gas": 21000,
+                        "gasPrice": manager.web3.to_wei("0.1", "gwei"), "nonce": nonce, "chainId": manager.CHAIN_ID,
+                    })
+                    nonce += 1
+                    start = time.perf_counter()
+                    with bench.quiet():
+                        tx_hash = broadcaster.send(signed_tx)
+                    latencies.append(time.perf_counter() - start)
+                    if chain.web3.eth.wait_for_transaction_receipt(tx_hash).status != 1:
+                        raise RuntimeError(f"{name}: transfer reverted")
+                    broadcaster.included(tx_hash)
+                time.sleep(0.3)  # let the slow relay answer so its stats are complete
+                sends = sum(front.snapshot()["eth_sendRawTransaction"] for front in fronts) - before
+                latencies.sort()
+                endpoints = {
+                    {slow: "slow", fast: "fast", medium: "medium", down: "down"}[url]: stats
+                    for url, stats in zip(urls, broadcaster.status().values())
+                }
+                bench.record(name, sum(latencies), {"eth_sendRawTransaction": sends}, count,
+                             p50_ms=round(statistics.median(latencies) * 1000, 1),
+                             max_ms=round(latencies[-1] * 1000, 1), endpoints=endpoints)
+                print("    first accepted / included: " + ", ".join(
+                    f"{label} {stats['first']}/{stats['included']}" for label, stats in endpoints.items()
+                ))
+    finally:
+        for front in fronts:
+            front.close()
+
+
+def bench_profiling(bench, scale=20):
+    """Drain of `scale` wallets with profiling off, under a cProfile session and under the sampler
+
+    Records each run's overhead against the unprofiled one and checks that the dump reached the
+    drain code.
+    """
+    manager = bench.manager
+    main_address = bench.main_account.address
+    with bench.scenario_dir("profiling"):
+        wallet_manager = bench.new_wallets(scale)
+        baseline = None
+        for mode in (None, "cprofile", "sampling"):
+            for wallet in wallet_manager.wallets:
+                bench.chain.fund(wallet["address"], bnb_wei=ETHER // 100)
+            manager.balance_cache.invalidate(*[wallet["address"] for wallet in wallet_manager.wallets])
+            if mode:
+                manager.profiler.start(mode)
+            _, elapsed, calls = bench.measure("drain", manager.drain_all_wallets, wallet_manager, main_address)
+            extra = {}
+            if mode:
+                path, _ = manager.profiler.stop()
+                with open(path, encoding="utf-8") as f:
+                    extra["found_drain"] = "drain_all_wallets" in f.read()
+                extra["overhead_pct"] = round((elapsed / baseline - 1) * 100, 1)
+                if not extra["found_drain"]:
+                    bench.violations.append(f"profile_{mode}: drain_all_wallets missing from the dump")
+            else:
+                baseline = elapsed
+            bench.record(f"profile_{mode or 'off'}", elapsed, calls, scale, **extra)
+
+
+def bench_signing(bench, count):
+    """Bulk signing of `count` transfers from `count` wallets: inline, then the pool at 2, 4... workers
+
+    Pure CPU - no RPC. Every pool run must produce byte-identical transactions to the inline one.
+    sign_transactions never starts a one-worker pool, so there is no w1 run.
+    """
+    manager = bench.manager
+    signers = [signer for _, signer in manager.generate_wallet_keys(count)]
+    items = [(signer, {'to': bench.main_account.address, 'value': 10 ** 15, 'gas': 21000,
+                       'gasPrice': 10 ** 8, 'nonce': 0, 'chainId': bench.chain.chain_id})
+             for signer in signers]
+
+    start = time.perf_counter()
+    expected = [bytes(signer.sign_transaction(tx).raw_transaction) for signer, tx in items]
+    bench.record("signing_inline", time.perf_counter() - start, {}, count)
+
+    cpus = os.cpu_count() or 1
+    workers = 2
+    while True:
+        start = time.perf_counter()
+        signed = [bytes(signed_tx.raw_transaction) for signed_tx in manager.sign_transactions(items, workers)]
+        bench.record(f"signing_pool_w{workers}", time.perf_counter() - start, {}, count, workers=workers, cpus=cpus)
+        if signed != expected:
+            bench.violations.append(f"signing_pool_w{workers}: signed transactions differ from inline signing")
+        if workers >= max(cpus, 2):
+            break
+        workers = min(workers * 2, max(cpus, 2))
+
+
+def bench_reward_scan(bench, wallets=10, rounds=5):
+    """Every wallet bets in `rounds` consecutive rounds, then each wallet's claimable scan is timed"""
+    manager = bench.manager
+    betting_manager = manager.BettingManager()
+    reward_manager = manager.RewardManager()
+    with bench.scenario_dir("rewards"):
+        wallet_manager = bench.new_wallets(wallets, bnb_wei=ETHER)
+        with bench.quiet():
+            for round_number in range(rounds):
+                bench.chain.execute_round(bench.price)
+                for i, wallet in enumerate(wallet_manager.wallets):
+                    betting_manager.place_bet(wallet, "up" if (i + round_number) % 2 else "down", 0.01)
+            # lock the last betting round, then close it so every bet is settled
+            bench.price += 1_000_000
+            bench.chain.execute_round(bench.price)
+            bench.chain.execute_round(bench.price)
+
+        def scan():
+            return sum(len(reward_manager.show_claimable_rewards(wallet) or []) for wallet in wallet_manager.wallets)
+
+        found, elapsed, calls = bench.measure("claim", scan)
+        bench.record("reward_scan", elapsed, calls, wallets, claimable_found=found)
+    return wallet_manager
+
+
+def bench_analytics(bench, wallet_manager, synthetic_bets=100_000, synthetic_epochs=5_000):
+    """Fleet P&L over the reward scan's bets - cold (every round fetched) and warm (settled rounds cached)
+
+    The synthetic run times compute_pnl alone on history far bigger than the local chain holds.
+    """
+    import numpy as np
+    import analytics
+
+    with bench.scenario_dir("rewards"):
+        if os.path.exists(analytics.ROUNDS_CACHE_FILE):
+            os.remove(analytics.ROUNDS_CACHE_FILE)
+        wallets = len(wallet_manager.wallets)
+        for name in ("analytics_cold", "analytics_warm"):
+            report, elapsed, calls = bench.measure("analytics", analytics.fleet_pnl, wallet_manager)
+            bench.record(name, elapsed, calls, wallets, bets=int(report["totals"]["bets"]),
+                         compute_ms=round(report["compute_seconds"] * 1000, 3))
+
+    rng = np.random.default_rng(0)
+    epochs = np.arange(1, synthetic_epochs + 1)
+    base = rng.uniform(1, 100, synthetic_epochs)
+    rounds = {
+        "epoch": epochs,
+        "close_ts": epochs * 300,
+        "outcome": rng.choice(np.array([-1, 0, 1], dtype=np.int8), synthetic_epochs, p=[0.49, 0.02, 0.49]),
+        "total": base * rng.uniform(1.5, 3, synthetic_epochs),
+        "reward_base": base,
+        "oracle_called": rng.random(synthetic_epochs) > 0.01,
+    }
+    rounds["reward"] = rounds["total"] * 0.97
+    bets = {
+        "wallet": rng.integers(0, 1000, synthetic_bets, dtype=np.int32),
+        "epoch": rng.integers(1, synthetic_epochs + 1, synthetic_bets),
+        "position": rng.integers(0, 2, synthetic_bets, dtype=np.int8),
+        "amount": rng.uniform(0.001, 1, synthetic_bets),
+        "claimed": rng.random(synthetic_bets) > 0.5,
+    }
+    start = time.perf_counter()
+    analytics.compute_pnl(bets, rounds, 1000, synthetic_epochs * 300 + 1000, 30)
+    elapsed = time.perf_counter() - start
+    bench.record("analytics_compute", elapsed, {}, synthetic_bets, epochs=synthetic_epochs)
+
+
+def bench_auto_claim(bench, wallets=10):
+    """Half of `wallets` win a round: time from its EndRound until the auto-claimer has claimed every win"""
+    manager = bench.manager
+    betting_manager = manager.BettingManager()
+    claimer = manager.AutoClaimer(manager.bet_ledger)
+    claimer.quiet_after_lock = 0  # the mock starts the next round in the block that closes this one
+    manager.bet_ledger.clear()
+    with bench.scenario_dir("auto_claim"):
+        wallet_manager = bench.new_wallets(wallets, bnb_wei=ETHER)
+        with bench.quiet():
+            bench.chain.execute_round(bench.price)
+            epoch = manager.prediction_contract.functions.currentEpoch().call()
+            for i, wallet in enumerate(wallet_manager.wallets):
+                betting_manager.place_bet(wallet, "up" if i % 2 else "down", 0.01)
+            manager.chain_clock.sync(timeout=0)  # the local chain's clock runs ahead of wall time
+            claimer.start(interval=0.1)
+            while claimer._last_block is None:
+                time.sleep(0.01)
+        winners = [wallet for i, wallet in enumerate(wallet_manager.wallets) if i % 2]
+
+        def end_round_and_wait():
+            bench.chain.execute_round(bench.price)  # lock
+            bench.price += 1_000_000
+            bench.chain.execute_round(bench.price)  # close higher -> EndRound, bulls win
+            deadline = time.perf_counter() + 60
+            while claimer.status()["epochs_claimed"] < len(winners) and time.perf_counter() < deadline:
+                time.sleep(0.01)
+
+        try:
+            _, elapsed, calls = bench.measure("auto_claim", end_round_and_wait)
+        finally:
+            with bench.quiet():
+                claimer.stop()
+        prediction = bench.chain.prediction
+        unclaimed = sum(not prediction.functions.ledger(epoch, wallet.address).call()[2] for wallet in winners)
+        bench.record("auto_claim", elapsed, calls, len(winners), unclaimed=unclaimed,
+                     claims_sent=claimer.stats["claims_sent"])
+        if unclaimed:
+            bench.violations.append(f"auto_claim: {unclaimed}/{len(winners)} winning wallets not claimed")
+
+
+def bench_telegram_queries(bench, repeats=20):
+    """/balance, /claimable and /status: message queued -> reply sent, and RPC calls made (should be none)"""
+    manager = bench.manager
+    with bench.quiet():
+        manager.round_tracker.refresh(force=True)
+    stop = threading.Event()
+
+    def telegram_monitor():
+        while not stop.is_set():
+            manager.check_telegram_commands()
+
+    monitor = threading.Thread(target=telegram_monitor, daemon=True)
+    monitor.start()
+    try:
+        for command in manager.TELEGRAM_QUERIES:
+            latencies = []
+            before = bench.chain.front.snapshot()
+            for _ in range(repeats):
+                mark = len(bench.telegram.sent)
+                queued_at = bench.telegram.push_message(command)
+                reply = bench.telegram.wait_for(lambda text: True, mark)
+                if reply is None:
+                    raise RuntimeError(f"{command} got no reply")
+                latencies.append(reply[1] - queued_at)
+            calls = bench.chain.front.snapshot()
+            calls.subtract(before)
+            calls = {method: count for method, count in calls.items() if count}
+            name = f"telegram_{command.lstrip('/')}"
+            build_p50 = {stage: p50 for stage, p50, _, _ in
+                         manager.latency_metrics.percentiles()[command.lstrip('/')]}["build"]
+            bench.record(name, sum(latencies), calls, repeats,
+                         p50_ms=round(statistics.median(latencies) * 1000, 2),
+                         build_p50_ms=round(build_p50 * 1000, 3))
+    finally:
+        stop.set()
+        monitor.join()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def store_results(run, path):
+    with open(path, "a") as f:
+        f.write(json.dumps(run) + "\n")
+
+
+def load_budgets(path):
+    if not path:
+        return {}
+    with open(path) as f:
+        return {scenario: limits for scenario, limits in json.load(f).items() if not scenario.startswith("_")}
+
+
+def load_runs(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare_runs(baseline, current):
+    """Print the change of every shared numeric metric between two stored runs"""
+    print(f"\n📊 {baseline.get('commit')} ({baseline['timestamp']}) → {current.get('commit')} ({current['timestamp']})")
+    for scenario, metrics in current["results"].items():
+        previous = baseline["results"].get(scenario)
+        if not previous:
+            continue
+        for key, value in metrics.items():
+            old = previous.get(key)
+            if key in ("items", "iterations"):
+                continue
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            change = f"{(value - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"  {scenario:<28} {key:<20} {old:>12} → {value:<12} {change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmarks")
+    parser.add_argument("--chain", choices=["tester", "anvil"], default="tester")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="Wallet counts for drain/distribute throughput")
+    parser.add_argument("--bets", type=int, default=10, help="/bet commands for the latency run")
+    parser.add_argument("--output", default=RESULTS_FILE, help="Results file (JSON lines)")
+    parser.add_argument("--compare", action="store_true", help="Only compare the last two stored runs")
+    parser.add_argument("--verbose", action="store_true", help="Show the managers' own output")
+    parser.add_argument("--budgets", default=BUDGETS_FILE, help="RPC call budgets (JSON), '' to skip")
+    parser.add_argument("--throttle-rps", type=int, default=40,
+                        help="Requests/s the RPC front accepts in the throttled drain (0 to skip it)")
+    parser.add_argument("--sign-count", type=int, default=2000,
+                        help="Transactions for the bulk signing run (0 to skip it)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        runs = load_runs(args.output)
+        if len(runs) < 2:
+            print("❌ Need at least two stored runs to compare")
+            return 1
+        compare_runs(runs[-2], runs[-1])
+        return 0
+
+    chain = LocalChain(args.chain)
+    telegram = FakeTelegram()
+    try:
+        print(f"⛓️  Deploying mocks on {args.chain} chain...")
+        chain.deploy_mocks()
+        with tempfile.TemporaryDirectory(prefix="mwpb-bench-") as workdir:
+            bench = Bench(chain, telegram, workdir, args.verbose, load_budgets(args.budgets))
+            print("⏱️  Running benchmarks...")
+            bench_bet_latency(bench, args.bets)
+            bench_bet_admission(bench)
+            bench_telegram_fairness(bench)
+            bench_swap_batching(bench)
+            bench_swap_slippage(bench)
+            bench_broadcast(bench)
+            for scale in args.scales:
+                bench_drain(bench, scale)
+                bench_distribute(bench, scale)
+                bench_rebalance(bench, scale)
+            if args.sign_count:
+                bench_signing(bench, args.sign_count)
+            bench_profiling(bench)
+            if args.throttle_rps:
+                bench_drain_throttled(bench, min(args.scales), args.throttle_rps)
+            reward_wallets = bench_reward_scan(bench)
+            bench_auto_claim(bench)
+            bench_telegram_queries(bench)
+            try:
+                bench_analytics(bench, reward_wallets)
+            except ImportError as e:
+                print(f"  ⚠️ analytics skipped: {e}")
+            bench.manager.stop_logging()
+            with open(bench.events_file, encoding="utf-8") as f:
+                print(f"📝 {sum(1 for _ in f)} events logged")
+    finally:
+        telegram.close()
+        chain.close()
+
+    run = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "chain": args.chain,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "results": bench.results,
+    }
+    store_results(run, args.output)
+    print(f"💾 Results appended to {args.output}")
+
+    previous = [stored for stored in load_runs(args.output)[:-1] if stored.get("chain") == args.chain]
+    if previous:
+        compare_runs(previous[-1], run)
+    if bench.violations:
+        print(f"\n❌ {len(bench.violations)} RPC budget violation(s):")
+        for violation in bench.violations:
+            print(f"  {violation}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,31 @@
+# pragma version ~=0.4.0
+# pragma evm-version paris
+# Funds many wallets with one transaction. Whatever msg.value is left over goes back to the sender.
+# Compiled bytecode and ABI are embedded in manager_Version4.py (DISPERSE_BYTECODE / DISPERSE_ABI).
+
+MAX_RECIPIENTS: constant(uint256) = 500
+
+
+@external
+@payable
+def disperseEther(recipients: DynArray[address, MAX_RECIPIENTS], amounts: DynArray[uint256, MAX_RECIPIENTS]):
+    """Send amounts[i] wei to recipients[i]"""
+    assert len(recipients) == len(amounts), "Length mismatch"
+    total: uint256 = 0
+    for i: uint256 in range(len(recipients), bound=MAX_RECIPIENTS):
+        total += amounts[i]
+        send(recipients[i], amounts[i])
+    assert total <= msg.value, "Not enough value"
+    if self.balance > 0:
+        send(msg.sender, self.balance)
+
+
+@external
+@payable
+def disperseEtherEqual(recipients: DynArray[address, MAX_RECIPIENTS], amount: uint256):
+    """Send the same amount of wei to every recipient"""
+    assert len(recipients) * amount <= msg.value, "Not enough value"
+    for recipient: address in recipients:
+        send(recipient, amount)
+    if self.balance > 0:
+        send(msg.sender, self.balance)
@@ -1,28 +1,99 @@
+import asyncio
+import atexit
+import cProfile
 import json
+import logging
 import os
+import pstats
+import queue
+import random
+import re
+import sys
 import time
+import tracemalloc
 import secrets
+import getpass
+import pickle
 from datetime import datetime
 from web3 import Web3
-from web3.middleware import ExtraDataToPOAMiddleware
+from web3.exceptions import TransactionNotFound
+from web3.logs import DISCARD
+from web3.middleware import ExtraDataToPOAMiddleware, Web3Middleware
 from eth_account import Account
-from dotenv import load_dotenv, find_dotenv
+from eth_utils import function_abi_to_4byte_selector
+from hexbytes import HexBytes
+from dotenv import load_dotenv
 from decimal import Decimal
 import requests
+from aiohttp import ClientConnectionError
 import threading
+import argparse
+import socket
+import socketserver
+from collections import Counter, deque, namedtuple
+from contextlib import ExitStack, contextmanager, nullcontext
+from contextvars import ContextVar, copy_context
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from itertools import repeat
+from urllib.parse import urlparse
 
 # === Config ===
-load_dotenv(find_dotenv())
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# .env from the working directory, else next to this script - no find_dotenv() stack walk
+load_dotenv(os.path.join(os.getcwd(), ".env") if os.path.exists(".env") else os.path.join(BASE_DIR, ".env"))
 
 MAIN_PRIVATE_KEY = os.getenv("MAIN_PRIVATE_KEY")
 MAIN_WALLET_ADDRESS = os.getenv("MAIN_WALLET_ADDRESS")
 
-PREDICTION_CONTRACT = "0x18B2A687610328590Bc8F2e5fEdDe3b582A49cdA"
-USDT_CONTRACT = "0x55d398326f99059fF775485246999027B3197955"
-PANCAKE_ROUTER = "0x10ED43C718714eb63d5aA57B78B54704E256024E"
+PREDICTION_CONTRACT = os.getenv("PREDICTION_CONTRACT", "0x18B2A687610328590Bc8F2e5fEdDe3b582A49cdA")
+USDT_CONTRACT = os.getenv("USDT_CONTRACT", "0x55d398326f99059fF775485246999027B3197955")
+PANCAKE_ROUTER = os.getenv("PANCAKE_ROUTER", "0x10ED43C718714eb63d5aA57B78B54704E256024E")
+CHAIN_ID = int(os.getenv("BSC_CHAIN_ID", "56"))
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+DISPERSE_CONTRACT = os.getenv("DISPERSE_CONTRACT")  # deploy one with: python manager_Version4.py deploy-disperse
+
+# Only what the bot calls or listens to - the admin/owner functions are dropped
+PREDICTION_ABI_NAMES = {
+    "betBear", "betBull", "claim", "claimable", "refundable", "currentEpoch", "rounds", "ledger",
+    "getUserRounds", "getUserRoundsLength", "intervalSeconds", "bufferSeconds", "minBetAmount",
+    "treasuryFee", "paused",
+    "StartRound", "LockRound", "EndRound", "BetBull", "BetBear", "Claim", "RewardsCalculated",
+}
+PREDICTION_ABI_FILE = os.path.join(BASE_DIR, "prediction_abi.json")
+PREDICTION_ABI_CACHE = os.path.join(BASE_DIR, "__pycache__", "prediction_abi.trimmed.pickle")
+
+
+def load_prediction_abi():
+    """Trimmed prediction ABI, cached as a pickle next to the .pyc files
+
+    The cache is rebuilt whenever prediction_abi.json or PREDICTION_ABI_NAMES change.
+    """
+    stat = os.stat(PREDICTION_ABI_FILE)
+    cache_key = (stat.st_mtime_ns, stat.st_size, sorted(PREDICTION_ABI_NAMES))
+    try:
+        with open(PREDICTION_ABI_CACHE, "rb") as f:
+            cached_key, abi = pickle.load(f)
+        if cached_key == cache_key:
+            return abi
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+
+    with open(PREDICTION_ABI_FILE, "r") as f:
+        abi = [entry for entry in json.load(f) if entry.get("name") in PREDICTION_ABI_NAMES]
+    try:
+        os.makedirs(os.path.dirname(PREDICTION_ABI_CACHE), exist_ok=True)
+        temp_file = f"{PREDICTION_ABI_CACHE}.{os.getpid()}.tmp"
+        with open(temp_file, "wb") as f:
+            pickle.dump((cache_key, abi), f)
+        os.replace(temp_file, PREDICTION_ABI_CACHE)
+    except OSError:
+        pass  # read-only install - just parse the JSON every time
+    return abi
 
-with open("prediction_abi.json", "r") as f:
-    PREDICTION_ABI = json.load(f)
+
+PREDICTION_ABI = load_prediction_abi()
 
 ERC20_ABI = [
     {
@@ -112,32 +183,1490 @@ ROUTER_ABI = [
         ],
         "stateMutability": "view",
         "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "factory",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+FACTORY_ABI = [
+    {
+        "inputs": [
+            {"internalType": "address", "name": "tokenA", "type": "address"},
+            {"internalType": "address", "name": "tokenB", "type": "address"}
+        ],
+        "name": "getPair",
+        "outputs": [{"internalType": "address", "name": "pair", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+PAIR_ABI = [
+    {
+        "inputs": [],
+        "name": "token0",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getReserves",
+        "outputs": [
+            {"internalType": "uint112", "name": "_reserve0", "type": "uint112"},
+            {"internalType": "uint112", "name": "_reserve1", "type": "uint112"},
+            {"internalType": "uint32", "name": "_blockTimestampLast", "type": "uint32"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "sender", "type": "address"},
+            {"indexed": False, "internalType": "uint256", "name": "amount0In", "type": "uint256"},
+            {"indexed": False, "internalType": "uint256", "name": "amount1In", "type": "uint256"},
+            {"indexed": False, "internalType": "uint256", "name": "amount0Out", "type": "uint256"},
+            {"indexed": False, "internalType": "uint256", "name": "amount1Out", "type": "uint256"},
+            {"indexed": True, "internalType": "address", "name": "to", "type": "address"}
+        ],
+        "name": "Swap",
+        "type": "event"
     }
 ]
 
-web3 = Web3(Web3.HTTPProvider("https://solemn-flashy-surf.bsc.quiknode.pro/3e1ec42374e87ebcf909c51ced78c7948af2d563/"))
-web3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+RPC_URL = os.getenv("BSC_RPC_URL", "https://solemn-flashy-surf.bsc.quiknode.pro/3e1ec42374e87ebcf909c51ced78c7948af2d563/")
+
+# === CHAIN (created on first use) ===
+_chain = {}
+_chain_lock = threading.Lock()
+
+
+def get_chain():
+    """web3 and the three contracts, built on first use - no network I/O happens here"""
+    if not _chain:
+        with _chain_lock:
+            if not _chain:
+                # Retries happen in RpcLimiterMiddleware (jittered, visible to the accounting), not in the provider
+                w3 = Web3(Web3.HTTPProvider(RPC_URL, exception_retry_configuration=None))
+                w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+                # Every transaction is signed locally with an explicit chainId, so the validation
+                # middleware only adds two eth_chainId round trips to each eth_call
+                w3.middleware_onion.remove("validation")
+                w3.middleware_onion.add(RpcAccountingMiddleware, "rpc_accounting")
+                w3.middleware_onion.add(RpcLimiterMiddleware, "rpc_limiter")
+                # Published in one step: other threads only check that _chain is non-empty
+                _chain.update(
+                    prediction_contract=w3.eth.contract(
+                        address=Web3.to_checksum_address(PREDICTION_CONTRACT),
+                        abi=PREDICTION_ABI
+                    ),
+                    usdt_contract=w3.eth.contract(
+                        address=Web3.to_checksum_address(USDT_CONTRACT),
+                        abi=ERC20_ABI
+                    ),
+                    router_contract=w3.eth.contract(
+                        address=Web3.to_checksum_address(PANCAKE_ROUTER),
+                        abi=ROUTER_ABI
+                    ),
+                    web3=w3,
+                )
+    return _chain
 
-if not web3.is_connected():
-    raise Exception("❌ Failed to connect to BSC")
 
-prediction_contract = web3.eth.contract(
-    address=Web3.to_checksum_address(PREDICTION_CONTRACT),
-    abi=PREDICTION_ABI
-)
-usdt_contract = web3.eth.contract(
-    address=Web3.to_checksum_address(USDT_CONTRACT),
-    abi=ERC20_ABI
-)
-router_contract = web3.eth.contract(
-    address=Web3.to_checksum_address(PANCAKE_ROUTER),
-    abi=ROUTER_ABI
-)
+class _LazyChainObject:
+    """Module-level stand-in for web3 / a contract that builds the chain on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attribute):
+        return getattr(get_chain()[self._name], attribute)
+
+
+web3 = _LazyChainObject("web3")
+prediction_contract = _LazyChainObject("prediction_contract")
+usdt_contract = _LazyChainObject("usdt_contract")
+router_contract = _LazyChainObject("router_contract")
+chain_status = {"connected": None, "chain_id": None}
+
+
+def connect_in_background():
+    """Check the RPC connection and chain id on a daemon thread while the menu draws"""
+
+    def check():
+        try:
+            chain_status["chain_id"] = web3.eth.chain_id
+            chain_status["connected"] = True
+        except Exception as e:
+            chain_status["connected"] = False
+            print(f"\n⚠️ Failed to connect to BSC ({e}) - chain operations will fail until it is reachable")
+            return
+        if chain_status["chain_id"] != CHAIN_ID:
+            print(f"\n⚠️ RPC chain id is {chain_status['chain_id']} but BSC_CHAIN_ID is {CHAIN_ID}")
+
+    thread = threading.Thread(target=check, daemon=True)
+    thread.start()
+    return thread
 
 WBNB = "0xbb4CdB9CBd36B01bD1cBaEBF2De08d9173bc095c"
 
+# === BALANCE CACHE ===
+BALANCE_CACHE_TTL = float(os.getenv("BALANCE_CACHE_TTL", "30"))  # seconds
+BALANCE_REFRESH_INTERVAL = float(os.getenv("BALANCE_REFRESH_INTERVAL", "0"))  # 0 = no background refresh
+BALANCE_BATCH_SIZE = int(os.getenv("BALANCE_BATCH_SIZE", "100"))  # wallets per JSON-RPC batch, 2 requests each
+
+
+class BalanceCache:
+    """In-memory BNB/USDT balances (wei) per address
+
+    Entries expire after `ttl` seconds and are dropped as soon as one of our own
+    transactions touching the address is sent or confirmed. Every invalidation bumps the
+    address's generation; a read that started under an older generation is not stored, so a
+    fetch racing a send can never put the pre-send balance back.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}  # address -> (bnb_wei, usdt_wei, fetched_at)
+        self._generations = {}  # address -> invalidation count
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    def get(self, address):
+        """Return (bnb_wei, usdt_wei) if a fresh entry exists, else None"""
+        with self._lock:
+            entry = self._entries.get(address)
+        if entry is None or time.time() - entry[2] > self.ttl:
+            return None
+        return entry[0], entry[1]
+
+    def generation(self, address):
+        """Take before reading the chain and pass to store() so a stale read is dropped"""
+        with self._lock:
+            return self._generations.get(address, 0)
+
+    def fetch(self, address):
+        """Read both balances from the chain and store them"""
+        generation = self.generation(address)
+        bnb_wei = web3.eth.get_balance(address)
+        usdt_wei = usdt_contract.functions.balanceOf(address).call()
+        self.store(address, bnb_wei, usdt_wei, generation)
+        return bnb_wei, usdt_wei
+
+    def fetch_many(self, addresses, batch_size=BALANCE_BATCH_SIZE):
+        """fetch() for a whole fleet: {address: (bnb_wei, usdt_wei)}
+
+        Both balances of `batch_size` wallets go out as one JSON-RPC batch and the batches run in
+        parallel, so 1000 wallets cost 10 round trips instead of 2000. Raises if any read fails.
+        """
+        addresses = [Web3.to_checksum_address(address) for address in addresses]
+        generations = [self.generation(address) for address in addresses]
+        results = batch_read(lambda address: (web3.eth.get_balance(address),
+                                              usdt_contract.functions.balanceOf(address)),
+                             addresses, batch_size)
+        for address, balances, generation in zip(addresses, results, generations):
+            self.store(address, *balances, generation)
+        return dict(zip(addresses, results))
+
+    def store(self, address, bnb_wei, usdt_wei, generation=None):
+        """Cache a read; dropped if the address was invalidated since `generation` was taken"""
+        with self._lock:
+            if generation is not None and generation != self._generations.get(address, 0):
+                return
+            self._entries[address] = (bnb_wei, usdt_wei, time.time())
+
+    def get_or_fetch(self, address):
+        address = Web3.to_checksum_address(address)
+        cached = self.get(address)
+        if cached is not None:
+            return cached
+        return self.fetch(address)
+
+    def invalidate(self, *addresses):
+        with self._lock:
+            for address in addresses:
+                address = Web3.to_checksum_address(address)
+                self._entries.pop(address, None)
+                self._generations[address] = self._generations.get(address, 0) + 1
+
+    def snapshot(self):
+        """Every entry, expired or not: address -> (bnb_wei, usdt_wei, age_seconds) - never touches the chain"""
+        now = time.time()
+        with self._lock:
+            return {address: (bnb_wei, usdt_wei, now - fetched_at)
+                    for address, (bnb_wei, usdt_wei, fetched_at) in self._entries.items()}
+
+    def start_refresher(self, interval):
+        """Keep known entries warm in a background thread so menu reads never wait on RPC"""
+        if self._refresher is not None:
+            return
+
+        def refresh_loop():
+            while True:
+                time.sleep(interval)
+                with self._lock:
+                    addresses = list(self._entries)
+                for address in addresses:
+                    try:
+                        self.fetch(address)
+                    except Exception as e:
+                        print(f"⚠️ Balance refresh error for {address}: {e}")
+
+        self._refresher = threading.Thread(target=refresh_loop, daemon=True)
+        self._refresher.start()
+
+
+balance_cache = BalanceCache(BALANCE_CACHE_TTL)
+
+
+class InFlightTracker:
+    """Our broadcast transactions without a receipt yet, for /status
+
+    Filled by send_transaction and emptied by wait_for_receipt; transactions nobody waits for
+    (bets, scheduled bets) are reaped by the status refresher with one receipt lookup each.
+    """
+
+    def __init__(self):
+        self._pending = {}  # tx hash -> {'operation', 'addresses', 'sent_at'}
+        self._lock = threading.Lock()
+
+    def add(self, tx_hash, addresses):
+        with self._lock:
+            self._pending[bytes(tx_hash)] = {'operation': _current_command.get(), 'addresses': addresses,
+                                             'sent_at': time.time()}
+
+    def done(self, tx_hash):
+        with self._lock:
+            self._pending.pop(bytes(tx_hash), None)
+
+    def snapshot(self):
+        """[(tx_hash, operation, age_seconds)], oldest first"""
+        now = time.time()
+        with self._lock:
+            entries = [(tx_hash, entry['operation'], now - entry['sent_at'])
+                       for tx_hash, entry in self._pending.items()]
+        return sorted(entries, key=lambda entry: -entry[2])
+
+    def __len__(self):
+        return len(self._pending)
+
+    def reap(self, older_than):
+        """Drop transactions that have been mined - only those sent more than `older_than` seconds ago"""
+        for tx_hash, _, age in self.snapshot():
+            if age < older_than:
+                break
+            try:
+                web3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+            self.done(tx_hash)
+            if broadcaster is not None:
+                broadcaster.included(tx_hash)
+
+
+in_flight = InFlightTracker()
+
+
+_send_locks = {}  # address -> RLock held from nonce read to broadcast
+_send_locks_guard = threading.Lock()
+
+
+def send_lock(address):
+    """Hold while reading a wallet's nonce, signing and broadcasting, so a bet, a claim and a
+    scheduled bet from the same wallet never sign the same nonce"""
+    address = Web3.to_checksum_address(address)
+    with _send_locks_guard:
+        return _send_locks.setdefault(address, threading.RLock())
+
+
+def send_transaction(signed_tx, *touched_addresses):
+    """Broadcast a signed transaction and drop cached balances of every address it touches"""
+    if broadcaster is not None:
+        tx_hash = broadcaster.send(signed_tx)
+    else:
+        tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
+    balance_cache.invalidate(*touched_addresses)
+    in_flight.add(tx_hash, touched_addresses)
+    return tx_hash
+
+
+def wait_for_receipt(tx_hash, *touched_addresses):
+    """Wait for a transaction receipt and drop cached balances again once it is mined"""
+    receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+    balance_cache.invalidate(*touched_addresses)
+    in_flight.done(tx_hash)
+    if broadcaster is not None:
+        broadcaster.included(tx_hash)
+    return receipt
+
+# === LATENCY METRICS ===
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 = no metrics endpoint
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_WINDOW = 2048  # recent samples kept per stage for p50/p99
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # seconds
+
+
+class LatencyHistogram:
+    """Prometheus-style cumulative buckets plus a window of recent samples for percentiles"""
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=METRICS_WINDOW)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+
+    def percentile(self, q):
+        samples = sorted(self.recent)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, max(0, int(q * len(samples) + 0.5) - 1))]
+
+
+class LatencyMetrics:
+    """Stage latencies keyed by (command, stage), in the order stages were first seen"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, command, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get((command, stage))
+            if histogram is None:
+                histogram = self._histograms[(command, stage)] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def render_prometheus(self):
+        lines = [
+            "# HELP mwpb_stage_latency_seconds Latency of each stage of a bot command",
+            "# TYPE mwpb_stage_latency_seconds histogram",
+        ]
+        with self._lock:
+            for (command, stage), histogram in self._histograms.items():
+                labels = f'command="{command}",stage="{stage}"'
+                for bound, bucket_count in zip(LATENCY_BUCKETS, histogram.bucket_counts):
+                    lines.append(f'mwpb_stage_latency_seconds_bucket{{{labels},le="{bound}"}} {bucket_count}')
+                lines.append(f'mwpb_stage_latency_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"mwpb_stage_latency_seconds_sum{{{labels}}} {histogram.total:.6f}")
+                lines.append(f"mwpb_stage_latency_seconds_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def percentiles(self):
+        """{command: [(stage, p50_seconds, p99_seconds, count), ...]}"""
+        by_command = {}
+        with self._lock:
+            for (command, stage), histogram in self._histograms.items():
+                by_command.setdefault(command, []).append(
+                    (stage, histogram.percentile(0.5), histogram.percentile(0.99), histogram.count)
+                )
+        return by_command
+
+    def format_stats(self):
+        """Telegram-friendly p50/p99 table per command"""
+        by_command = self.percentiles()
+        if not by_command:
+            return "📈 No latency samples yet"
+        lines = ["📈 LATENCY p50 / p99 (ms)"]
+        for command, stages in by_command.items():
+            lines.append(f"\n⚡ {command}")
+            for stage, p50, p99, count in stages:
+                lines.append(f"  {stage}: {p50 * 1000:.1f} / {p99 * 1000:.1f}  (n={count})")
+        return "\n".join(lines)
+
+
+latency_metrics = LatencyMetrics()
+# Command/operation being executed; a ContextVar so it follows threads and asyncio tasks separately
+_current_command = ContextVar("current_command", default=None)
+# Unique per command run, so its events can be picked out of the log
+_operation_id = ContextVar("operation_id", default=None)
+
+
+@contextmanager
+def operation(name):
+    """Attribute spans, RPC calls and logged events made in this context to `name`"""
+    token = _current_command.set(name)
+    id_token = _operation_id.set(new_operation_id(name))
+    try:
+        with profiler.section(name):
+            yield
+    finally:
+        _operation_id.reset(id_token)
+        _current_command.reset(token)
+
+
+@contextmanager
+def track_command(command, started_at=None):
+    """Like operation(), and also record the command's total latency"""
+    start = started_at if started_at is not None else time.perf_counter()
+    try:
+        with operation(command):
+            try:
+                yield
+            finally:
+                elapsed = time.perf_counter() - start
+                log_event("command_done", f"⏱️ {command} took {elapsed * 1000:.0f} ms", logging.DEBUG,
+                          seconds=round(elapsed, 4))
+    finally:
+        latency_metrics.observe(command, "total", time.perf_counter() - start)
+
+
+@contextmanager
+def span(stage):
+    """Time one stage of the current command, no-op outside track_command()"""
+    command = _current_command.get()
+    if command is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        latency_metrics.observe(command, stage, time.perf_counter() - start)
+
+
+# === EVENT LOG ===
+LOG_FILE = os.getenv("LOG_FILE", "mwpb_events.jsonl")  # JSON lines in the working directory, '' = none
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # rotate at 10 MB...
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))  # ...keeping mwpb_events.jsonl.1 to .5
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "1") == "1"
+
+event_logger = logging.getLogger("mwpb")
+event_logger.setLevel(logging.DEBUG)
+event_logger.propagate = False
+_log_queue = queue.SimpleQueue()
+_log_listener = None
+
+
+def new_operation_id(name):
+    return f"{name}-{secrets.token_hex(4)}"
+
+
+def log_event(event, message, level=logging.INFO, **fields):
+    """Record an event: the console shows `message`, the log file a JSON line with `event` and `fields`
+
+    On the calling thread this is only a queue put - formatting, console and file writes happen
+    on the listener thread. Before setup_logging() it just prints, like the code always did.
+    """
+    if _log_listener is None:
+        if level >= logging.INFO:
+            print(message)
+        return
+    event_logger.log(level, message, extra={"event": event, "fields": fields})
+
+
+class _OperationFilter(logging.Filter):
+    """Stamp records with the current operation and its ID - runs on the calling thread, where the context is"""
+
+    def filter(self, record):
+        record.operation = _current_command.get()
+        record.operation_id = _operation_id.get()
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).astimezone().isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "event": getattr(record, "event", "message"),
+            "op": getattr(record, "operation", None),
+            "op_id": getattr(record, "operation_id", None),
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ConsoleRenderer(logging.Handler):
+    """The emoji messages the menu has always shown, printed from the listener thread"""
+
+    def emit(self, record):
+        print(record.getMessage())
+
+
+class _EventListener(QueueListener):
+    def handle(self, record):
+        if isinstance(record, threading.Event):  # flush_events() marker
+            record.set()
+            return
+        super().handle(record)
+
+
+def setup_logging(log_file=LOG_FILE, console=LOG_CONSOLE):
+    """Send events through a queue to a background listener: rotating JSON-lines file + console"""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    handlers = []
+    if log_file:
+        file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                           encoding="utf-8")
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+    if console:
+        console_handler = ConsoleRenderer()
+        console_handler.setLevel(logging.INFO)
+        handlers.append(console_handler)
+    queue_handler = QueueHandler(_log_queue)
+    queue_handler.addFilter(_OperationFilter())
+    event_logger.addHandler(queue_handler)
+    _log_listener = _EventListener(_log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(stop_logging)
+
+
+def flush_events(timeout=1.0):
+    """Wait until every event logged so far is written - e.g. before the menu is drawn again"""
+    if _log_listener is None:
+        return
+    marker = threading.Event()
+    _log_queue.put(marker)
+    marker.wait(timeout)
+
+
+def stop_logging():
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+
+def start_metrics_server(port, host=METRICS_HOST):
+    """Serve latency histograms in Prometheus text format on http://host:port/metrics"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            payload = latency_metrics.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# === PROFILING ===
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")  # dumps go here, relative to the working directory
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "30"))  # functions / allocation sites per table
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))  # seconds between stack samples
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "10"))  # frames kept per allocation
+PROFILE_MODES = ("cprofile", "sampling")
+
+
+def _frame_label(frame):
+    filename, line, function = frame
+    return function if filename == "~" else f"{function} ({os.path.basename(filename)}:{line})"  # "~": built-in
+
+
+class Profiler:
+    """CPU and allocation profiling of the running bot, switched on and off without a restart
+
+    cprofile: while a session runs, every section() - operations (daemon commands, Telegram bets and
+    queries, auto-claim), menu actions, Telegram polls and each fan_out call (drain, claim-all, balance
+    batches) - runs under cProfile on its own thread, merged per section. A section inside another
+    one on the same thread counts towards the outer one.
+    On Python 3.12 and later cProfile uses sys.monitoring's single profiler slot, so only one thread
+    can be profiled at a time: a section that starts while another thread holds the slot runs
+    unprofiled and is counted as skipped in the dump. Up to 3.11 every thread is profiled.
+    sampling: a thread reads every thread's stack each PROFILE_SAMPLE_INTERVAL - nothing is added to
+    the profiled code and a blocked thread shows up where it waits. It covers every thread on every
+    supported Python version, so it is the mode to use for parallel work on 3.12+.
+    Allocation snapshots use tracemalloc, which the first snapshot switches on.
+    """
+
+    def __init__(self):
+        self.mode = None
+        self.started = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {}  # section -> pstats.Stats (cprofile)
+        self._skipped = Counter()  # section -> runs left unprofiled, another thread held the profiler (3.12+)
+        self._stacks = Counter()  # (thread name, frame, ...) root first -> samples (sampling)
+        self._samples = 0
+        self._sampler = None
+        self._timer = None
+        self._last_snapshot = None
+
+    def start(self, mode="cprofile", seconds=None, on_stop=None):
+        """Start a session; with `seconds` it stops by itself and on_stop(path, summary) gets the dump"""
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"mode must be one of {', '.join(PROFILE_MODES)}")
+        with self._lock:
+            if self.mode is not None:
+                raise RuntimeError(f"A {self.mode} session is already running")
+            self.mode = mode
+            self.started = time.time()
+            self._stats = {}
+            self._skipped = Counter()
+            self._stacks = Counter()
+            self._samples = 0
+        if mode == "sampling":
+            self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+            self._sampler.start()
+        if seconds:
+            self._timer = threading.Timer(seconds, self._stop_after, args=(on_stop,))
+            self._timer.daemon = True
+            self._timer.start()
+        log_event("profile_start", f"🔬 {mode} profiling started" + (f" for {seconds:g}s" if seconds else ""),
+                  mode=mode, seconds=seconds)
+
+    def _stop_after(self, on_stop):
+        try:
+            path, summary = self.stop()
+        except RuntimeError:
+            return  # stopped by hand first
+        if on_stop is not None:
+            on_stop(path, summary)
+
+    def stop(self):
+        """End the session and dump it: returns (path, short summary)"""
+        with self._lock:
+            if self.mode is None:
+                raise RuntimeError("No profiling session is running")
+            mode, self.mode = self.mode, None
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{mode}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt")
+        elapsed = time.time() - self.started
+        top = self._dump_cprofile(path, elapsed) if mode == "cprofile" else self._dump_sampling(path, elapsed)
+        log_event("profile_dump", f"🔬 {mode} profile ({elapsed:.0f}s) written to {path}", mode=mode, path=path,
+                  seconds=round(elapsed, 1))
+        summary = "\n".join([f"🔬 {mode} profile, {elapsed:.0f}s - top functions:", *top[:10], f"📄 {path}"])
+        return path, summary
+
+    @contextmanager
+    def section(self, name):
+        """Profile the enclosed code on this thread while a cprofile session runs"""
+        if self.mode != "cprofile" or getattr(self._local, "active", False):
+            yield
+            return
+        name = name or "background"
+        profile = cProfile.Profile()
+        self._local.active = True
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+: another thread's section holds the one profiler slot - run this one unprofiled
+            with self._lock:
+                self._skipped[name] += 1
+            try:
+                yield
+            finally:
+                self._local.active = False
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._local.active = False
+            stats = pstats.Stats(profile)
+            with self._lock:
+                if self.mode == "cprofile":  # else the session ended meanwhile and is already dumped
+                    if name in self._stats:
+                        self._stats[name].add(stats)
+                    else:
+                        self._stats[name] = stats
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while self.mode == "sampling":
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                        frame = frame.f_back
+                    self._stacks[(names.get(ident, str(ident)), *reversed(stack))] += 1
+                self._samples += 1
+            del frames
+            time.sleep(PROFILE_SAMPLE_INTERVAL)
+
+    def _dump_cprofile(self, path, elapsed):
+        """Text report plus a .prof file (snakeviz, pstats); returns the top lines by own time"""
+        with self._lock:
+            sections = dict(self._stats)
+            skipped = Counter(self._skipped)
+        merged = pstats.Stats()
+        if sections:
+            merged.add(*sections.values())
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"cProfile, {elapsed:.1f}s, sections: {', '.join(sorted(sections)) or 'none ran'}\n")
+            if skipped:
+                f.write(f"Skipped while another thread was being profiled (Python 3.12+, use sampling for "
+                        f"parallel work): {', '.join(f'{name} x{count}' for name, count in sorted(skipped.items()))}\n")
+            if sections:
+                merged.stream = f
+                f.write("\n=== all sections by cumulative time ===\n")
+                merged.sort_stats("cumulative").print_stats(PROFILE_TOP)
+                f.write("\n=== bot code by own time ===\n")
+                merged.sort_stats("tottime").print_stats(re.escape(BASE_DIR), PROFILE_TOP)
+                for name, stats in sorted(sections.items()):
+                    f.write(f"\n=== section {name} by cumulative time ===\n")
+                    stats.stream = f
+                    stats.sort_stats("cumulative").print_stats(PROFILE_TOP // 2)
+        if sections:
+            merged.dump_stats(os.path.splitext(path)[0] + ".prof")
+        hottest = sorted(merged.stats.items(), key=lambda item: item[1][2], reverse=True)
+        return [f"{own * 1000:8.1f} ms  {_frame_label(frame)}" for frame, (_, _, own, _, _) in hottest]
+
+    def _dump_sampling(self, path, elapsed):
+        """Text report plus a .folded file (flamegraph.pl, speedscope); returns the top lines by own samples"""
+        with self._lock:
+            stacks = Counter(self._stacks)
+            samples = self._samples
+        own, total, threads = Counter(), Counter(), Counter()
+        own_by_thread = {}
+        for (thread, *frames), count in stacks.items():
+            threads[thread] += count
+            if frames:
+                own[frames[-1]] += count
+                own_by_thread.setdefault(thread, Counter())[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+
+        def table(counter, of, keep=lambda frame: True):
+            return [f"{count / max(of, 1) * 100:6.1f}%  {count:7d}  {_frame_label(frame)}"
+                    for frame, count in counter.most_common() if keep(frame)][:PROFILE_TOP]
+
+        thread_samples = sum(threads.values())
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"Sampling, {elapsed:.1f}s, {samples} rounds every {PROFILE_SAMPLE_INTERVAL * 1000:g} ms, "
+                    f"{thread_samples} thread stacks (% of those stacks)\n")
+            f.write("\n=== threads ===\n")
+            f.writelines(f"{count:7d}  {thread}\n" for thread, count in threads.most_common())
+            f.write("\n=== own samples ===\n")
+            f.writelines(line + "\n" for line in table(own, thread_samples))
+            f.write("\n=== total samples (function on the stack) ===\n")
+            f.writelines(line + "\n" for line in table(total, thread_samples))
+            f.write("\n=== bot code, total samples ===\n")
+            f.writelines(line + "\n" for line in table(total, thread_samples, lambda frame: frame[0].startswith(BASE_DIR)))
+            for thread, counter in sorted(own_by_thread.items()):
+                f.write(f"\n=== thread {thread}, own samples (% of this thread's) ===\n")
+                f.writelines(line + "\n" for line in table(counter, threads[thread])[:PROFILE_TOP // 2])
+        with open(os.path.splitext(path)[0] + ".folded", "w", encoding="utf-8") as f:
+            for (thread, *frames), count in stacks.items():
+                f.write(";".join([thread.replace(";", ","), *map(_frame_label, frames)]) + f" {count}\n")
+        return table(own, thread_samples)
+
+    def memory_snapshot(self):
+        """Top allocation sites and growth since the previous snapshot: returns (path, short summary)
+
+        The first call only switches tracemalloc on (it slows allocations down) and takes the baseline.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+            self._last_snapshot = tracemalloc.take_snapshot()
+            log_event("profile_memory_start", "🧠 Allocation tracing started", frames=PROFILE_TRACEMALLOC_FRAMES)
+            return None, "🧠 Allocation tracing started - take another snapshot later to see the top sites"
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        top = snapshot.statistics("lineno")[:PROFILE_TOP]
+        growth = snapshot.compare_to(self._last_snapshot, "lineno")[:PROFILE_TOP] if self._last_snapshot else []
+        self._last_snapshot = snapshot
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"memory-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"tracemalloc: {current / 1e6:.1f} MB traced, peak {peak / 1e6:.1f} MB\n")
+            f.write("\n=== growth since the previous snapshot ===\n")
+            f.writelines(f"{diff}\n" for diff in growth)
+            f.write("\n=== top allocation sites ===\n")
+            f.writelines(f"{stat}\n" for stat in top)
+            for stat in snapshot.statistics("traceback")[:5]:
+                f.write(f"\n=== {stat.count} blocks, {stat.size / 1024:.1f} KiB from ===\n")
+                f.writelines(f"{line}\n" for line in stat.traceback.format())
+        log_event("profile_memory", f"🧠 Allocation snapshot ({current / 1e6:.1f} MB traced) written to {path}",
+                  path=path, traced_bytes=current, peak_bytes=peak)
+        lines = [f"🧠 {current / 1e6:.1f} MB traced, peak {peak / 1e6:.1f} MB - "
+                 f"{'growth since last snapshot' if growth else 'top sites'}:"]
+        lines.extend(f"{diff.size_diff / 1024:+9.1f} KiB  {diff.traceback[0].filename.rsplit(os.sep, 1)[-1]}:"
+                     f"{diff.traceback[0].lineno}" for diff in growth[:5])
+        lines.extend(f"{stat.size / 1024:9.1f} KiB  {stat.traceback[0].filename.rsplit(os.sep, 1)[-1]}:"
+                     f"{stat.traceback[0].lineno}" for stat in ([] if growth else top[:5]))
+        lines.append(f"📄 {path}")
+        return path, "\n".join(lines)
+
+    def memory_stop(self):
+        tracemalloc.stop()
+        self._last_snapshot = None
+        log_event("profile_memory_stop", "🧠 Allocation tracing stopped")
+
+    def status(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "seconds": round(time.time() - self.started, 1) if self.mode else None,
+                "sections": sorted(self._stats) if self.mode == "cprofile" else None,
+                "skipped_sections": sum(self._skipped.values()) if self.mode == "cprofile" else None,
+                "samples": self._samples if self.mode == "sampling" else None,
+                "tracing_memory": tracemalloc.is_tracing(),
+                "traced_mb": round(tracemalloc.get_traced_memory()[0] / 1e6, 1) if tracemalloc.is_tracing() else None,
+            }
+
+
+profiler = Profiler()
+
+
+# === RPC ACCOUNTING ===
+def _build_selector_names(*abis):
+    """'0x1234abcd' -> function name for every function in the given ABIs"""
+    names = {}
+    for abi in abis:
+        for entry in abi:
+            if entry.get("type") == "function":
+                names["0x" + function_abi_to_4byte_selector(entry).hex()] = entry["name"]
+    return names
+
+
+class RpcAccounting:
+    """JSON-RPC calls and seconds per operation, broken down by method
+
+    eth_call is split by contract function (eth_call:rounds, eth_call:ledger, ...).
+    Calls made outside any operation() are booked under "background".
+    """
+
+    def __init__(self):
+        self._usage = {}  # operation -> {label: [calls, seconds]}
+        self._lock = threading.Lock()
+        self._selector_names = None  # built on the first eth_call
+
+    def label(self, method, params):
+        if method == "eth_call" and params and isinstance(params[0], dict):
+            if self._selector_names is None:
+                self._selector_names = _build_selector_names(PREDICTION_ABI, ERC20_ABI, ROUTER_ABI,
+                                                             FACTORY_ABI, PAIR_ABI)
+            data = params[0].get("data") or params[0].get("input") or ""
+            if isinstance(data, bytes):
+                data = "0x" + data.hex()
+            selector = data[:10].lower()
+            return f"eth_call:{self._selector_names.get(selector, selector)}"
+        return method
+
+    def record(self, method, params, seconds):
+        operation_name = _current_command.get() or "background"
+        label = self.label(method, params)
+        with self._lock:
+            entry = self._usage.setdefault(operation_name, {}).setdefault(label, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def snapshot(self):
+        """{operation: {label: (calls, seconds)}}"""
+        with self._lock:
+            return {
+                operation_name: {label: tuple(entry) for label, entry in labels.items()}
+                for operation_name, labels in self._usage.items()
+            }
+
+    def usage_since(self, operation_name, before):
+        """{label: (calls, seconds)} for one operation since an earlier snapshot()"""
+        earlier = before.get(operation_name, {})
+        usage = {}
+        for label, (calls, seconds) in self.snapshot().get(operation_name, {}).items():
+            old_calls, old_seconds = earlier.get(label, (0, 0.0))
+            if calls > old_calls:
+                usage[label] = (calls - old_calls, seconds - old_seconds)
+        return usage
+
+    def reset(self):
+        with self._lock:
+            self._usage.clear()
+
+
+rpc_accounting = RpcAccounting()
+
+
+class RpcAccountingMiddleware(Web3Middleware):
+    """Books every request that reaches the provider in rpc_accounting"""
+
+    def wrap_make_request(self, make_request):
+        def middleware(method, params):
+            start = time.perf_counter()
+            try:
+                return make_request(method, params)
+            finally:
+                rpc_accounting.record(method, params, time.perf_counter() - start)
+
+        return middleware
+
+    def wrap_make_batch_request(self, make_batch_request):
+        def middleware(requests_info):
+            start = time.perf_counter()
+            try:
+                return make_batch_request(requests_info)
+            finally:
+                # One round trip for the whole batch - its time is split evenly over the requests in it
+                seconds = (time.perf_counter() - start) / max(len(requests_info), 1)
+                for method, params in requests_info:
+                    rpc_accounting.record(method, params, seconds)
+
+        return middleware
+
+    async def async_wrap_make_request(self, make_request):
+        async def middleware(method, params):
+            start = time.perf_counter()
+            try:
+                return await make_request(method, params)
+            finally:
+                rpc_accounting.record(method, params, time.perf_counter() - start)
+
+        return middleware
+
+
+
+def format_rpc_usage(operation_name, usage):
+    """One-line summary: total calls/time, then the busiest methods"""
+    total_calls = sum(calls for calls, _ in usage.values())
+    total_ms = sum(seconds for _, seconds in usage.values()) * 1000
+    busiest = sorted(usage.items(), key=lambda item: item[1][0], reverse=True)
+    breakdown = ", ".join(f"{label} {calls}" for label, (calls, _) in busiest)
+    return f"📡 RPC [{operation_name}]: {total_calls} calls, {total_ms:.0f} ms ({breakdown})"
+
+
+def report_rpc_usage(operation_name, before):
+    usage = rpc_accounting.usage_since(operation_name, before)
+    if usage:
+        log_event("rpc_usage", format_rpc_usage(operation_name, usage), command=operation_name,
+                  calls={label: calls for label, (calls, _) in usage.items()},
+                  ms=round(sum(seconds for _, seconds in usage.values()) * 1000, 1))
+
+# === RPC RATE LIMITING ===
+RPC_CREDITS_PER_SECOND = float(os.getenv("RPC_CREDITS_PER_SECOND", "0"))  # 0 = no client-side cap
+RPC_BURST_CREDITS = float(os.getenv("RPC_BURST_CREDITS", "0")) or max(RPC_CREDITS_PER_SECOND, 1)
+# Credits per call for the methods that cost more than 1 on metered endpoints
+RPC_METHOD_CREDITS = {
+    "eth_getLogs": 3,
+    "eth_estimateGas": 2,
+    "debug_traceTransaction": 10,
+}
+RPC_INITIAL_CONCURRENCY = int(os.getenv("RPC_INITIAL_CONCURRENCY", "4"))
+RPC_MAX_CONCURRENCY = int(os.getenv("RPC_MAX_CONCURRENCY", "64"))
+RPC_MAX_RETRIES = int(os.getenv("RPC_MAX_RETRIES", "5"))
+# A bet still retrying at lockTimestamp is lost anyway, so the bet path gives up sooner
+RPC_BET_MAX_RETRIES = int(os.getenv("RPC_BET_MAX_RETRIES", "2"))
+RPC_BET_OPERATIONS = {"bet", "swap_batch"}
+RPC_RETRY_BASE = 0.1  # seconds, doubled per attempt
+RPC_RETRY_CAP = 5.0
+RPC_DECREASE_COOLDOWN = 0.5  # seconds between two halvings of the concurrency limit
+RPC_FANOUT_WORKERS = int(os.getenv("RPC_FANOUT_WORKERS", "32"))  # threads for drain / claim-all
+# JSON-RPC error codes/messages endpoints use instead of HTTP 429
+RPC_RATE_LIMIT_CODES = {-32005, -32007, -32029, 429}
+RPC_RATE_LIMIT_MESSAGES = ("rate limit", "too many requests", "limit exceeded", "request limit reached")
+
+
+class TokenBucket:
+    """`rate` credits per second, at most `burst` saved up; rate 0 disables it"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, credits):
+        """Take `credits` now and return how long to wait before spending them
+
+        The balance may go negative, so waiters queue up in arrival order without polling.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= credits
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def take(self, credits=1):
+        """Take `credits` if they are saved up already, never going into debt - False if not"""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < credits:
+                return False
+            self._tokens -= credits
+            return True
+
+    def set_rate(self, rate):
+        with self._lock:
+            now = time.monotonic()
+            if self.rate > 0:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = rate
+
+
+class AdaptiveRate:
+    """AIMD on the token bucket's rate, learned from the endpoint's own push-back
+
+    Fewer requests in flight don't slow down an endpoint that answers fast, so a 429 or timeout
+    also caps the bucket at 90% of the credits that succeeded in the second before it (at most
+    once per RPC_DECREASE_COOLDOWN); every success then adds credits/rate back, about one credit
+    per second each second. RPC_CREDITS_PER_SECOND, if set, stays the ceiling; an endpoint that
+    never pushes back is never capped.
+    """
+
+    def __init__(self, bucket, ceiling):
+        self.bucket = bucket
+        self.ceiling = ceiling or float("inf")
+        self._succeeded = deque()  # (monotonic time, credits) of successes in the last second
+        self._succeeded_credits = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, outcome, credits):
+        now = time.monotonic()
+        with self._lock:
+            while self._succeeded and now - self._succeeded[0][0] >= 1:
+                self._succeeded_credits -= self._succeeded.popleft()[1]
+            rate = self.bucket.rate
+            if outcome == "ok":
+                self._succeeded.append((now, credits))
+                self._succeeded_credits += credits
+                if 0 < rate < self.ceiling:
+                    self.bucket.set_rate(min(self.ceiling, rate + credits / rate))
+            elif outcome == "throttled" and now - self._last_decrease >= RPC_DECREASE_COOLDOWN:
+                self._last_decrease = now
+                learned = max(1.0, self._succeeded_credits * 0.9)
+                if rate <= 0 or learned < rate:
+                    self.bucket.set_rate(learned)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on requests in flight
+
+    Grows by 1 per success until the endpoint first pushes back (slow start), then by 1/limit
+    per success; a 429 or timeout halves it, at most once per RPC_DECREASE_COOLDOWN because
+    every request in flight at that moment tends to fail together.
+    """
+
+    def __init__(self, initial, maximum, minimum=1):
+        self.limit = float(min(initial, maximum))
+        self.maximum = maximum
+        self.minimum = minimum
+        self.in_flight = 0
+        self.throttled = 0
+        self._slow_start = True
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def try_acquire(self):
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        # A threading.Condition would block the event loop - poll with a short, growing delay instead
+        delay = 0.001
+        while not self.try_acquire():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def release(self, outcome):
+        """outcome: "ok", "throttled" (429/timeout) or "error" (anything else, limit unchanged)"""
+        with self._condition:
+            self.in_flight -= 1
+            if outcome == "throttled":
+                self.throttled += 1
+                self._slow_start = False
+                now = time.monotonic()
+                if now - self._last_decrease >= RPC_DECREASE_COOLDOWN:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self._last_decrease = now
+            elif outcome == "ok":
+                step = 1 if self._slow_start else 1 / self.limit
+                self.limit = min(self.maximum, self.limit + step)
+            self._condition.notify_all()
+
+
+def _throttle_kind(error=None, response=None):
+    """"rate_limited", "timeout", "connection" or None for a failed request or a JSON-RPC response
+
+    A batch response is rate limited as soon as one of its entries is.
+    """
+    if isinstance(response, list):
+        return next(filter(None, (_throttle_kind(response=entry) for entry in response)), None)
+    if error is not None:
+        if isinstance(error, (requests.Timeout, TimeoutError)):
+            return "timeout"
+        if isinstance(error, (requests.ConnectionError, ClientConnectionError, ConnectionError)):
+            return "connection"
+        # requests.HTTPError carries the response, aiohttp's ClientResponseError the status itself
+        status = getattr(getattr(error, "response", None), "status_code", None) or getattr(error, "status", None)
+        if status in (429, 502, 503, 504):
+            return "rate_limited"
+        return None
+    rpc_error = response.get("error") if isinstance(response, dict) else None
+    if isinstance(rpc_error, dict):
+        message = str(rpc_error.get("message", "")).lower()
+        if rpc_error.get("code") in RPC_RATE_LIMIT_CODES or any(text in message for text in RPC_RATE_LIMIT_MESSAGES):
+            return "rate_limited"
+    return None
+
+
+class RpcLimiter:
+    """Token bucket (with a rate learned from 429s) + adaptive concurrency + retries with jitter
+    in front of every JSON-RPC request"""
+
+    def __init__(self, credits_per_second=RPC_CREDITS_PER_SECOND, burst=RPC_BURST_CREDITS,
+                 initial_concurrency=RPC_INITIAL_CONCURRENCY, max_concurrency=RPC_MAX_CONCURRENCY,
+                 max_retries=RPC_MAX_RETRIES):
+        self.bucket = TokenBucket(credits_per_second, burst)
+        self.rate = AdaptiveRate(self.bucket, credits_per_second)
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, max_concurrency)
+        self.max_retries = max_retries
+        self.retries = 0
+        self.timeouts = 0
+
+    @staticmethod
+    def _retryable(method, kind):
+        # A broadcast that timed out or lost its connection may have reached the node - resending is the caller's decision
+        return kind == "rate_limited" or method != "eth_sendRawTransaction"
+
+    def _backoff(self, attempt, error=None):
+        """Full jitter: uniform(0, base * 2^attempt), or the endpoint's Retry-After if it sent one"""
+        headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None)
+        retry_after = headers.get("Retry-After") if headers else None
+        if retry_after:
+            try:
+                return min(float(retry_after), RPC_RETRY_CAP) + random.uniform(0, RPC_RETRY_BASE)
+            except ValueError:
+                pass
+        return random.uniform(0, min(RPC_RETRY_CAP, RPC_RETRY_BASE * 2 ** attempt))
+
+    def _retry_budget(self):
+        if _current_command.get() in RPC_BET_OPERATIONS:
+            return min(self.max_retries, RPC_BET_MAX_RETRIES)
+        return self.max_retries
+
+    def _release(self, outcome, credits):
+        self.concurrency.release(outcome)
+        self.rate.observe(outcome, credits)
+
+    def _outcome(self, kind):
+        """Only 429s and timeouts shrink the concurrency limit; dropped connections are just retried"""
+        if kind == "timeout":
+            self.timeouts += 1
+        return "throttled" if kind in ("rate_limited", "timeout") else "error"
+
+    def request(self, make_request, method, params):
+        return self._send(lambda: make_request(method, params), RPC_METHOD_CREDITS.get(method, 1), [method])
+
+    def request_batch(self, make_batch_request, requests_info):
+        """A JSON-RPC batch: one slot in flight, the credits of every request in it, retried as a whole"""
+        methods = [method for method, _ in requests_info]
+        credits = sum(RPC_METHOD_CREDITS.get(method, 1) for method in methods)
+        return self._send(lambda: make_batch_request(requests_info), credits, methods)
+
+    def _send(self, make_request, credits, methods):
+        max_retries = self._retry_budget()
+        for attempt in range(max_retries + 1):
+            wait = self.bucket.reserve(credits)
+            if wait:
+                time.sleep(wait)
+            self.concurrency.acquire()
+            outcome = "ok"
+            try:
+                response = make_request()
+            except Exception as e:
+                kind = _throttle_kind(error=e)
+                outcome = self._outcome(kind)
+                retryable = kind and all(self._retryable(method, kind) for method in methods)
+                if not retryable or attempt == max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+            else:
+                kind = _throttle_kind(response=response)
+                if not kind or attempt == max_retries:
+                    outcome = "throttled" if kind else "ok"
+                    return response
+                outcome = "throttled"
+                delay = self._backoff(attempt)
+            finally:
+                self._release(outcome, credits)
+            self.retries += 1
+            time.sleep(delay)
+
+    async def request_async(self, make_request, method, params):
+        credits = RPC_METHOD_CREDITS.get(method, 1)
+        max_retries = self._retry_budget()
+        for attempt in range(max_retries + 1):
+            wait = self.bucket.reserve(credits)
+            if wait:
+                await asyncio.sleep(wait)
+            await self.concurrency.acquire_async()
+            outcome = "ok"
+            try:
+                response = await make_request(method, params)
+            except Exception as e:
+                kind = _throttle_kind(error=e)
+                outcome = self._outcome(kind)
+                if not kind or not self._retryable(method, kind) or attempt == max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+            else:
+                kind = _throttle_kind(response=response)
+                if not kind or attempt == max_retries:
+                    outcome = "throttled" if kind else "ok"
+                    return response
+                outcome = "throttled"
+                delay = self._backoff(attempt)
+            finally:
+                self._release(outcome, credits)
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        return {
+            "concurrency_limit": round(self.concurrency.limit, 1),
+            "in_flight": self.concurrency.in_flight,
+            "throttled": self.concurrency.throttled,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "credits_per_second": round(self.bucket.rate, 1),
+        }
+
+
+rpc_limiter = RpcLimiter()
+
+
+class RpcLimiterMiddleware(Web3Middleware):
+    """Sends every request through rpc_limiter; sits outside the accounting so each retry is booked"""
+
+    def wrap_make_request(self, make_request):
+        def middleware(method, params):
+            return rpc_limiter.request(make_request, method, params)
+
+        return middleware
+
+    def wrap_make_batch_request(self, make_batch_request):
+        def middleware(requests_info):
+            return rpc_limiter.request_batch(make_batch_request, requests_info)
+
+        return middleware
+
+    async def async_wrap_make_request(self, make_request):
+        async def middleware(method, params):
+            return await rpc_limiter.request_async(make_request, method, params)
+
+        return middleware
+
+
+def fan_out(func, items, workers=RPC_FANOUT_WORKERS):
+    """[func(item) for item in items] on a thread pool - rpc_limiter sets the actual pace
+
+    Each call runs in a copy of the caller's context so RPC accounting stays with the operation.
+    `items` may be a generator (e.g. sign_transactions): each call starts as soon as its item arrives.
+    """
+    size = len(items) if hasattr(items, "__len__") else None
+    if workers <= 1 or (size is not None and size <= 1):
+        return [func(item) for item in items]
+    context = copy_context()
+
+    def run(item):
+        with profiler.section(_current_command.get()):
+            return func(item)
+
+    with ThreadPoolExecutor(max_workers=min(workers, size or workers)) as pool:
+        return list(pool.map(lambda item: context.copy().run(run, item), items))
+
+
+def batch_read(requests_for, items, batch_size=BALANCE_BATCH_SIZE):
+    """[results of requests_for(item) for item in items], `batch_size` items per JSON-RPC batch
+
+    requests_for(item) returns a tuple of reads (web3.eth calls or contract functions) and is called
+    inside the batch, so they are queued instead of sent. Batches run in parallel through fan_out and
+    pass the limiter and the RPC accounting like any other request; a failed read raises.
+    """
+    items = list(items)
+
+    def read_chunk(chunk):
+        with web3.batch_requests() as batch:
+            sizes = []
+            for item in chunk:
+                reads = requests_for(item)
+                sizes.append(len(reads))
+                for read in reads:
+                    batch.add(read)
+            responses = iter(batch.execute())
+        return [tuple(next(responses) for _ in range(size)) for size in sizes]
+
+    chunks = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    return [result for results in fan_out(read_chunk, chunks) for result in results]
+
+# === MULTI-ENDPOINT BROADCAST ===
+# Extra endpoints that get every signed transaction alongside BSC_RPC_URL, comma separated
+BROADCAST_RPC_URLS = [url.strip() for url in os.getenv("BROADCAST_RPC_URLS", "").split(",") if url.strip()]
+BROADCAST_TIMEOUT = float(os.getenv("BROADCAST_TIMEOUT", "5"))  # seconds per endpoint
+# Error messages meaning the node already has the transaction (geth, erigon, nethermind, bsc relays)
+ALREADY_KNOWN_ERRORS = ("already known", "known transaction", "already imported", "alreadyknown", "already exists")
+PRIMARY_ENDPOINT = "primary"  # BSC_RPC_URL, sent through web3 so accounting and the limiter see it
+
+
+def is_already_known(message):
+    message = str(message).lower()
+    return any(marker in message for marker in ALREADY_KNOWN_ERRORS)
+
+
+def endpoint_label(url):
+    """host[:port] of an endpoint - URLs often carry an API key in the path"""
+    return url if url == PRIMARY_ENDPOINT else urlparse(url).netloc or url
+
+
+class Broadcaster:
+    """Sends each signed transaction to every endpoint at once and returns on the first acceptance
+
+    "Already known" is a success for the caller - the node has the transaction from another relay -
+    but only a real acceptance earns "first". That endpoint is credited with the inclusion once a
+    receipt is seen (wait_for_receipt, or the in-flight reaper), so the stats show which relay
+    actually gets our transactions mined.
+    """
+
+    def __init__(self, urls, include_primary=True, timeout=BROADCAST_TIMEOUT):
+        self.endpoints = ([PRIMARY_ENDPOINT] if include_primary else []) + list(urls)
+        if not self.endpoints:
+            raise ValueError("Broadcaster needs at least one endpoint")
+        self.timeout = timeout
+        self._sessions = {url: requests.Session() for url in self.endpoints if url != PRIMARY_ENDPOINT}
+        self._pool = ThreadPoolExecutor(max_workers=4 * len(self.endpoints), thread_name_prefix="broadcast")
+        self.stats = {url: {"accepted": 0, "already_known": 0, "errors": 0, "first": 0, "included": 0}
+                      for url in self.endpoints}
+        self._latency = {url: LatencyHistogram() for url in self.endpoints}
+        self._first = {}  # tx hash -> endpoint that accepted it first
+        self._lock = threading.Lock()
+
+    def _send_one(self, url, raw_transaction):
+        """'accepted' or 'already_known', raises on any other answer"""
+        if url == PRIMARY_ENDPOINT:
+            try:
+                web3.eth.send_raw_transaction(raw_transaction)
+                return "accepted"
+            except Exception as e:
+                if is_already_known(e):
+                    return "already_known"
+                raise
+        response = self._sessions[url].post(url, json={
+            "jsonrpc": "2.0", "id": 1, "method": "eth_sendRawTransaction", "params": [Web3.to_hex(raw_transaction)]
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        error = response.json().get("error")
+        if error is None:
+            return "accepted"
+        if is_already_known(error.get("message")):
+            return "already_known"
+        raise ValueError(error.get("message", error))
+
+    def send(self, signed_tx):
+        """Broadcast and return the transaction hash as soon as one endpoint has accepted it"""
+        tx_hash = HexBytes(signed_tx.hash)
+        answers = queue.SimpleQueue()
+        context = copy_context()
+
+        def send_one(url):
+            start = time.perf_counter()
+            try:
+                outcome = context.copy().run(self._send_one, url, signed_tx.raw_transaction)
+            except Exception as e:
+                outcome = e
+            self._record(tx_hash, url, outcome, time.perf_counter() - start)
+            answers.put((url, outcome))
+
+        for url in self.endpoints:
+            self._pool.submit(send_one, url)
+        errors = []
+        for _ in self.endpoints:
+            url, outcome = answers.get()
+            if not isinstance(outcome, Exception):
+                return tx_hash
+            errors.append(f"{endpoint_label(url)}: {outcome}")
+        raise ValueError("Broadcast rejected by every endpoint - " + "; ".join(errors))
+
+    def _record(self, tx_hash, url, outcome, seconds):
+        with self._lock:
+            stats = self.stats[url]
+            if isinstance(outcome, Exception):
+                stats["errors"] += 1
+                return
+            stats[outcome] += 1
+            self._latency[url].observe(seconds)
+            if outcome != "accepted" or tx_hash in self._first:
+                return
+            self._first[tx_hash] = url
+            stats["first"] += 1
+        log_event("broadcast_first", f"📡 {endpoint_label(url)} accepted {Web3.to_hex(tx_hash)} first "
+                                     f"({seconds * 1000:.0f} ms)", logging.DEBUG,
+                  endpoint=endpoint_label(url), tx=Web3.to_hex(tx_hash), ms=round(seconds * 1000, 1))
+
+    def included(self, tx_hash):
+        """A receipt exists: credit the endpoint that accepted the transaction first"""
+        with self._lock:
+            url = self._first.pop(bytes(tx_hash), None)
+            if url is not None:
+                self.stats[url]["included"] += 1
+
+    def status(self):
+        with self._lock:
+            return {endpoint_label(url): {**self.stats[url],
+                                          "p50_ms": round(self._latency[url].percentile(0.5) * 1000, 1)}
+                    for url in self.endpoints}
+
+
+broadcaster = Broadcaster(BROADCAST_RPC_URLS) if BROADCAST_RPC_URLS else None
+
 # === TELEGRAM BOT FUNCTIONS ===
 last_update_id = 0
+# Held from reading the main wallet's 'pending' nonce to the broadcast, by every main-wallet send (Telegram,
+# daemon, menu, batcher), so none of them ever share a nonce
+transaction_lock = threading.RLock()
 
 
 def get_telegram_updates():
@@ -148,7 +1677,7 @@ def get_telegram_updates():
         if not token:
             return []
 
-        url = f"https://api.telegram.org/bot{token}/getUpdates"
+        url = f"{TELEGRAM_API_URL}/bot{token}/getUpdates"
         params = {"offset": last_update_id + 1, "timeout": 0}  # NO TIMEOUT = INSTANT
         response = requests.get(url, params=params, timeout=1)
 
@@ -208,8 +1737,28 @@ def execute_telegram_bet(cmd, wallet_manager, swap_manager, betting_manager):
 
         selected_wallet = wallet_manager.wallets[cmd['wallet_idx']]
 
-        # Show preview
-        expected_bnb = swap_manager.get_usdt_to_bnb_rate(cmd['usdt_amount'])
+        # Nothing is swapped unless the bet can still be included before the lock
+        with span("admission"):
+            admission = bet_admission.admit(cmd.get('sent_at'), cmd.get('retargeted', False))
+        if admission.verdict == 'stale':
+            send_telegram_message(f"❌ Dropped stale /bet {cmd['wallet_idx'] + 1}/{cmd['usdt_amount']:g}/{cmd['direction']}: "
+                                  f"sent before epoch {admission.epoch} started, its round has locked")
+            return False
+        if admission.verdict == 'reject':
+            send_telegram_message(f"❌ Too late for epoch {admission.epoch}: {admission.seconds_left:.0f}s to lock, "
+                                  f"swap + bet need ~{admission.needed:.0f}s. Nothing was sent.")
+            return False
+        if admission.verdict == 'next':
+            send_telegram_message(f"⏭️ Too late for this round - betting on epoch {admission.epoch} "
+                                  f"once it opens, ~{admission.seconds_left:.0f}s from now")
+            in_next_round(admission, run_retargeted_bet, cmd)
+            return True
+        admitted_at = time.perf_counter()
+
+        # Show preview - the same quote prices the swap, unless swaps are batched
+        with span("rate"):
+            quote = swap_quote(int(cmd['usdt_amount'] * 1e18), [USDT_CONTRACT, WBNB])
+        expected_bnb = quote.expected_out / 1e18
 
         preview_msg = (
             f"⚡ INSTANT TELEGRAM BET!\n\n"
@@ -221,29 +1770,37 @@ def execute_telegram_bet(cmd, wallet_manager, swap_manager, betting_manager):
         send_telegram_message(preview_msg)
 
         # Execute swap
-        success = swap_manager.swap_usdt_to_bnb(
-            cmd['usdt_amount'],
-            selected_wallet['address']
-        )
+        if SWAP_BATCH_WINDOW > 0:
+            success = swap_batcher.swap(cmd['usdt_amount'], selected_wallet['address'])
+        else:
+            success = swap_manager.swap_usdt_to_bnb(
+                cmd['usdt_amount'],
+                selected_wallet['address'],
+                quote
+            )
 
         if not success:
             send_telegram_message("❌ Swap failed!")
             return False
 
         send_telegram_message("✅ Swap completed! Placing bet...")
-        time.sleep(0.5)
+        with span("sleep"):
+            time.sleep(0.5)
 
         # Get updated balance and place bet
-        selected_wallet = wallet_manager.get_wallet_balances(selected_wallet)
-        bet_amount = selected_wallet['balance_bnb'] * 0.95  # Use 95% for gas
-
-        betting_success = betting_manager.place_bet(
-            selected_wallet,
-            cmd['direction'],
-            bet_amount
-        )
+        with span("balance"):
+            selected_wallet = wallet_manager.get_wallet_balances(selected_wallet)
+        bet_amount = bettable_amount(selected_wallet)
+
+        with transaction_lock:
+            betting_success = betting_manager.place_bet(
+                selected_wallet,
+                cmd['direction'],
+                bet_amount
+            )
 
         if betting_success:
+            bet_admission.observe_send(time.perf_counter() - admitted_at)
             success_msg = (
                 f"🎯 BET PLACED INSTANTLY!\n\n"
                 f"💱 Swapped: {cmd['usdt_amount']} USDT\n"
@@ -262,70 +1819,682 @@ def execute_telegram_bet(cmd, wallet_manager, swap_manager, betting_manager):
         return False
 
 
-def check_telegram_commands():
-    """Check for new Telegram commands and execute them INSTANTLY"""
-    updates = get_telegram_updates()
+def run_retargeted_bet(cmd):
+    """A /bet moved to the next round by admission control - runs on in_next_round's thread"""
+    rpc_before = rpc_accounting.snapshot()
+    with track_command("bet"):
+        with telegram_bet_lock():
+            execute_telegram_bet({**cmd, 'retargeted': True}, WalletManager(), SwapManager(), BettingManager())
+    report_rpc_usage("bet", rpc_before)
 
-    for update in updates:
-        try:
-            if 'message' in update and 'text' in update['message']:
-                message_text = update['message']['text']
 
-                # Parse bet command
-                bet_cmd = parse_bet_command(message_text)
-                if bet_cmd:
-                    print(f"⚡ INSTANT Telegram bet: {message_text}")
+def fleet_pnl_text(wallet_manager):
+    """Fleet P&L report as text - analytics needs NumPy, so it is only imported when asked for"""
+    try:
+        import analytics
+    except ImportError as e:
+        return f"❌ Analytics unavailable ({e}) - pip install numpy"
+    return analytics.format_report(analytics.fleet_pnl(wallet_manager))
 
-                    # Create managers
-                    wallet_manager = WalletManager()
-                    swap_manager = SwapManager()
-                    betting_manager = BettingManager()
 
-                    # Execute bet INSTANTLY
-                    execute_telegram_bet(bet_cmd, wallet_manager, swap_manager, betting_manager)
+def send_pnl_report():
+    """/pnl handler - runs on a router worker, loading history must not hold up /bet"""
+    try:
+        with operation("analytics"):
+            send_telegram_message(fleet_pnl_text(WalletManager()))
+    except Exception as e:
+        send_telegram_message(f"❌ P&L report failed: {e}")
 
-        except Exception as e:
-            print(f"⚠️ Error processing Telegram update: {e}")
 
+# === TELEGRAM QUERIES ===
+# /balance, /claimable and /status answer from memory only: the balance cache, the auto-claimer's
+# queue, the round tracker and the in-flight list. Nothing here may call the chain.
+TELEGRAM_QUERY_TOP = 5  # wallets listed per reply
+_wallet_names = (None, {})  # (wallet file mtime, address -> name)
 
-class WalletManager:
-    def load_wallets(self):
-        try:
-            if os.path.exists(self.wallets_file):
-                with open(self.wallets_file, 'r') as f:
-                    return json.load(f)
-            return []
-        except Exception as e:
-            print(f"⚠️ Error loading wallets: {e}")
-            return []
 
-    def save_wallets(self):
-        try:
-            with open(self.wallets_file, 'w') as f:
-                json.dump(self.wallets, f, indent=2)
-        except Exception as e:
-            print(f"⚠️ Error saving wallets: {e}")
+def wallet_names(wallets_file="created_wallets.json"):
+    """address -> name from the wallet file, re-read only when the file changes"""
+    global _wallet_names
+    try:
+        mtime = os.stat(wallets_file).st_mtime_ns
+    except OSError:
+        return {}
+    if mtime != _wallet_names[0]:
+        with open(wallets_file) as f:
+            _wallet_names = (mtime, {data['address']: data['name'] for data in json.load(f)})
+    return _wallet_names[1]
 
-    def __init__(self):
-        self.wallets_file = "created_wallets.json"
-        self.wallets = self.load_wallets()
 
-    def create_new_wallet(self, name=None):
+def _age(seconds):
+    return f"{seconds:.0f}s" if seconds < 120 else f"{seconds / 60:.0f}m"
+
+
+def balance_text():
+    """/balance: main wallet and fleet totals as last read, with how old the readings are"""
+    names = wallet_names()
+    entries = balance_cache.snapshot()
+    main_address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
+    lines = ["💰 BALANCES (cached)"]
+    if main_address in entries:
+        bnb_wei, usdt_wei, age = entries[main_address]
+        lines.append(f"🏦 Main: {bnb_wei / 1e18:.6f} BNB | {usdt_wei / 1e18:.2f} USDT ({_age(age)} ago)")
+    else:
+        lines.append("🏦 Main: not read yet")
+
+    fleet = [(names[address], *entry) for address, entry in entries.items() if address in names]
+    if not fleet:
+        lines.append(f"👛 None of the {len(names)} wallets read yet")
+        return "\n".join(lines)
+    lines.append(f"👛 {len(fleet)}/{len(names)} wallets: {sum(bnb for _, bnb, _, _ in fleet) / 1e18:.6f} BNB | "
+                 f"{sum(usdt for _, _, usdt, _ in fleet) / 1e18:.2f} USDT")
+    lines.append(f"🕒 Oldest reading {_age(max(age for _, _, _, age in fleet))} ago")
+    fleet.sort(key=lambda entry: -entry[1])
+    lines.append("🔝 Top wallets:")
+    lines.extend(f"  {name}: {bnb / 1e18:.6f} BNB" for name, bnb, _, _ in fleet[:TELEGRAM_QUERY_TOP])
+    return "\n".join(lines)
+
+
+def claimable_text():
+    """/claimable: wins and refunds the auto-claimer has settled but not claimed yet"""
+    if not auto_claimer.running:
+        return ("🎁 Auto-claimer is off, so claimables are not tracked\n"
+                "Start with --auto-claim / AUTO_CLAIM=1, or use /pnl for a full scan")
+    pending = auto_claimer.claimable()
+    lines = ["🎁 PENDING CLAIMS"]
+    if pending:
+        lines.append(f"💰 {sum(payout for _, _, payout in pending) / 1e18:.6f} BNB in "
+                     f"{sum(epochs for _, epochs, _ in pending)} epochs across {len(pending)} wallets")
+        lines.extend(f"  {wallet.name}: {payout / 1e18:.6f} BNB ({epochs} epochs)"
+                     for wallet, epochs, payout in pending[:TELEGRAM_QUERY_TOP])
+    else:
+        lines.append("🎉 Nothing waiting to be claimed")
+    lines.append(f"🎲 {len(bet_ledger)} bets waiting for their round to end")
+    return "\n".join(lines)
+
+
+def status_text():
+    """/status: current round, time to lock and what is in flight"""
+    round_state = round_tracker.snapshot()
+    lines = ["📡 STATUS"]
+    if round_state["epoch"] is None:
+        lines.append("🎲 Round not read yet")
+    else:
+        now = chain_clock.now()
+        to_lock = round_state["lock_timestamp"] - now
+        if to_lock > 0:
+            timing = f"locks in {to_lock:.0f}s"
+        else:
+            timing = f"locked, closes in {max(0, round_state['close_timestamp'] - now):.0f}s"
+        lines.append(f"🎲 Epoch {round_state['epoch']}: {timing} (read {_age(round_state['age'])} ago)")
+
+    transactions = in_flight.snapshot()
+    lines.append(f"📤 {len(transactions)} transactions in flight")
+    lines.extend(f"  {operation or '-'} {Web3.to_hex(tx_hash)[:12]}… {_age(age)}"
+                 for tx_hash, operation, age in transactions[:TELEGRAM_QUERY_TOP])
+    lines.append(f"⏱️ {len(bet_scheduler.pending())} scheduled bets pending")
+    admission = bet_admission.status()
+    lines.append(f"🚦 /bet needs ~{bet_admission.needed_seconds():.1f}s before lock "
+                 f"({admission['admitted']} admitted, {admission['rejected']} rejected, "
+                 f"{admission['retargeted']} retargeted, {admission['stale']} stale)")
+    if broadcaster is not None:
+        for label, stats in broadcaster.status().items():
+            lines.append(f"📡 {label}: first {stats['first']}, included {stats['included']}, "
+                         f"p50 {stats['p50_ms']} ms, {stats['errors']} errors")
+    if SWAP_BATCH_WINDOW > 0:
+        batching = swap_batcher.status()
+        lines.append(f"📦 Swap batching: {batching['requests']} swaps in {batching['batches']} batches, "
+                     f"{batching['gas_per_request']:,} gas each")
+    if swap_stats["sent"]:
+        lines.append(f"💱 Swaps: {swap_stats['sent']} sent, {swap_stats['reverted']} reverted, "
+                     f"{swap_stats['failed']} failed after {SWAP_RETRIES} re-quotes")
+    if auto_claimer.running:
+        lines.append(f"🤖 Auto-claimer: {auto_claimer.status()['queued_epochs']} epochs queued")
+    profiling = profiler.status()
+    if profiling["mode"] or profiling["tracing_memory"]:
+        lines.append(f"🔬 Profiling: {profiling['mode'] or 'no CPU session'}"
+                     + (f" for {profiling['seconds']:.0f}s" if profiling["mode"] else "")
+                     + (f", {profiling['traced_mb']} MB traced" if profiling["tracing_memory"] else ""))
+    routing = telegram_router.status()
+    lines.append(f"📨 Telegram: {routing['waiting']} commands waiting from {routing['senders']} senders, "
+                 f"{routing['limited'] + routing['full']} dropped, {routing['refused']} refused")
+    limiter = rpc_limiter.stats()
+    lines.append(f"🔌 RPC: {limiter['in_flight']}/{limiter['concurrency_limit']:g} in flight, "
+                 f"{limiter['throttled']} throttled")
+    return "\n".join(lines)
+
+
+TELEGRAM_QUERIES = {
+    '/balance': balance_text,
+    '/claimable': claimable_text,
+    '/status': status_text,
+}
+
+
+# Who may send admin commands such as /profile: user or chat ids, default the bot's own TELEGRAM_CHAT_ID
+TELEGRAM_ADMIN_IDS = {admin.strip() for admin in os.getenv("TELEGRAM_ADMIN_IDS", "").split(",") if admin.strip()}
+
+
+def is_telegram_admin(message):
+    admins = TELEGRAM_ADMIN_IDS or {os.getenv("TELEGRAM_CHAT_ID")}
+    return (str(message.get('from', {}).get('id')) in admins
+            or str(message.get('chat', {}).get('id')) in admins)
+
+
+def profile_command(message_text):
+    """/profile [cpu|sample [SECONDS] | stop | mem [stop] | status] - reply text"""
+    args = message_text.split()[1:]
+    action = args[0].lower() if args else "status"
+    try:
+        if action in ("cpu", "sample"):
+            mode = "cprofile" if action == "cpu" else "sampling"
+            seconds = float(args[1]) if len(args) > 1 else None
+            profiler.start(mode, seconds, on_stop=lambda path, summary: send_telegram_message(summary))
+            return f"🔬 {mode} profiling started" + (f", report in {seconds:g}s" if seconds else " - /profile stop to dump")
+        if action == "stop":
+            return profiler.stop()[1]
+        if action == "mem":
+            if args[1:] == ["stop"]:
+                profiler.memory_stop()
+                return "🧠 Allocation tracing stopped"
+            return profiler.memory_snapshot()[1]
+        if action == "status":
+            return "🔬 " + json.dumps(profiler.status())
+        return "❌ Usage: /profile cpu|sample [seconds] | stop | mem [stop] | status"
+    except (RuntimeError, ValueError) as e:
+        return f"❌ {e}"
+
+
+def answer_telegram_query(command, received_at):
+    """Reply to a query command; the answer is built from memory, only sending it is network"""
+    with track_command(command.lstrip('/'), started_at=received_at):
+        with span("build"):
+            text = TELEGRAM_QUERIES[command]()
+        send_telegram_message(text)
+
+
+# === TELEGRAM ROUTER ===
+# Commands are taken only from allowed chats/users and queued per sender; worker threads serve the
+# senders round-robin, so one operator's burst of /bet never holds up another operator's command
+TELEGRAM_ALLOWED_IDS = {allowed.strip() for allowed in os.getenv("TELEGRAM_ALLOWED_IDS", "").split(",")
+                        if allowed.strip()}  # user or chat ids, on top of the admins and TELEGRAM_CHAT_ID
+TELEGRAM_USER_RATE = float(os.getenv("TELEGRAM_USER_RATE", "60"))  # queued commands per minute per sender, 0 = no limit
+TELEGRAM_USER_BURST = int(os.getenv("TELEGRAM_USER_BURST", "10"))  # commands a sender may send at once
+TELEGRAM_QUEUE_LIMIT = int(os.getenv("TELEGRAM_QUEUE_LIMIT", "20"))  # commands waiting per sender
+TELEGRAM_WORKERS = max(2, int(os.getenv("TELEGRAM_WORKERS", "8")))  # threads running queued commands
+TELEGRAM_LOCK_PRIORITY = float(os.getenv("TELEGRAM_LOCK_PRIORITY", "15"))  # seconds: bets go first this close to their deadline
+# Chat the command being handled came from, so replies go back there
+_reply_chat = ContextVar("reply_chat", default=None)
+
+RoutedCommand = namedtuple("RoutedCommand", ["kind", "message", "received_at"])
+
+
+def is_telegram_allowed(message):
+    allowed = TELEGRAM_ALLOWED_IDS | TELEGRAM_ADMIN_IDS | {os.getenv("TELEGRAM_CHAT_ID")}
+    return (str(message.get('from', {}).get('id')) in allowed
+            or str(message.get('chat', {}).get('id')) in allowed)
+
+
+def telegram_sender(message):
+    """Queue key: the user who sent it, or the chat for messages without one"""
+    return str(message.get('from', {}).get('id') or message.get('chat', {}).get('id'))
+
+
+@contextmanager
+def reply_to(message):
+    token = _reply_chat.set(message.get('chat', {}).get('id'))
+    try:
+        yield
+    finally:
+        _reply_chat.reset(token)
+
+
+class TelegramRouter:
+    """Per-sender command queues served round-robin by a pool of worker threads
+
+    Each sender has a token bucket (TELEGRAM_USER_RATE per minute, TELEGRAM_USER_BURST at once)
+    and at most TELEGRAM_QUEUE_LIMIT commands waiting. Bets share the main wallet's
+    transaction_lock unless swaps are batched, so then only one runs at a time - a second one
+    would only wait on the lock, in whatever order the lock hands it out. One worker is always
+    kept for bets. Within TELEGRAM_LOCK_PRIORITY seconds of the point where /bet stops making
+    the current round (lock minus bet_admission's estimate), bets jump ahead of every other
+    queued command, still one sender after another.
+    """
+
+    def __init__(self, workers=TELEGRAM_WORKERS):
+        self.workers = workers
+        self.stats = {"queued": 0, "served": 0, "limited": 0, "full": 0, "refused": 0, "prioritized": 0}
+        self._queues = {}  # sender -> deque of RoutedCommand, in round-robin order
+        self._buckets = {}
+        self._running = Counter()  # lane -> commands running
+        self._warned = set()  # senders told they are over their share since their last queued command
+        self._threads = []
+        self._condition = threading.Condition()
+
+    def handlers(self):
+        return {
+            "bet": handle_telegram_bet,
+            "pnl": lambda message, received_at: send_pnl_report(),
+            "profile": lambda message, received_at: send_telegram_message(profile_command(message['text'])),
+        }
+
+    @staticmethod
+    def _lane(command):
+        return "bet" if command.kind == "bet" else "other"
+
+    def _limit(self, lane):
+        if lane == "bet" and SWAP_BATCH_WINDOW <= 0:
+            return 1
+        return self.workers - 1
+
+    def refuse(self, message):
+        with self._condition:
+            self.stats["refused"] += 1
+        log_event("telegram_refused", "🚫 Ignored Telegram message from a chat/user not allowed", logging.WARNING,
+                  chat=message.get('chat', {}).get('id'), user=message.get('from', {}).get('id'))
+
+    def submit(self, kind, message, received_at):
+        """Queue a command, 'queued' - or 'limited' / 'full' when the sender is over its share
+
+        A dropped command is answered once, not once per message of a flood.
+        """
+        sender = telegram_sender(message)
+        with self._condition:
+            bucket = self._buckets.get(sender)
+            if bucket is None:
+                bucket = self._buckets[sender] = TokenBucket(TELEGRAM_USER_RATE / 60, TELEGRAM_USER_BURST)
+            queue = self._queues.get(sender, ())
+            if len(queue) >= TELEGRAM_QUEUE_LIMIT:
+                verdict = "full"
+            elif not bucket.take():
+                verdict = "limited"
+            else:
+                verdict = "queued"
+                self._queues.setdefault(sender, deque()).append(RoutedCommand(kind, message, received_at))
+                self._warned.discard(sender)
+                self._condition.notify()
+            self.stats[verdict] += 1
+            warn = verdict != "queued" and sender not in self._warned
+            if warn:
+                self._warned.add(sender)
+            self._start_workers()
+        if verdict != "queued":
+            log_event("telegram_limited", f"⏳ {kind} from {sender} not queued ({verdict})", logging.WARNING,
+                      sender=sender, kind=kind, verdict=verdict)
+        if warn:
+            send_telegram_message(f"⏳ Slow down - {message.get('text')} was dropped, "
+                                  + ("too many commands waiting" if verdict == "full" else
+                                     f"limit is {TELEGRAM_USER_RATE:g} per minute"))
+        return verdict
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"telegram-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _bets_urgent(self):
+        round_state = round_tracker.snapshot()
+        if round_state["epoch"] is None:
+            return False
+        to_lock = round_state["lock_timestamp"] - chain_clock.now()
+        return 0 < to_lock and to_lock - bet_admission.needed_seconds() <= TELEGRAM_LOCK_PRIORITY
+
+    def _pick(self):
+        """(sender, command) to run next, or None while nothing queued may start"""
+        urgent = any(c.kind != "bet" for q in self._queues.values() for c in q) and self._bets_urgent()
+        for bets_first in ((True, False) if urgent else (False,)):
+            for sender, queue in self._queues.items():
+                if bets_first:
+                    command = next((c for c in queue if c.kind == "bet"), None)
+                else:
+                    command = queue[0]
+                if command is not None and self._running[self._lane(command)] < self._limit(self._lane(command)):
+                    if bets_first and command is not queue[0]:
+                        self.stats["prioritized"] += 1
+                    return sender, command
+        return None
+
+    def _next(self):
+        with self._condition:
+            while True:
+                picked = self._pick()
+                if picked is not None:
+                    break
+                self._condition.wait()
+            sender, command = picked
+            queue = self._queues.pop(sender)  # served: the sender goes to the back of the rotation
+            queue.remove(command)
+            if queue:
+                self._queues[sender] = queue
+            self._running[self._lane(command)] += 1
+            return command
+
+    def _work(self):
+        handlers = self.handlers()
+        while True:
+            command = self._next()
+            try:
+                with reply_to(command.message):
+                    handlers[command.kind](command.message, command.received_at)
+            except Exception as e:
+                log_event("telegram_error", f"⚠️ Error running Telegram {command.kind}: {e}", logging.WARNING,
+                          error=str(e))
+            finally:
+                with self._condition:
+                    self._running[self._lane(command)] -= 1
+                    self.stats["served"] += 1
+                    self._condition.notify_all()
+
+    def status(self):
+        with self._condition:
+            return {**self.stats, "waiting": sum(len(queue) for queue in self._queues.values()),
+                    "senders": len(self._queues), "running": sum(self._running.values())}
+
+
+telegram_router = TelegramRouter()
+
+
+def check_telegram_commands():
+    """Check for new Telegram commands: queries are answered right away, the rest is queued per sender"""
+    updates = get_telegram_updates()
+    received_at = time.perf_counter()
+
+    for update in updates:
+        try:
+            if 'message' in update and 'text' in update['message']:
+                message = update['message']
+                message_text = message['text']
+                if not is_telegram_allowed(message):
+                    telegram_router.refuse(message)
+                    continue
+
+                with reply_to(message):
+                    if message_text.strip() == '/stats':
+                        send_telegram_message(latency_metrics.format_stats())
+                        continue
+
+                    if message_text.strip() in TELEGRAM_QUERIES:
+                        answer_telegram_query(message_text.strip(), received_at)
+                        continue
+
+                    if message_text.strip() == '/pnl':
+                        kind = "pnl"
+                    elif message_text.startswith('/profile') and is_telegram_admin(message):
+                        kind = "profile"
+                    elif message_text.startswith('/bet '):
+                        kind = "bet"
+                    else:
+                        continue
+
+                    telegram_router.submit(kind, message, received_at)
+
+        except Exception as e:
+            log_event("telegram_error", f"⚠️ Error processing Telegram update: {e}", logging.WARNING, error=str(e))
+
+
+def telegram_bet_lock():
+    """transaction_lock for a whole Telegram bet - unless swaps are batched: the batcher then takes
+    it for the main wallet's part, and place_bet for the bet itself"""
+    return nullcontext() if SWAP_BATCH_WINDOW > 0 else transaction_lock
+
+
+def handle_telegram_bet(message, received_at):
+    message_text = message['text']
+    rpc_before = rpc_accounting.snapshot()
+    with track_command("bet", started_at=received_at):
+        # Time spent queued behind the poll and the router, i.e. behind other senders' commands
+        latency_metrics.observe("bet", "receive", time.perf_counter() - received_at)
+
+        # Parse bet command
+        with span("parse"):
+            bet_cmd = parse_bet_command(message_text)
+        if bet_cmd:
+            bet_cmd['sent_at'] = message.get('date')
+            log_event("telegram_bet", f"⚡ INSTANT Telegram bet: {message_text}", command=message_text)
+
+            # Create managers
+            wallet_manager = WalletManager()
+            swap_manager = SwapManager()
+            betting_manager = BettingManager()
+
+            # Execute bet INSTANTLY (after any daemon command still using the main wallet)
+            with telegram_bet_lock():
+                execute_telegram_bet(bet_cmd, wallet_manager, swap_manager, betting_manager)
+    report_rpc_usage("bet", rpc_before)
+
+
+DEFAULT_WALLET_NAME_PATTERN = "Wallet_{n}_{time}"
+BULK_POOL_THRESHOLD = 64  # below this a process pool costs more than it saves
+KEYSTORE_SCRYPT_N = int(os.getenv("KEYSTORE_SCRYPT_N", 2 ** 18))  # geth/eth-account standard; lower only for testing
+
+# Signers are parsed/decrypted once and reused for every transaction: address -> LocalAccount
+_signers = {}
+_keystore_password = None
+
+
+def _run_in_pool(func, items, *args, workers=None):
+    """Run func(chunk, *args) over chunks of items on a process pool, results flattened in order"""
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or len(items) < BULK_POOL_THRESHOLD:
+        return func(items, *args)
+
+    # A few chunks per worker keeps every core busy without per-item IPC overhead
+    num_chunks = min(len(items), workers * 4)
+    chunk_size = -(-len(items) // num_chunks)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_result in executor.map(func, chunks, *[repeat(arg) for arg in args]):
+            results.extend(chunk_result)
+    return results
+
+
+def _generate_key_chunk(numbers):
+    """Generate one (private_key, signer) pair per item - runs inside a pool worker"""
+    pairs = []
+    for _ in numbers:
+        private_key = "0x" + secrets.token_hex(32)
+        pairs.append((private_key, Account.from_key(private_key)))
+    return pairs
+
+
+def _encrypt_key_chunk(private_keys, password, iterations):
+    """Encrypt private keys into scrypt keystores - runs inside a pool worker"""
+    return [Account.encrypt(key, password, kdf="scrypt", iterations=iterations) for key in private_keys]
+
+
+def _decrypt_keystore_chunk(keystores, password):
+    """Decrypt keystores into LocalAccount signers - runs inside a pool worker"""
+    return [Account.from_key(Account.decrypt(keystore, password)) for keystore in keystores]
+
+
+def generate_wallet_keys(count, workers=None):
+    """Generate keys and derive signers for `count` wallets, spread over a process pool"""
+    return _run_in_pool(_generate_key_chunk, range(count), workers=workers)
+
+
+# === BULK SIGNING ===
+SIGNING_WORKERS = int(os.getenv("SIGNING_WORKERS", "0"))  # processes for bulk signing, 0 = one per core
+# Pool start-up (a process per worker, signers pickled to each) only pays off for big batches on several cores
+SIGNING_POOL_THRESHOLD = int(os.getenv("SIGNING_POOL_THRESHOLD", "512"))
+SIGNING_CHUNK = 16  # transactions per pool task: amortises IPC, still streams early
+
+SignedRawTransaction = namedtuple("SignedRawTransaction", ["raw_transaction", "hash"])
+
+# Inside signing pool workers: address -> LocalAccount, set once by the pool initializer
+_pool_signers = {}
+
+
+def _init_signing_worker(signers):
+    # Already-parsed accounts: rebuilding them from raw keys would cost a public-key
+    # derivation per key and worker, about as much as the signature itself
+    global _pool_signers
+    _pool_signers = signers
+
+
+def _sign_tx_chunk(items):
+    """Sign (address, tx) pairs with the worker's signers - runs inside a pool worker"""
+    signed = []
+    for address, tx in items:
+        signed_tx = _pool_signers[address].sign_transaction(tx)
+        signed.append((bytes(signed_tx.raw_transaction), bytes(signed_tx.hash)))
+    return signed
+
+
+def sign_transactions(items, workers=None):
+    """Sign (signer, tx dict) pairs, yielding signed transactions in input order as they are ready
+
+    With a single worker (one core, or SIGNING_WORKERS=1) or fewer than SIGNING_POOL_THRESHOLD
+    transactions this signs in the calling thread: a one-process pool only adds start-up and IPC.
+    Otherwise every signer involved is handed to each pool worker once (pool initializer), the
+    unsigned transactions go out in chunks and the raw bytes stream back in order, so the
+    broadcaster can start on the first chunk.
+    """
+    workers = workers or SIGNING_WORKERS or os.cpu_count() or 1
+    if workers < 2 or len(items) < SIGNING_POOL_THRESHOLD:
+        for signer, tx in items:
+            yield signer.sign_transaction(tx)
+        return
+
+    signers = {signer.address: signer for signer, _ in items}
+    pairs = [(signer.address, tx) for signer, tx in items]
+    chunks = [pairs[i:i + SIGNING_CHUNK] for i in range(0, len(pairs), SIGNING_CHUNK)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_signing_worker,
+                             initargs=(signers,)) as executor:
+        for chunk in executor.map(_sign_tx_chunk, chunks):
+            for raw_transaction, tx_hash in chunk:
+                yield SignedRawTransaction(raw_transaction, tx_hash)
+
+
+def get_signer(wallet_info):
+    """Return the cached LocalAccount for a wallet, parsing a plaintext key at most once"""
+    if not isinstance(wallet_info, WalletRecord):
+        wallet_info = WalletRecord.from_dict(wallet_info)
+    signer = _signers.get(wallet_info.address)
+    if signer is None:
+        if wallet_info.private_key is None:
+            raise Exception(f"Wallet '{wallet_info.name}' is locked - unlock the keystore first")
+        signer = Account.from_key(wallet_info.private_key)
+        _signers[wallet_info.address] = signer
+    return signer
+
+
+def get_main_signer():
+    """Return the cached LocalAccount for the main wallet"""
+    address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
+    signer = _signers.get(address)
+    if signer is None:
+        signer = Account.from_key(MAIN_PRIVATE_KEY)
+        _signers[address] = signer
+    return signer
+
+
+class WalletRecord:
+    """One sub-wallet in memory: checksummed address computed once, balances in integer wei
+
+    bnb_wei / usdt_wei hold the last balances read by get_wallet_balances. Older call sites can
+    still read wallet['name'], wallet['balance_bnb'], 'keystore' in wallet, ...; the wallet file
+    keeps its JSON format through from_dict() / to_dict().
+    """
+    __slots__ = ("name", "address", "private_key", "keystore", "created_at", "bnb_wei", "usdt_wei")
+    _KEYS = frozenset(__slots__ + ("balance_bnb", "balance_usdt"))
+
+    def __init__(self, name, address, private_key=None, keystore=None, created_at=None, bnb_wei=0, usdt_wei=0):
+        self.name = name
+        self.address = Web3.to_checksum_address(address)
+        self.private_key = private_key
+        self.keystore = keystore
+        self.created_at = created_at
+        self.bnb_wei = bnb_wei
+        self.usdt_wei = usdt_wei
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['name'], data['address'], data.get('private_key'), data.get('keystore'), data.get('created_at'),
+            Web3.to_wei(Decimal(str(data.get('balance_bnb', 0))), 'ether'),
+            Web3.to_wei(Decimal(str(data.get('balance_usdt', 0))), 'ether'),
+        )
+
+    def to_dict(self):
+        data = {"name": self.name, "address": self.address}
+        if self.private_key is not None:
+            data["private_key"] = self.private_key
+        data.update(created_at=self.created_at, balance_bnb=self.balance_bnb, balance_usdt=self.balance_usdt)
+        if self.keystore is not None:
+            data["keystore"] = self.keystore
+        return data
+
+    @property
+    def balance_bnb(self):
+        """Float BNB for display - amounts that get sent are computed from bnb_wei"""
+        return self.bnb_wei / 10 ** 18
+
+    @property
+    def balance_usdt(self):
+        return self.usdt_wei / 10 ** 18
+
+    def __getitem__(self, key):
+        value = getattr(self, key) if key in self._KEYS else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return key in self._KEYS and getattr(self, key) is not None
+
+    def __repr__(self):
+        return f"WalletRecord({self.name!r}, {self.address})"
+
+
+class WalletManager:
+    def load_wallets(self):
+        try:
+            if os.path.exists(self.wallets_file):
+                with open(self.wallets_file, 'r') as f:
+                    return [WalletRecord.from_dict(data) for data in json.load(f)]
+            return []
+        except Exception as e:
+            print(f"⚠️ Error loading wallets: {e}")
+            return []
+
+    def save_wallets(self):
+        try:
+            # Write to a temp file and swap it in so a crash never leaves a half-written wallet file
+            tmp_file = self.wallets_file + ".tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump([wallet.to_dict() for wallet in self.wallets], f, indent=2)
+            os.replace(tmp_file, self.wallets_file)
+        except Exception as e:
+            print(f"⚠️ Error saving wallets: {e}")
+
+    def __init__(self):
+        self.wallets_file = "created_wallets.json"
+        self.wallets = self.load_wallets()
+        self.by_address = {wallet.address: wallet for wallet in self.wallets}
+
+    def find(self, address):
+        """The WalletRecord for an address (any capitalisation), or None"""
+        return self.by_address.get(Web3.to_checksum_address(address))
+
+    def create_new_wallet(self, name=None):
         try:
             private_key = "0x" + secrets.token_hex(32)
             account = Account.from_key(private_key)
             address = account.address
             if not name:
                 name = f"Wallet_{len(self.wallets) + 1}_{datetime.now().strftime('%H%M%S')}"
-            wallet_info = {
-                "name": name,
-                "address": address,
-                "private_key": private_key,
-                "created_at": datetime.now().isoformat(),
-                "balance_bnb": 0,
-                "balance_usdt": 0
-            }
+            wallet_info = WalletRecord(name, address, private_key, created_at=datetime.now().isoformat())
+            if _keystore_password:
+                wallet_info.keystore = Account.encrypt(
+                    private_key, _keystore_password, kdf="scrypt", iterations=KEYSTORE_SCRYPT_N
+                )
+                wallet_info.private_key = None
+            _signers[address] = account
             self.wallets.append(wallet_info)
+            self.by_address[address] = wallet_info
             self.save_wallets()
             print(f"✅ New wallet created!")
             print(f"📝 Name: {name}")
@@ -336,19 +2505,139 @@ class WalletManager:
             print(f"❌ Error creating wallet: {e}")
             return None
 
-    def get_wallet_balances(self, wallet_info):
+    def create_wallets_bulk(self, count, name_pattern=None, workers=None):
+        """Create many wallets at once - keys are generated on a process pool and saved in one write
+
+        name_pattern placeholders: {n} wallet number, {i} position in this batch, {time} HHMMSS
+        """
         try:
-            address = Web3.to_checksum_address(wallet_info["address"])
-            bnb_balance = web3.eth.get_balance(address)
-            bnb_balance = web3.from_wei(bnb_balance, 'ether')
-            usdt_balance = usdt_contract.functions.balanceOf(address).call()
-            usdt_balance = usdt_balance / 1e18
-            wallet_info["balance_bnb"] = float(bnb_balance)
-            wallet_info["balance_usdt"] = float(usdt_balance)
-            return wallet_info
+            if count <= 0:
+                print("❌ Wallet count must be positive")
+                return []
+            if not name_pattern:
+                name_pattern = DEFAULT_WALLET_NAME_PATTERN
+
+            start = time.time()
+            first_number = len(self.wallets) + 1
+            stamp = datetime.now().strftime('%H%M%S')
+            created_at = datetime.now().isoformat()
+            # Validate the pattern before spending any time on key generation
+            name_pattern.format(n=first_number, i=1, time=stamp)
+
+            key_pairs = generate_wallet_keys(count, workers)
+            keystores = None
+            if _keystore_password:
+                keystores = _run_in_pool(
+                    _encrypt_key_chunk, [private_key for private_key, _ in key_pairs],
+                    _keystore_password, KEYSTORE_SCRYPT_N, workers=workers
+                )
+
+            new_wallets = []
+            for i, (private_key, signer) in enumerate(key_pairs):
+                wallet_info = WalletRecord(
+                    name_pattern.format(n=first_number + i, i=i + 1, time=stamp), signer.address,
+                    None if keystores else private_key, keystores[i] if keystores else None, created_at
+                )
+                _signers[signer.address] = signer
+                new_wallets.append(wallet_info)
+
+            self.wallets.extend(new_wallets)
+            self.by_address.update((wallet.address, wallet) for wallet in new_wallets)
+            self.save_wallets()
+
+            elapsed = time.time() - start
+            print(f"✅ Created {count} wallets in {elapsed:.2f}s")
+            print(f"📝 Names: {new_wallets[0].name} ... {new_wallets[-1].name}")
+            print(f"💾 Saved to: {self.wallets_file}")
+            return new_wallets
+        except (KeyError, IndexError, ValueError) as e:
+            print(f"❌ Invalid name pattern '{name_pattern}': {e}")
+            return []
         except Exception as e:
-            print(f"⚠️ Error getting balances: {e}")
-            return wallet_info
+            print(f"❌ Error creating wallets: {e}")
+            return []
+
+    def reload(self):
+        """Re-read the wallet file after another process changed it (e.g. the create-wallets command)
+
+        Rebuilds the address index and unlocks new keystore wallets with the password this process
+        already unlocked with, so the new wallets can be found and signed for straight away.
+        """
+        self.wallets = self.load_wallets()
+        self.by_address = {wallet.address: wallet for wallet in self.wallets}
+        password = _keystore_password or os.getenv("WALLET_KEYSTORE_PASSWORD")
+        if password and self.is_encrypted():
+            self.unlock(password)
+
+    def is_encrypted(self):
+        return any(wallet.keystore is not None for wallet in self.wallets)
+
+    def unlock(self, password=None, workers=None):
+        """Decrypt every keystore wallet once into the signer cache - scrypt runs in parallel"""
+        global _keystore_password
+        locked = [wallet for wallet in self.wallets if wallet.keystore is not None and wallet.address not in _signers]
+        if not locked:
+            return True
+
+        if password is None:
+            password = (_keystore_password or os.getenv("WALLET_KEYSTORE_PASSWORD")
+                        or getpass.getpass("🔐 Keystore password: "))
+        try:
+            start = time.time()
+            signers = _run_in_pool(
+                _decrypt_keystore_chunk, [wallet.keystore for wallet in locked], password, workers=workers
+            )
+        except ValueError:
+            print("❌ Wrong keystore password")
+            return False
+
+        unlocked = 0
+        for wallet, signer in zip(locked, signers):
+            if signer.address != wallet.address:
+                print(f"⚠️ Keystore of '{wallet.name}' does not match its address, skipping")
+                continue
+            _signers[signer.address] = signer
+            unlocked += 1
+        _keystore_password = password
+        print(f"🔓 Unlocked {unlocked} wallets in {time.time() - start:.2f}s")
+        return True
+
+    def encrypt_wallets(self, password, workers=None):
+        """Move every plaintext private key into an encrypted keystore entry"""
+        global _keystore_password
+        try:
+            plaintext = [wallet for wallet in self.wallets if wallet.private_key is not None]
+            if plaintext:
+                start = time.time()
+                keystores = _run_in_pool(
+                    _encrypt_key_chunk, [wallet.private_key for wallet in plaintext],
+                    password, KEYSTORE_SCRYPT_N, workers=workers
+                )
+                for wallet, keystore in zip(plaintext, keystores):
+                    get_signer(wallet)
+                    wallet.keystore = keystore
+                    wallet.private_key = None
+                self.save_wallets()
+                print(f"🔐 Encrypted {len(plaintext)} wallets in {time.time() - start:.2f}s")
+            else:
+                print("🔐 All wallets are already encrypted")
+            _keystore_password = password
+            return True
+        except Exception as e:
+            print(f"❌ Error encrypting wallets: {e}")
+            return False
+
+    def get_wallet_balances(self, wallet_info):
+        """Refresh bnb_wei / usdt_wei of a WalletRecord from the cache or the chain
+
+        Raises if the balances can't be read (after rpc_limiter's retries) instead of leaving
+        the previous values in place - bets and drains are sized from these numbers.
+        """
+        balances = balance_cache.get(wallet_info.address)
+        if balances is None:
+            balances = balance_cache.fetch(wallet_info.address)
+        wallet_info.bnb_wei, wallet_info.usdt_wei = balances
+        return wallet_info
 
     def list_wallets(self):
         if not self.wallets:
@@ -358,11 +2647,14 @@ class WalletManager:
         print("📋 CREATED WALLETS")
         print("=" * 80)
         for i, wallet in enumerate(self.wallets):
-            wallet = self.get_wallet_balances(wallet)
             print(f"{i + 1}. {wallet['name']}")
             print(f"   Address: {wallet['address']}")
-            print(f"   BNB: {wallet['balance_bnb']:.6f}")
-            print(f"   USDT: {wallet['balance_usdt']:.2f}")
+            try:
+                wallet = self.get_wallet_balances(wallet)
+                print(f"   BNB: {wallet.balance_bnb:.6f}")
+                print(f"   USDT: {wallet.balance_usdt:.2f}")
+            except Exception as e:
+                print(f"   ⚠️ Balances unavailable: {e}")
             print(f"   Created: {wallet['created_at']}")
             print("-" * 80)
 
@@ -370,6 +2662,7 @@ class WalletManager:
         try:
             if 0 <= wallet_index < len(self.wallets):
                 deleted_wallet = self.wallets.pop(wallet_index)
+                self.by_address.pop(deleted_wallet.address, None)
                 self.save_wallets()
                 print(f"✅ Wallet '{deleted_wallet['name']}' deleted successfully!")
                 return True
@@ -385,42 +2678,39 @@ class WalletManager:
             if not (0 <= wallet_index < len(self.wallets)):
                 print("❌ Invalid wallet index")
                 return False
-            wallet = self.wallets[wallet_index]
-            wallet = self.get_wallet_balances(wallet)
-            if wallet['balance_bnb'] <= 0.00011:
-                print(f"❌ Wallet '{wallet['name']}' has insufficient BNB to empty (need >0.001 BNB)")
+            wallet = self.get_wallet_balances(self.wallets[wallet_index])
+            if wallet.bnb_wei <= EMPTY_MIN_WEI:
+                print(f"❌ Wallet '{wallet.name}' has insufficient BNB to empty (need >0.00011 BNB)")
                 return False
-            print(f"\n💸 Emptying wallet: {wallet['name']}")
-            print(f"💰 Current balance: {wallet['balance_bnb']:.6f} BNB")
+            print(f"\n💸 Emptying wallet: {wallet.name}")
+            print(f"💰 Current balance: {wallet.balance_bnb:.6f} BNB")
             print(f"📧 Sending to: {main_wallet_address}")
             gas_fee = web3.to_wei('0.0001', 'ether')
-            total_balance = web3.eth.get_balance(Web3.to_checksum_address(wallet['address']))
-            if total_balance <= gas_fee:
-                print("❌ Balance too low to cover gas fees")
-                return False
-            amount_to_send = total_balance - gas_fee
+            amount_to_send = wallet.bnb_wei - gas_fee
             amount_bnb = web3.from_wei(amount_to_send, 'ether')
             print(f"📤 Sending amount: {amount_bnb:.6f} BNB")
-            nonce = web3.eth.get_transaction_count(Web3.to_checksum_address(wallet['address']))
-            tx = {
-                'to': Web3.to_checksum_address(main_wallet_address),
-                'value': amount_to_send,
-                'gas': 21000,
-                'gasPrice': web3.to_wei('0.1', 'gwei'),
-                'nonce': nonce,
-                'chainId': 56
-            }
-            signed_tx = web3.eth.account.sign_transaction(tx, wallet['private_key'])
-            tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            touched = (wallet.address, main_wallet_address)
+            with send_lock(wallet.address):
+                nonce = web3.eth.get_transaction_count(wallet.address, 'pending')
+                tx = {
+                    'to': Web3.to_checksum_address(main_wallet_address),
+                    'value': amount_to_send,
+                    'gas': 21000,
+                    'gasPrice': web3.to_wei('0.1', 'gwei'),
+                    'nonce': nonce,
+                    'chainId': CHAIN_ID
+                }
+                signed_tx = get_signer(wallet).sign_transaction(tx)
+                tx_hash = send_transaction(signed_tx, *touched)
             print(f"🚀 Transaction sent! TX Hash: {web3.to_hex(tx_hash)}")
             print(f"⏳ Waiting for confirmation...")
-            receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+            receipt = wait_for_receipt(tx_hash, *touched)
             if receipt.status == 1:
                 print("✅ Wallet emptied successfully!")
                 print(f"🔗 View on BSCScan: https://bscscan.com/tx/{web3.to_hex(tx_hash)}")
                 message = (
                     f"💸 Wallet Emptied!\n\n"
-                    f"👤 Wallet: {wallet['name']}\n"
+                    f"👤 Wallet: {wallet.name}\n"
                     f"💰 Amount: {amount_bnb:.6f} BNB\n"
                     f"📧 Sent to: Main Wallet\n"
                     f"🔗 TX: {web3.to_hex(tx_hash)}\n"
@@ -436,57 +2726,103 @@ class WalletManager:
             return False
 
 
+DRAIN_DUST_WEI = 10 ** 13  # 0.00001 BNB - below this a wallet is left alone
+EMPTY_MIN_WEI = 11 * 10 ** 13  # 0.00011 BNB - empty_wallet needs more than its 0.0001 BNB gas fee
+DISTRIBUTE_MIN_WEI = 10 ** 15  # 0.001 BNB
+DISTRIBUTE_GAS_RESERVE_WEI = 3 * 10 ** 13  # 0.00003 BNB kept back per transfer
+
+
 def drain_all_wallets(wallet_manager, main_wallet_address):
-    any_drained = False
-    for idx, wallet in enumerate(wallet_manager.wallets):
-        wallet = wallet_manager.get_wallet_balances(wallet)
-        if Web3.to_checksum_address(wallet['address']) == Web3.to_checksum_address(main_wallet_address):
-            continue
-        balance = wallet['balance_bnb']
-        if balance <= 0.00001:
-            print(f"🦴 Wallet {wallet['name']} has no dust to drain.")
-            continue
-        print(f"\n💀 Draining wallet {wallet['name']}... Current BNB: {balance:.8f}")
+    """Send every sub-wallet's BNB (minus gas) to the main wallet, wallets drained in parallel
+
+    Balances and nonces are read in parallel, the transfers signed in bulk (sign_transactions)
+    and broadcast as they stream back. Each wallet is its own sender, so there are no shared
+    nonces; rpc_limiter keeps the fan-out at whatever pace the endpoint accepts. The wallets'
+    send_locks are held until the broadcasts are out, so a claim or scheduled bet from one of
+    them never signs the same nonce; receipts are waited for after.
+    """
+    main_address = Web3.to_checksum_address(main_wallet_address)
+    gas_price = web3.to_wei('0.1', 'gwei')
+    gas_limit = 21000
+    gas_fee = gas_limit * gas_price
+
+    def prepare(wallet):
         try:
-            address = Web3.to_checksum_address(wallet['address'])
-            private_key = wallet['private_key']
-            nonce = web3.eth.get_transaction_count(address)
-            total_balance_wei = web3.eth.get_balance(address)
-            gas_price = web3.to_wei('0.1', 'gwei')
-            gas_limit = 21000
-            gas_fee = gas_limit * gas_price
-            if total_balance_wei <= gas_fee:
-                print(f"❌ Not enough to cover gas in {wallet['name']}")
-                continue
-            value = total_balance_wei - gas_fee
+            address = wallet.address
+            if address == main_address:
+                return None
+            wallet = wallet_manager.get_wallet_balances(wallet)
+            if wallet.bnb_wei <= DRAIN_DUST_WEI:
+                log_event("drain_skipped", f"🦴 Wallet {wallet.name} has no dust to drain.", logging.DEBUG,
+                          wallet=wallet.name, bnb_wei=wallet.bnb_wei)
+                return None
+            log_event("drain_start", f"\n💀 Draining wallet {wallet.name}... Current BNB: {wallet.balance_bnb:.8f}",
+                      wallet=wallet.name, bnb_wei=wallet.bnb_wei)
+            if wallet.bnb_wei <= gas_fee:
+                log_event("drain_skipped", f"❌ Not enough to cover gas in {wallet.name}", logging.WARNING,
+                          wallet=wallet.name, bnb_wei=wallet.bnb_wei)
+                return None
             tx = {
-                'to': Web3.to_checksum_address(main_wallet_address),
-                'value': value,
+                'to': main_address,
+                'value': wallet.bnb_wei - gas_fee,
                 'gas': gas_limit,
                 'gasPrice': gas_price,
-                'nonce': nonce,
-                'chainId': 56
+                'nonce': web3.eth.get_transaction_count(address, 'pending'),
+                'chainId': CHAIN_ID
             }
-            signed_tx = web3.eth.account.sign_transaction(tx, private_key)
-            tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            print(f"🚀 Draining... TX Hash: {web3.to_hex(tx_hash)}")
-            receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+            return wallet, get_signer(wallet), tx
+        except Exception as e:
+            log_event("drain_failed", f"❌ Error while draining {wallet.name}: {e}", logging.ERROR,
+                      wallet=wallet.name, error=str(e))
+            return None
+
+    def broadcast(item):
+        (wallet, _, tx), signed_tx = item
+        try:
+            tx_hash = send_transaction(signed_tx, wallet.address, main_address)
+            log_event("drain_sent", f"🚀 Draining... TX Hash: {web3.to_hex(tx_hash)}",
+                      wallet=wallet.name, tx=web3.to_hex(tx_hash))
+            return wallet, tx, tx_hash
+        except Exception as e:
+            log_event("drain_failed", f"❌ Error while draining {wallet.name}: {e}", logging.ERROR,
+                      wallet=wallet.name, error=str(e))
+        return None
+
+    def confirm(item):
+        wallet, tx, tx_hash = item
+        try:
+            receipt = wait_for_receipt(tx_hash, wallet.address, main_address)
             if receipt.status == 1:
-                print(f"✅ Drained {wallet['name']}! Sent: {web3.from_wei(value, 'ether'):.8f} BNB")
-                any_drained = True
-            else:
-                print(f"❌ Drain failed for {wallet['name']}")
-            time.sleep(1)
+                log_event("drain_done", f"✅ Drained {wallet.name}! Sent: {web3.from_wei(tx['value'], 'ether'):.8f} BNB",
+                          wallet=wallet.name, value_wei=tx['value'], gas_used=receipt.gasUsed)
+                return True
+            log_event("drain_failed", f"❌ Drain failed for {wallet.name}", logging.ERROR,
+                      wallet=wallet.name, tx=web3.to_hex(tx_hash))
         except Exception as e:
-            print(f"❌ Error while draining {wallet['name']}: {e}")
+            log_event("drain_failed", f"❌ Error while draining {wallet.name}: {e}", logging.ERROR,
+                      wallet=wallet.name, error=str(e))
+        return False
+
+    with ExitStack() as locks:
+        # In address order, so two bulk sends over the same wallets can't deadlock
+        for address in sorted({wallet.address for wallet in wallet_manager.wallets}):
+            locks.enter_context(send_lock(address))
+        transfers = [prepared for prepared in fan_out(prepare, wallet_manager.wallets) if prepared]
+        signed = sign_transactions([(signer, tx) for _, signer, tx in transfers])
+        sent = [item for item in fan_out(broadcast, zip(transfers, signed)) if item]
+    any_drained = any(fan_out(confirm, sent))
     if any_drained:
         send_telegram_message("💀 All wallets drained! Dust sent to main wallet.")
     else:
-        print("🦴 No wallets had dust to drain.")
+        log_event("drain_done", "🦴 No wallets had dust to drain.")
+    return any_drained
+
 
+def distribute_wealth(wallet_manager, main_wallet_address, confirm=True, disperse=False):
+    """Distribute 95% of main wallet BNB equally to all sub-wallets (confirm=False skips the prompt)
 
-def distribute_wealth(wallet_manager, main_wallet_address):
-    """Distribute 95% of main wallet BNB equally to all sub-wallets"""
+    disperse=True funds them through the disperse contract in a few transactions instead of one each.
+    """
     try:
         if not wallet_manager.wallets:
             print("❌ No wallets available to distribute to.")
@@ -494,96 +2830,102 @@ def distribute_wealth(wallet_manager, main_wallet_address):
 
         # Get main wallet balance
         main_address = Web3.to_checksum_address(main_wallet_address)
-        main_balance = web3.eth.get_balance(main_address)
-        main_balance_bnb = web3.from_wei(main_balance, 'ether')
+        main_balance, _ = balance_cache.get_or_fetch(main_address)
 
-        if main_balance_bnb < 0.001:
-            print(f"❌ Main wallet balance too low: {main_balance_bnb:.6f} BNB")
+        if main_balance < DISTRIBUTE_MIN_WEI:
+            print(f"❌ Main wallet balance too low: {web3.from_wei(main_balance, 'ether'):.6f} BNB")
             return False
 
-        # Calculate distribution amount (95% of balance)
-        total_to_distribute = main_balance_bnb * Decimal('0.95')
+        # 95% of the balance, minus a gas reserve per transfer, split equally - all in integer wei
+        total_to_distribute = main_balance * 95 // 100
         num_wallets = len(wallet_manager.wallets)
-        amount_per_wallet = total_to_distribute / num_wallets
-
-        # Reserve gas for transactions
-        gas_per_tx = Decimal('0.00003')  # BNB for gas
-        total_gas_needed = gas_per_tx * num_wallets
+        total_gas_needed = DISTRIBUTE_GAS_RESERVE_WEI * num_wallets
 
         if total_to_distribute < total_gas_needed:
-            print(f"❌ Not enough balance to cover gas fees. Need at least {total_gas_needed:.6f} BNB")
+            print(f"❌ Not enough balance to cover gas fees. "
+                  f"Need at least {web3.from_wei(total_gas_needed, 'ether'):.6f} BNB")
             return False
 
-        # Adjust per-wallet amount to account for gas
-        amount_per_wallet = (total_to_distribute - total_gas_needed) / num_wallets
+        amount_wei = (total_to_distribute - total_gas_needed) // num_wallets
+        amount_per_wallet = web3.from_wei(amount_wei, 'ether')
 
         print(f"\n💰 WEALTH DISTRIBUTION PREVIEW:")
-        print(f"📊 Main wallet balance: {main_balance_bnb:.6f} BNB")
-        print(f"💸 Total to distribute (95%): {total_to_distribute:.6f} BNB")
+        print(f"📊 Main wallet balance: {web3.from_wei(main_balance, 'ether'):.6f} BNB")
+        print(f"💸 Total to distribute (95%): {web3.from_wei(total_to_distribute, 'ether'):.6f} BNB")
         print(f"👥 Number of wallets: {num_wallets}")
         print(f"🎯 Amount per wallet: {amount_per_wallet:.6f} BNB")
-        print(f"⛽ Gas reserved: {total_gas_needed:.6f} BNB")
+        print(f"⛽ Gas reserved: {web3.from_wei(total_gas_needed, 'ether'):.6f} BNB")
 
-        confirm = input("\nProceed with distribution? (y/n): ").strip().lower()
-        if confirm != 'y':
+        if confirm and input("\nProceed with distribution? (y/n): ").strip().lower() != 'y':
             print("❌ Distribution cancelled.")
             return False
 
-        print(f"\n🚀 Starting distribution to {num_wallets} wallets...")
+        log_event("distribute_start", f"\n🚀 Starting distribution to {num_wallets} wallets...",
+                  wallets=num_wallets, amount_wei=amount_wei, disperse=disperse)
 
         successful_transfers = 0
         failed_transfers = 0
 
-        for i, wallet in enumerate(wallet_manager.wallets):
-            try:
-                wallet_address = Web3.to_checksum_address(wallet['address'])
-                wallet_name = wallet['name']
-
-                print(f"\n📤 Sending to wallet {i + 1}/{num_wallets}: {wallet_name}")
-                print(f"   Address: {wallet_address}")
-                print(f"   Amount: {amount_per_wallet:.6f} BNB")
-
-                # Get current nonce
-                nonce = web3.eth.get_transaction_count(main_address)
-
-                # Build transaction
-                tx = {
-                    'to': wallet_address,
-                    'value': web3.to_wei(amount_per_wallet, 'ether'),
+        if disperse:
+            result = disperse_bnb([(wallet.address, amount_wei) for wallet in wallet_manager.wallets])
+            successful_transfers = result['funded']
+            failed_transfers = result['failed']
+        else:
+            # One sender: every transfer is signed up front with consecutive nonces, broadcast
+            # strictly in nonce order under transaction_lock and only then waited for
+            with transaction_lock:
+                nonce = web3.eth.get_transaction_count(main_address, 'pending')
+                signer = get_main_signer()
+                transfers = [(wallet, {
+                    'to': wallet.address,
+                    'value': amount_wei,
                     'gas': 21000,
                     'gasPrice': web3.to_wei('0.1', 'gwei'),
-                    'nonce': nonce,
-                    'chainId': 56
-                }
-
-                # Sign and send transaction
-                signed_tx = web3.eth.account.sign_transaction(tx, MAIN_PRIVATE_KEY)
-                tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-
-                print(f"   🚀 TX Hash: {web3.to_hex(tx_hash)}")
-
-                # Wait for confirmation
-                receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
-
-                if receipt.status == 1:
-                    print(f"   ✅ Success!")
-                    successful_transfers += 1
-                else:
-                    print(f"   ❌ Failed!")
-                    failed_transfers += 1
-
-                # Small delay between transactions
-                time.sleep(1)
+                    'nonce': nonce + i,
+                    'chainId': CHAIN_ID
+                }) for i, wallet in enumerate(wallet_manager.wallets)]
+
+                sent = []
+                signed = sign_transactions([(signer, tx) for _, tx in transfers])
+                for i, ((wallet, tx), signed_tx) in enumerate(zip(transfers, signed)):
+                    log_event("distribute_transfer",
+                              f"\n📤 Sending to wallet {i + 1}/{num_wallets}: {wallet.name}\n"
+                              f"   Address: {wallet.address}\n"
+                              f"   Amount: {amount_per_wallet:.6f} BNB",
+                              wallet=wallet.name, nonce=tx['nonce'])
+                    try:
+                        tx_hash = send_transaction(signed_tx, main_address, wallet.address)
+                    except Exception as e:
+                        # Later nonces can never be mined past this gap
+                        log_event("distribute_failed",
+                                  f"   ❌ Error sending to {wallet.name}: {e} - stopping, {num_wallets - i} not sent",
+                                  logging.ERROR, wallet=wallet.name, not_sent=num_wallets - i, error=str(e))
+                        failed_transfers += num_wallets - i
+                        break
+                    log_event("distribute_sent", f"   🚀 TX Hash: {web3.to_hex(tx_hash)}",
+                              wallet=wallet.name, tx=web3.to_hex(tx_hash))
+                    sent.append((wallet, tx_hash))
+                signed.close()
+
+            def confirm_transfer(item):
+                wallet, tx_hash = item
+                try:
+                    return wait_for_receipt(tx_hash, main_address, wallet.address).status == 1
+                except Exception as e:
+                    log_event("distribute_failed", f"   ❌ Error confirming transfer to {wallet.name}: {e}",
+                              logging.ERROR, wallet=wallet.name, error=str(e))
+                    return False
 
-            except Exception as e:
-                print(f"   ❌ Error sending to {wallet_name}: {e}")
-                failed_transfers += 1
-                continue
+            confirmed = fan_out(confirm_transfer, sent)
+            successful_transfers = sum(confirmed)
+            failed_transfers += len(confirmed) - successful_transfers
 
-        print(f"\n🎉 DISTRIBUTION COMPLETE!")
-        print(f"✅ Successful transfers: {successful_transfers}")
-        print(f"❌ Failed transfers: {failed_transfers}")
-        print(f"💰 Total distributed: {successful_transfers * amount_per_wallet:.6f} BNB")
+        log_event("distribute_done",
+                  f"\n🎉 DISTRIBUTION COMPLETE!\n"
+                  f"✅ Successful transfers: {successful_transfers}\n"
+                  f"❌ Failed transfers: {failed_transfers}\n"
+                  f"💰 Total distributed: {successful_transfers * amount_per_wallet:.6f} BNB",
+                  successful=successful_transfers, failed=failed_transfers)
 
         # Send Telegram notification
         if successful_transfers > 0:
@@ -599,9 +2941,485 @@ def distribute_wealth(wallet_manager, main_wallet_address):
         return successful_transfers > 0
 
     except Exception as e:
-        print(f"❌ Error during wealth distribution: {e}")
+        log_event("distribute_failed", f"❌ Error during wealth distribution: {e}", logging.ERROR, error=str(e))
         return False
 
+# === DISPERSE (one-transaction fleet funding) ===
+DISPERSE_MAX_GAS = int(os.getenv("DISPERSE_MAX_GAS", "5000000"))  # gas cap per disperse transaction
+DISPERSE_BASE_GAS = 40000
+# CALL with value to a fresh account: 25000 new account + 9000 value transfer + cold access, with headroom
+DISPERSE_GAS_PER_RECIPIENT = 40000
+DISPERSE_MAX_RECIPIENTS = 500  # MAX_RECIPIENTS in contracts/Disperse.vy
+
+DISPERSE_ABI = [
+    {
+        "inputs": [
+            {"name": "recipients", "type": "address[]"},
+            {"name": "amounts", "type": "uint256[]"}
+        ],
+        "name": "disperseEther",
+        "outputs": [],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"name": "recipients", "type": "address[]"},
+            {"name": "amount", "type": "uint256"}
+        ],
+        "name": "disperseEtherEqual",
+        "outputs": [],
+        "stateMutability": "payable",
+        "type": "function"
+    }
+]
+
+# contracts/Disperse.vy compiled with vyper 0.4.3 (evm-version paris)
+DISPERSE_BYTECODE = (
+    "0x6103ed610011610000396103ed610000f360003560e01c60026003820660011b6103e701601e39600051565b63e63d"
+    "38ed81186103dc5760433611156103e2576004356004016101f48135116103e25780356000816101f481116103e25780"
+    "1561007957905b8060051b6020850101358060a01c6103e2578160051b60600152600101818118610054575b50508060"
+    "405250506024356004016101f48135116103e257803560208160051b018083613ee037505050613ee051604051181561"
+    "013257602080617de052600f617d80527f4c656e677468206d69736d6174636800000000000000000000000000000000"
+    "00617da052617d8081617de00181518152602082015160208201528051806020830101601f8260000316368237505060"
+    "1f19601f8251602001011690509050810190506308c379a0617dc05280600401617ddcfd5b6000617d80526000604051"
+    "6101f481116103e25780156101c757905b80617da052617d8051617da051613ee0518110156103e25760051b613f0001"
+    "518082018281106103e25790509050617d80526000600060006000617da051613ee0518110156103e25760051b613f00"
+    "0151617da0516040518110156103e25760051b606001516000f1156103e25760010181811861014e575b505034617d80"
+    "51111561025657602080617e00526010617da0527f4e6f7420656e6f7567682076616c75650000000000000000000000"
+    "0000000000617dc052617da081617e000181518152602082015160208201528051806020830101601f82600003163682"
+    "375050601f19601f8251602001011690509050810190506308c379a0617de05280600401617dfcfd5b471561026f5760"
+    "0060006000600047336000f1156103e2575b005b6397910c0d81186103dc5760433611156103e2576004356004016101"
+    "f48135116103e25780356000816101f481116103e25780156102d057905b8060051b6020850101358060a01c6103e257"
+    "8160051b606001526001018181186102ab575b5050806040525050346040516024358082028115838383041417156103"
+    "e25790509050111561037b57602080613f40526010613ee0527f4e6f7420656e6f7567682076616c7565000000000000"
+    "00000000000000000000613f0052613ee081613f400181518152602082015160208201528051806020830101601f8260"
+    "0003163682375050601f19601f8251602001011690509050810190506308c379a0613f205280600401613f3cfd5b6000"
+    "6040516101f481116103e25780156103bf57905b8060051b60600151613ee0526000600060006000602435613ee05160"
+    "00f1156103e257600101818118610391575b505047156103da57600060006000600047336000f1156103e2575b005b60"
+    "006000fd5b600080fd027103dc001a855820deb4952e745a19f89a50586bcd43e26e5fd4d37b4155d3bd051d2a26458b"
+    "5ffc1903ed810600a1657679706572830004030036"
+)
+
+
+def deploy_disperse_contract():
+    """Deploy contracts/Disperse.vy from the main wallet and use it for this session"""
+    global DISPERSE_CONTRACT
+    main_address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
+    factory = web3.eth.contract(abi=DISPERSE_ABI, bytecode=DISPERSE_BYTECODE)
+    with transaction_lock:
+        deploy_tx = factory.constructor().build_transaction({
+            'from': main_address,
+            'gas': 500000,
+            'gasPrice': web3.to_wei('0.1', 'gwei'),
+            'nonce': web3.eth.get_transaction_count(main_address, 'pending'),
+            'chainId': CHAIN_ID
+        })
+        signed_tx = get_main_signer().sign_transaction(deploy_tx)
+        tx_hash = send_transaction(signed_tx, main_address)
+    print(f"⏳ Deploying disperse contract... TX: {web3.to_hex(tx_hash)}")
+    receipt = wait_for_receipt(tx_hash, main_address)
+    if receipt.status != 1:
+        raise RuntimeError(f"Disperse deployment failed: {web3.to_hex(tx_hash)}")
+    DISPERSE_CONTRACT = receipt.contractAddress
+    print(f"✅ Disperse contract: {DISPERSE_CONTRACT}")
+    print(f"📝 Add DISPERSE_CONTRACT={DISPERSE_CONTRACT} to your .env")
+    return DISPERSE_CONTRACT
+
+
+def disperse_bnb(transfers):
+    """Send BNB from the main wallet to many addresses through the disperse contract
+
+    transfers: [(address, amount_wei), ...]. Equal amounts use disperseEtherEqual (less calldata).
+    Recipients are split into batches that fit DISPERSE_MAX_GAS; all batches are sent back to back
+    with consecutive nonces under transaction_lock, then confirmed outside it.
+    Returns {'transactions', 'gas_used', 'funded', 'failed'}.
+    """
+    if not DISPERSE_CONTRACT:
+        raise ValueError("DISPERSE_CONTRACT is not set - deploy one with: python manager_Version4.py deploy-disperse")
+    disperse_contract = web3.eth.contract(address=Web3.to_checksum_address(DISPERSE_CONTRACT), abi=DISPERSE_ABI)
+    main_address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
+    signer = get_main_signer()
+    transfers = [(Web3.to_checksum_address(address), int(amount)) for address, amount in transfers]
+    batch_size = min(DISPERSE_MAX_RECIPIENTS, (DISPERSE_MAX_GAS - DISPERSE_BASE_GAS) // DISPERSE_GAS_PER_RECIPIENT)
+    batches = [transfers[i:i + batch_size] for i in range(0, len(transfers), batch_size)]
+    log_event("disperse_start", f"📦 Dispersing to {len(transfers)} wallets in {len(batches)} transaction(s)...",
+              wallets=len(transfers), transactions=len(batches))
+
+    with transaction_lock:
+        nonce = web3.eth.get_transaction_count(main_address, 'pending')
+        sent = []
+        for batch in batches:
+            recipients = [address for address, _ in batch]
+            amounts = [amount for _, amount in batch]
+            if len(set(amounts)) == 1:
+                function = disperse_contract.functions.disperseEtherEqual(recipients, amounts[0])
+            else:
+                function = disperse_contract.functions.disperseEther(recipients, amounts)
+            tx = function.build_transaction({
+                'from': main_address,
+                'value': sum(amounts),
+                'gas': DISPERSE_BASE_GAS + DISPERSE_GAS_PER_RECIPIENT * len(batch),
+                'gasPrice': web3.to_wei('0.1', 'gwei'),
+                'nonce': nonce,
+                'chainId': CHAIN_ID
+            })
+            try:
+                tx_hash = send_transaction(signer.sign_transaction(tx), main_address, *recipients)
+            except Exception as e:
+                log_event("disperse_failed", f"   ❌ Batch of {len(batch)} failed to send: {e}", logging.ERROR,
+                          wallets=len(batch), error=str(e))
+                sent.append((batch, None))
+                continue
+            log_event("disperse_sent", f"   🚀 {len(batch)} wallets, TX Hash: {web3.to_hex(tx_hash)}",
+                      wallets=len(batch), tx=web3.to_hex(tx_hash))
+            sent.append((batch, tx_hash))
+            nonce += 1
+
+    result = {'transactions': 0, 'gas_used': 0, 'funded': 0, 'failed': 0}
+    for batch, tx_hash in sent:
+        if tx_hash is None:
+            result['failed'] += len(batch)
+            continue
+        receipt = wait_for_receipt(tx_hash, main_address, *[address for address, _ in batch])
+        result['transactions'] += 1
+        result['gas_used'] += receipt.gasUsed
+        if receipt.status == 1:
+            result['funded'] += len(batch)
+        else:
+            log_event("disperse_failed", f"   ❌ Disperse reverted: {web3.to_hex(tx_hash)}", logging.ERROR,
+                      wallets=len(batch), tx=web3.to_hex(tx_hash))
+            result['failed'] += len(batch)
+    log_event("disperse_done", f"✅ Funded {result['funded']} wallets with {result['transactions']} transaction(s), "
+                               f"{result['gas_used']} gas", **result)
+    return result
+
+
+# === REBALANCE (target balances with the fewest transfers) ===
+# A wallet this close to its target (BNB) is left alone - a transfer would mostly buy gas
+REBALANCE_TOLERANCE_WEI = Web3.to_wei(Decimal(os.getenv("REBALANCE_TOLERANCE", "0.0005")), 'ether')
+TRANSFER_GAS_PRICE_WEI = 10 ** 8  # 0.1 gwei, like every other transfer the bot sends
+TRANSFER_GAS_FEE_WEI = 21000 * TRANSFER_GAS_PRICE_WEI
+
+
+def plan_rebalance(balances, targets, tolerance_wei=REBALANCE_TOLERANCE_WEI, gas_fee_wei=TRANSFER_GAS_FEE_WEI):
+    """Fewest transfers that bring every wallet within tolerance of its target
+
+    balances / targets: {address: wei}. A wallet off target needs exactly one transfer - its surplus
+    to the main wallet (minus the gas it pays) or its shortfall from it - and a wallet within
+    tolerance needs none, so no plan through the main wallet is shorter.
+    Returns (drains, top_ups), both [(address, wei), ...].
+    """
+    drains, top_ups = [], []
+    for address, target in targets.items():
+        difference = balances[address] - target
+        if difference > tolerance_wei + gas_fee_wei:
+            drains.append((address, difference - gas_fee_wei))
+        elif -difference > tolerance_wei:
+            top_ups.append((address, -difference))
+    return drains, top_ups
+
+
+def _rebalance_drains(main_address, drains):
+    """Surplus of each wallet to the main wallet - every wallet is its own sender, so all at once
+
+    drains: [(WalletRecord, wei), ...]
+    """
+    if not drains:
+        return []
+    wallets = [wallet for wallet, _ in drains]
+
+    def send(item):
+        (wallet, tx), signed_tx = item
+        try:
+            return wallet, tx, send_transaction(signed_tx, wallet.address, main_address)
+        except Exception as e:
+            log_event("rebalance_failed", f"❌ Drain from {wallet.name} failed: {e}", logging.ERROR,
+                      wallet=wallet.name, error=str(e))
+        return None
+
+    def confirm(item):
+        if item is None:
+            return False
+        wallet, tx, tx_hash = item
+        try:
+            receipt = wait_for_receipt(tx_hash, wallet.address, main_address)
+            if receipt.status == 1:
+                log_event("rebalance_drained", f"⬅️ {wallet.name}: {web3.from_wei(tx['value'], 'ether'):.6f} BNB "
+                                               f"surplus to main wallet", logging.DEBUG,
+                          wallet=wallet.name, value_wei=tx['value'], tx=web3.to_hex(tx_hash))
+                return True
+            log_event("rebalance_failed", f"❌ Drain from {wallet.name} reverted", logging.ERROR,
+                      wallet=wallet.name, tx=web3.to_hex(tx_hash))
+        except Exception as e:
+            log_event("rebalance_failed", f"❌ Drain from {wallet.name} failed: {e}", logging.ERROR,
+                      wallet=wallet.name, error=str(e))
+        return False
+
+    # Each wallet's send_lock is held from its 'pending' nonce read until its transfer is out
+    with ExitStack() as locks:
+        for address in sorted({wallet.address for wallet in wallets}):
+            locks.enter_context(send_lock(address))
+        nonces = batch_read(lambda wallet: (web3.eth.get_transaction_count(wallet.address, 'pending'),), wallets)
+        transfers = [(wallet, {
+            'to': main_address,
+            'value': value,
+            'gas': 21000,
+            'gasPrice': TRANSFER_GAS_PRICE_WEI,
+            'nonce': nonce,
+            'chainId': CHAIN_ID
+        }) for wallet, (_, value), (nonce,) in zip(wallets, drains, nonces)]
+        signed = sign_transactions([(get_signer(wallet), tx) for wallet, tx in transfers])
+        sent = fan_out(send, zip(transfers, signed))
+    return fan_out(confirm, sent)
+
+
+def _rebalance_top_ups(main_address, top_ups, disperse):
+    """Shortfalls from the main wallet: one disperse batch, or transfers signed up front with
+    consecutive nonces, sent in nonce order and confirmed in parallel
+
+    transaction_lock is held only while the main wallet's nonces are read and sent, not for the receipts.
+    """
+    if disperse and len(top_ups) > 1:
+        result = disperse_bnb(top_ups)
+        return result['funded'], result['failed']
+    sent = []
+    with transaction_lock:
+        nonce = web3.eth.get_transaction_count(main_address, 'pending')
+        transfers = [{
+            'to': address,
+            'value': value,
+            'gas': 21000,
+            'gasPrice': TRANSFER_GAS_PRICE_WEI,
+            'nonce': nonce + i,
+            'chainId': CHAIN_ID
+        } for i, (address, value) in enumerate(top_ups)]
+        signed = sign_transactions([(get_main_signer(), tx) for tx in transfers])
+        for tx, signed_tx in zip(transfers, signed):
+            try:
+                sent.append((tx['to'], send_transaction(signed_tx, main_address, tx['to'])))
+            except Exception as e:
+                # Later nonces can never be mined past this gap
+                log_event("rebalance_failed", f"❌ Top-up of {tx['to']} failed to send: {e} - "
+                                              f"{len(transfers) - len(sent)} not sent", logging.ERROR,
+                          address=tx['to'], not_sent=len(transfers) - len(sent), error=str(e))
+                break
+        signed.close()
+
+    def confirm(item):
+        address, tx_hash = item
+        try:
+            return wait_for_receipt(tx_hash, main_address, address).status == 1
+        except Exception as e:
+            log_event("rebalance_failed", f"❌ Error confirming top-up of {address}: {e}", logging.ERROR,
+                      address=address, error=str(e))
+            return False
+
+    funded = sum(fan_out(confirm, sent))
+    return funded, len(top_ups) - funded
+
+
+def rebalance_wallets(wallet_manager, main_wallet_address, targets, confirm=True, disperse=False):
+    """Bring sub-wallets to target BNB balances with the fewest transfers (confirm=False skips the prompt)
+
+    targets: wei for every sub-wallet, or [(wallet, wei), ...] for just those wallets. The fleet's
+    balances are read in JSON-RPC batches, wallets above target send their surplus to the main wallet
+    and only wallets below target are topped up from it (through the disperse contract with
+    disperse=True). Drains and top-ups run at the same time unless the top-ups need the drained BNB.
+    """
+    try:
+        main_address = Web3.to_checksum_address(main_wallet_address)
+        if isinstance(targets, int):
+            targets = [(wallet, targets) for wallet in wallet_manager.wallets if wallet.address != main_address]
+        records = {wallet.address: wallet for wallet, _ in targets}
+        targets = {wallet.address: int(target) for wallet, target in targets}
+        if not targets:
+            print("❌ No wallets to rebalance.")
+            return None
+
+        balances = balance_cache.fetch_many([main_address, *targets])
+        main_balance = balances[main_address][0]
+        drains, top_ups = plan_rebalance({address: bnb for address, (bnb, _) in balances.items()}, targets)
+        drained_wei = sum(value for _, value in drains)
+        needed_wei = sum(value for _, value in top_ups) + DISTRIBUTE_GAS_RESERVE_WEI * len(top_ups)
+        untouched = len(targets) - len(drains) - len(top_ups)
+
+        print(f"\n⚖️ REBALANCE PREVIEW:")
+        print(f"👥 Wallets: {len(targets)} ({untouched} already within "
+              f"{web3.from_wei(REBALANCE_TOLERANCE_WEI, 'ether')} BNB of target)")
+        print(f"⬅️ Drain surplus of {len(drains)} wallet(s): {web3.from_wei(drained_wei, 'ether'):.6f} BNB")
+        print(f"➡️ Top up {len(top_ups)} wallet(s): {web3.from_wei(needed_wei, 'ether'):.6f} BNB incl. gas")
+        print(f"📊 Main wallet balance: {web3.from_wei(main_balance, 'ether'):.6f} BNB")
+        if not drains and not top_ups:
+            print("✅ Every wallet is already at its target.")
+            return {"drained": 0, "topped_up": 0, "failed": 0, "untouched": untouched}
+        if needed_wei > main_balance + drained_wei:
+            print(f"❌ Not enough BNB: top-ups need {web3.from_wei(needed_wei, 'ether'):.6f} BNB, main wallet "
+                  f"and surplus together hold {web3.from_wei(main_balance + drained_wei, 'ether'):.6f} BNB")
+            return None
+        if confirm and input("\nProceed with rebalance? (y/n): ").strip().lower() != 'y':
+            print("❌ Rebalance cancelled.")
+            return None
+
+        # Top-ups only wait for the drains when the main wallet can't cover them on its own
+        concurrent = needed_wei <= main_balance
+        log_event("rebalance_start", f"\n⚖️ Rebalancing: {len(drains)} drain(s), {len(top_ups)} top-up(s)"
+                                     f"{'' if concurrent else ' after the drains'}...",
+                  drains=len(drains), top_ups=len(top_ups), untouched=untouched, concurrent=concurrent)
+        steps = [lambda: _rebalance_drains(main_address, [(records[address], value) for address, value in drains]),
+                 lambda: _rebalance_top_ups(main_address, top_ups, disperse) if top_ups else (0, 0)]
+        if concurrent:
+            drained, (topped_up, failed) = fan_out(lambda step: step(), steps)
+        else:
+            drained, (topped_up, failed) = [step() for step in steps]
+        result = {"drained": sum(drained), "topped_up": topped_up,
+                  "failed": failed + len(drained) - sum(drained), "untouched": untouched}
+
+        log_event("rebalance_done", f"\n⚖️ REBALANCE COMPLETE!\n"
+                                    f"⬅️ Drained: {result['drained']}/{len(drains)}\n"
+                                    f"➡️ Topped up: {topped_up}/{len(top_ups)}\n"
+                                    f"❌ Failed: {result['failed']}", **result)
+        if result["drained"] or topped_up:
+            send_telegram_message(
+                f"⚖️ Wallets Rebalanced!\n\n"
+                f"⬅️ Drained: {result['drained']} wallets\n"
+                f"➡️ Topped up: {topped_up} wallets\n"
+                f"✅ Already on target: {untouched} wallets\n"
+                f"⏰ Time: {datetime.now().strftime('%H:%M:%S')}"
+            )
+        return result
+
+    except Exception as e:
+        log_event("rebalance_failed", f"❌ Error during rebalance: {e}", logging.ERROR, error=str(e))
+        return None
+
+
+# === SWAP SLIPPAGE ===
+# getAmountsOut already prices in the trade's own impact, so min_out only leaves SWAP_SLIPPAGE_BUFFER for other
+# swaps landing between the quote and the block. A swap that reverts anyway is re-quoted and resent at once.
+SWAP_SLIPPAGE_BUFFER = float(os.getenv("SWAP_SLIPPAGE_BUFFER", "0.003"))  # 0.3% below the quote
+SWAP_MAX_IMPACT = float(os.getenv("SWAP_MAX_IMPACT", "0.02"))  # cap on impact plus tolerance; bigger trades are refused
+SWAP_RETRIES = int(os.getenv("SWAP_RETRIES", "2"))  # fresh quote and resend after a revert
+SWAP_DEADLINE = 300  # seconds
+
+SwapQuote = namedtuple("SwapQuote", ["amount_in", "expected_out", "min_out", "impact", "slippage"])
+_pairs = {}  # sorted (token, token) -> (pair contract, token0 lowercase)
+swap_stats = Counter()  # sent, reverted, failed
+_swap_stats_lock = threading.Lock()
+
+
+def count_swap(outcome):
+    with _swap_stats_lock:
+        swap_stats[outcome] += 1
+
+
+def swap_pair(token_a, token_b):
+    """The router's pair contract for two tokens and its token0, looked up once"""
+    key = tuple(sorted((token_a.lower(), token_b.lower())))
+    if key not in _pairs:
+        factory = web3.eth.contract(address=router_contract.functions.factory().call(), abi=FACTORY_ABI)
+        pair_address = factory.functions.getPair(Web3.to_checksum_address(token_a),
+                                                 Web3.to_checksum_address(token_b)).call()
+        pair = web3.eth.contract(address=pair_address, abi=PAIR_ABI)
+        _pairs[key] = (pair, pair.functions.token0().call().lower())
+    return _pairs[key]
+
+
+def swap_slippage(amount_in_wei, reserve_in_wei):
+    """(price impact, tolerance) for selling amount_in into a constant-product pool holding reserve_in
+
+    The impact is how far the trade itself moves the price, fee left out: amount_in / (reserve_in + amount_in).
+    The quote has it priced in already, so it never widens the tolerance; it narrows SWAP_SLIPPAGE_BUFFER so
+    impact plus tolerance stays within SWAP_MAX_IMPACT, and a trade left with less than half the buffer is refused.
+    """
+    impact = amount_in_wei / (reserve_in_wei + amount_in_wei) if reserve_in_wei else 1.0
+    if impact > SWAP_MAX_IMPACT - SWAP_SLIPPAGE_BUFFER / 2:
+        raise ValueError(f"price impact {impact:.2%} leaves too little of SWAP_MAX_IMPACT ({SWAP_MAX_IMPACT:.2%}) "
+                         f"for the price to move before the swap lands")
+    return impact, min(SWAP_SLIPPAGE_BUFFER, SWAP_MAX_IMPACT - impact)
+
+
+def apply_slippage(expected_out_wei, slippage):
+    return expected_out_wei * (10 ** 6 - round(slippage * 10 ** 6)) // 10 ** 6
+
+
+def swap_quote(amount_in_wei, path):
+    """Router quote and pair reserves in one JSON-RPC batch -> SwapQuote with a slippage-adjusted min_out"""
+    pair, token0 = swap_pair(path[0], path[-1])
+    amounts, reserves = batch_read(
+        lambda _: (router_contract.functions.getAmountsOut(amount_in_wei, path), pair.functions.getReserves()),
+        [None]
+    )[0]
+    impact, slippage = swap_slippage(amount_in_wei, reserves[0] if path[0].lower() == token0 else reserves[1])
+    return SwapQuote(amount_in_wei, amounts[-1], apply_slippage(amounts[-1], slippage), impact, slippage)
+
+
+def swap_amount_out(receipt, path):
+    """What a mined swap paid out, from its pair's Swap log - not from a balance difference, which
+    any other transfer to the recipient in the same block would throw off"""
+    pair, token0 = swap_pair(path[0], path[-1])
+    for event in pair.events.Swap().process_receipt(receipt, errors=DISCARD):
+        if event.address == pair.address:
+            return event.args.amount0Out if path[-1].lower() == token0 else event.args.amount1Out
+    raise ValueError(f"no Swap log from the pair in {web3.to_hex(receipt.transactionHash)}")
+
+
+def send_swap(quote, path, recipient_address):
+    """Sign and send a router swap from the main wallet: BNB in when the path starts at WBNB, else tokens in"""
+    main_address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
+    deadline = int(time.time()) + SWAP_DEADLINE
+    if path[0].lower() == WBNB.lower():
+        swap = router_contract.functions.swapExactETHForTokens(quote.min_out, path, recipient_address, deadline)
+    else:
+        swap = router_contract.functions.swapExactTokensForETH(quote.amount_in, quote.min_out, path,
+                                                               recipient_address, deadline)
+    touched = {main_address, recipient_address}
+    with transaction_lock:
+        tx_params = {
+            'from': main_address,
+            'gas': 300000,
+            'gasPrice': web3.to_wei('0.1', 'gwei'),
+            'nonce': web3.eth.get_transaction_count(main_address, 'pending'),
+            'chainId': CHAIN_ID
+        }
+        if path[0].lower() == WBNB.lower():
+            tx_params['value'] = quote.amount_in
+        signed_tx = get_main_signer().sign_transaction(swap.build_transaction(tx_params))
+        return send_transaction(signed_tx, *touched)
+
+
+def execute_swap(quote, path, recipient_address):
+    """Send a swap for `quote` and wait for it; if it reverts, re-quote and resend right away
+
+    Tries SWAP_RETRIES more times - a revert here is min_out after the price moved, so only a fresh
+    quote helps. Returns the receipt of the swap that went through, or None.
+    """
+    recipient_address = Web3.to_checksum_address(recipient_address)
+    main_address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
+    for attempt in range(SWAP_RETRIES + 1):
+        # Retries are timed as a whole, so swap_send / swap_receipt stay one sample per command
+        with span("swap_retry") if attempt else nullcontext():
+            if attempt:
+                quote = swap_quote(quote.amount_in, path)
+            with span("swap_send") if not attempt else nullcontext():
+                tx_hash = send_swap(quote, path, recipient_address)
+            log_event("swap_sent", f"⏳ Waiting for swap... TX: {web3.to_hex(tx_hash)}", tx=web3.to_hex(tx_hash),
+                      attempt=attempt + 1, min_out=quote.min_out, impact=round(quote.impact, 6),
+                      slippage=round(quote.slippage, 6))
+            with span("swap_receipt") if not attempt else nullcontext():
+                receipt = wait_for_receipt(tx_hash, main_address, recipient_address)
+        count_swap("sent")
+        if receipt.status == 1:
+            return receipt
+        count_swap("reverted")
+        retrying = attempt < SWAP_RETRIES
+        log_event("swap_reverted", f"↩️ Swap reverted (min out {quote.min_out / 1e18:.6f}, "
+                                   f"{quote.slippage:.2%} slippage){' - re-quoting' if retrying else ''}",
+                  logging.WARNING, tx=web3.to_hex(tx_hash), attempt=attempt + 1)
+    count_swap("failed")
+    return None
+
+
 class SwapManager:
     def __init__(self):
         pass
@@ -616,180 +3434,151 @@ class SwapManager:
             bnb_amount = amounts[1] / 1e18
             return bnb_amount
         except Exception as e:
-            print(f"⚠️ Error getting swap rate: {e}")
+            log_event("swap_quote_failed", f"⚠️ Error getting swap rate: {e}", logging.WARNING, error=str(e))
             return 0
 
-    def swap_usdt_to_bnb(self, usdt_amount, recipient_address):
-        try:
-            print(f"\n🔄 Starting USDT to BNB swap...")
-            print(f"💰 Amount: {usdt_amount} USDT")
-            print(f"📧 Recipient: {recipient_address}")
-
-            main_address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
-            usdt_balance = usdt_contract.functions.balanceOf(main_address).call() / 1e18
-
-            if usdt_balance < usdt_amount:
-                print(f"❌ Insufficient USDT balance. Have: {usdt_balance:.2f}, Need: {usdt_amount}")
-                return False
+    def swap_usdt_to_bnb(self, usdt_amount, recipient_address, quote=None):
+        return self.swap_usdt_to_bnb_receipt(usdt_amount, recipient_address, quote) is not None
 
-            expected_bnb = self.get_usdt_to_bnb_rate(usdt_amount)
-            print(f"📊 Expected BNB: {expected_bnb:.6f}")
+    def swap_usdt_to_bnb_receipt(self, usdt_amount, recipient_address, quote=None):
+        """swap_usdt_to_bnb, returning the swap's receipt, or None if it failed
 
-            allowance = usdt_contract.functions.allowance(
-                main_address, PANCAKE_ROUTER
-            ).call()
-            usdt_amount_wei = int(usdt_amount * 1e18)
+        `quote` is a swap_quote for this amount taken just before (the /bet preview); else one is read here.
+        """
+        try:
+            log_event("swap_start",
+                      f"\n🔄 Starting USDT to BNB swap...\n💰 Amount: {usdt_amount} USDT\n📧 Recipient: {recipient_address}",
+                      usdt=usdt_amount, recipient=recipient_address)
 
-            if allowance < usdt_amount_wei:
-                print("🔓 Approving USDT spending...")
-                nonce = web3.eth.get_transaction_count(main_address)
-                approve_tx = usdt_contract.functions.approve(
-                    PANCAKE_ROUTER, usdt_amount_wei * 2
-                ).build_transaction({
-                    'from': main_address,
-                    'gas': 100000,
-                    'gasPrice': web3.to_wei('0.1', 'gwei'),
-                    'nonce': nonce
-                })
-                signed_tx = web3.eth.account.sign_transaction(approve_tx, MAIN_PRIVATE_KEY)
-                tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-                print(f"⏳ Waiting for approval... TX: {web3.to_hex(tx_hash)}")
-                web3.eth.wait_for_transaction_receipt(tx_hash)
-                print("✅ Approval confirmed!")
-
-            print("🔄 Executing swap...")
-            deadline = int(time.time()) + 300
-            min_bnb_out = int(expected_bnb * 0.999 * 1e18)
-            nonce = web3.eth.get_transaction_count(main_address)
-            swap_tx = router_contract.functions.swapExactTokensForETH(
-                usdt_amount_wei,
-                min_bnb_out,
-                [USDT_CONTRACT, WBNB],
-                recipient_address,
-                deadline
-            ).build_transaction({
-                'from': main_address,
-                'gas': 300000,
-                'gasPrice': web3.to_wei('0.1', 'gwei'),
-                'nonce': nonce
-            })
-            signed_tx = web3.eth.account.sign_transaction(swap_tx, MAIN_PRIVATE_KEY)
-            tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            print(f"⏳ Waiting for swap... TX: {web3.to_hex(tx_hash)}")
-            receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
-            if receipt.status == 1:
-                print("✅ Swap completed successfully!")
-                print(f"🔗 TX Hash: {web3.to_hex(tx_hash)}")
-                return True
+            main_address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
+            with span("swap_quote"):
+                usdt_balance = balance_cache.get_or_fetch(main_address)[1] / 1e18
+
+                if usdt_balance < usdt_amount:
+                    log_event("swap_rejected", f"❌ Insufficient USDT balance. Have: {usdt_balance:.2f}, Need: {usdt_amount}",
+                              logging.ERROR, usdt=usdt_amount, usdt_balance=usdt_balance)
+                    return None
+
+                path = [USDT_CONTRACT, WBNB]
+                if quote is None:
+                    quote = swap_quote(int(usdt_amount * 1e18), path)
+                log_event("swap_quote", f"📊 Expected BNB: {quote.expected_out / 1e18:.6f} "
+                                        f"(impact {quote.impact:.3%}, min {quote.min_out / 1e18:.6f})",
+                          expected_bnb=quote.expected_out / 1e18, impact=round(quote.impact, 6),
+                          slippage=round(quote.slippage, 6))
+
+            with span("allowance"):
+                allowance = usdt_contract.functions.allowance(
+                    main_address, PANCAKE_ROUTER
+                ).call()
+                usdt_amount_wei = int(usdt_amount * 1e18)
+
+                if allowance < usdt_amount_wei:
+                    log_event("approve_start", "🔓 Approving USDT spending...")
+                    with transaction_lock:
+                        nonce = web3.eth.get_transaction_count(main_address, 'pending')
+                        approve_tx = usdt_contract.functions.approve(
+                            PANCAKE_ROUTER, usdt_amount_wei * 2
+                        ).build_transaction({
+                            'from': main_address,
+                            'gas': 100000,
+                            'gasPrice': web3.to_wei('0.1', 'gwei'),
+                            'nonce': nonce,
+                            'chainId': CHAIN_ID
+                        })
+                        signed_tx = get_main_signer().sign_transaction(approve_tx)
+                        tx_hash = send_transaction(signed_tx, main_address)
+                    log_event("approve_sent", f"⏳ Waiting for approval... TX: {web3.to_hex(tx_hash)}",
+                              tx=web3.to_hex(tx_hash))
+                    wait_for_receipt(tx_hash, main_address)
+                    log_event("approve_done", "✅ Approval confirmed!")
+
+            log_event("swap_send", "🔄 Executing swap...")
+            receipt = execute_swap(quote, path, recipient_address)
+            if receipt is not None:
+                tx_hash = web3.to_hex(receipt.transactionHash)
+                log_event("swap_done", f"✅ Swap completed successfully!\n🔗 TX Hash: {tx_hash}",
+                          tx=tx_hash, gas_used=receipt.gasUsed)
+                return receipt
             else:
-                print("❌ Swap failed!")
-                return False
+                log_event("swap_failed", f"❌ Swap failed after {SWAP_RETRIES + 1} attempts!", logging.ERROR)
+                return None
         except Exception as e:
-            print(f"❌ Error during swap: {e}")
-            return False
+            log_event("swap_failed", f"❌ Error during swap: {e}", logging.ERROR, error=str(e))
+            return None
 
 
 def swap_usdt_to_bnb_main_wallet(usdt_amount):
     main_address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
-    usdt_balance = usdt_contract.functions.balanceOf(main_address).call() / 1e18
+    usdt_balance = balance_cache.get_or_fetch(main_address)[1] / 1e18
     if usdt_balance < usdt_amount:
         print(f"❌ Insufficient USDT balance. You have {usdt_balance:.4f} USDT.")
         return
     path = [USDT_CONTRACT, WBNB]
     usdt_amount_wei = int(usdt_amount * 1e18)
-    amounts = router_contract.functions.getAmountsOut(usdt_amount_wei, path).call()
-    expected_bnb = amounts[1] / 1e18
-    print(f"\n💱 You will swap {usdt_amount} USDT → {expected_bnb:.6f} BNB (approx.)")
+    try:
+        quote = swap_quote(usdt_amount_wei, path)
+    except ValueError as e:
+        print(f"❌ {e} - swap a smaller amount.")
+        return
+    print(f"\n💱 You will swap {usdt_amount} USDT → {quote.expected_out / 1e18:.6f} BNB (approx.)")
+    print(f"📉 Price impact {quote.impact:.3%}, at least {quote.min_out / 1e18:.6f} BNB ({quote.slippage:.2%} slippage)")
     allowance = usdt_contract.functions.allowance(main_address, PANCAKE_ROUTER).call()
     if allowance < usdt_amount_wei:
         print("🔓 Approving USDT for PancakeSwap...")
-        nonce = web3.eth.get_transaction_count(main_address)
-        approve_tx = usdt_contract.functions.approve(
-            PANCAKE_ROUTER, usdt_amount_wei * 2
-        ).build_transaction({
-            'from': main_address,
-            'gas': 100000,
-            'gasPrice': web3.to_wei('0.1', 'gwei'),
-            'nonce': nonce
-        })
-        signed_approve = web3.eth.account.sign_transaction(approve_tx, MAIN_PRIVATE_KEY)
-        tx_hash = web3.eth.send_raw_transaction(signed_approve.raw_transaction)
+        with transaction_lock:
+            nonce = web3.eth.get_transaction_count(main_address, 'pending')
+            approve_tx = usdt_contract.functions.approve(
+                PANCAKE_ROUTER, usdt_amount_wei * 2
+            ).build_transaction({
+                'from': main_address,
+                'gas': 100000,
+                'gasPrice': web3.to_wei('0.1', 'gwei'),
+                'nonce': nonce,
+                'chainId': CHAIN_ID
+            })
+            signed_approve = get_main_signer().sign_transaction(approve_tx)
+            tx_hash = send_transaction(signed_approve, main_address)
         print(f"⏳ Waiting for approval... TX: {web3.to_hex(tx_hash)}")
-        web3.eth.wait_for_transaction_receipt(tx_hash)
+        wait_for_receipt(tx_hash, main_address)
         print("✅ Approval confirmed.")
     confirm = input(f"Proceed with swap? (y/n): ").strip().lower()
     if confirm != 'y':
         print("❌ Swap cancelled.")
         return
-    min_bnb_out = int(expected_bnb * 0.999 * 1e18)
-    deadline = int(time.time()) + 300
-    nonce = web3.eth.get_transaction_count(main_address)
-    swap_tx = router_contract.functions.swapExactTokensForETH(
-        usdt_amount_wei,
-        min_bnb_out,
-        [USDT_CONTRACT, WBNB],
-        main_address,
-        deadline
-    ).build_transaction({
-        'from': main_address,
-        'gas': 300000,
-        'gasPrice': web3.to_wei('0.1', 'gwei'),
-        'nonce': nonce
-    })
-    signed_swap = web3.eth.account.sign_transaction(swap_tx, MAIN_PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed_swap.raw_transaction)
-    print(f"⏳ Waiting for swap TX confirmation... TX: {web3.to_hex(tx_hash)}")
-    receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
-    if receipt.status == 1:
-        print(f"✅ Swap completed! TX: https://bscscan.com/tx/{web3.to_hex(tx_hash)}")
+    print("⏳ Waiting for swap TX confirmation...")
+    receipt = execute_swap(quote, path, main_address)
+    if receipt is not None:
+        print(f"✅ Swap completed! TX: https://bscscan.com/tx/{web3.to_hex(receipt.transactionHash)}")
     else:
         print("❌ Swap failed.")
 
 
 def swap_bnb_to_usdt_main_wallet(bnb_amount):
-    """Swap BNB to USDT from main wallet (0.1% slippage)"""
+    """Swap BNB to USDT from main wallet (slippage from the price impact, see swap_quote)"""
     try:
         main_address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
-        bnb_balance = web3.eth.get_balance(main_address) / 1e18
+        bnb_balance = balance_cache.get_or_fetch(main_address)[0] / 1e18
         if bnb_balance < bnb_amount:
             print(f"❌ Insufficient BNB balance. You have {bnb_balance:.4f} BNB.")
             return
 
         path = [WBNB, USDT_CONTRACT]
         bnb_amount_wei = int(bnb_amount * 1e18)
-        amounts = router_contract.functions.getAmountsOut(bnb_amount_wei, path).call()
-        expected_usdt = amounts[1] / 1e18
+        quote = swap_quote(bnb_amount_wei, path)
 
-        print(f"\n💱 You will swap {bnb_amount} BNB → {expected_usdt:.4f} USDT (approx.)")
+        print(f"\n💱 You will swap {bnb_amount} BNB → {quote.expected_out / 1e18:.4f} USDT (approx.)")
+        print(f"📉 Price impact {quote.impact:.3%}, at least {quote.min_out / 1e18:.4f} USDT ({quote.slippage:.2%} slippage)")
 
         confirm = input(f"Proceed with swap? (y/n): ").strip().lower()
         if confirm != 'y':
             print("❌ Swap cancelled.")
             return
 
-        min_usdt_out = int(expected_usdt * 0.999 * 1e18)
-        deadline = int(time.time()) + 300
-        nonce = web3.eth.get_transaction_count(main_address)
-
-        swap_tx = router_contract.functions.swapExactETHForTokens(
-            min_usdt_out,
-            path,
-            main_address,
-            deadline
-        ).build_transaction({
-            'from': main_address,
-            'value': bnb_amount_wei,
-            'gas': 300000,
-            'gasPrice': web3.to_wei('0.1', 'gwei'),
-            'nonce': nonce
-        })
-
-        signed_swap = web3.eth.account.sign_transaction(swap_tx, MAIN_PRIVATE_KEY)
-        tx_hash = web3.eth.send_raw_transaction(signed_swap.raw_transaction)
-        print(f"⏳ Waiting for swap TX confirmation... TX: {web3.to_hex(tx_hash)}")
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
-        if receipt.status == 1:
-            print(f"✅ Swap completed! TX: https://bscscan.com/tx/{web3.to_hex(tx_hash)}")
+        print("⏳ Waiting for swap TX confirmation...")
+        receipt = execute_swap(quote, path, main_address)
+        if receipt is not None:
+            print(f"✅ Swap completed! TX: https://bscscan.com/tx/{web3.to_hex(receipt.transactionHash)}")
         else:
             print("❌ Swap failed.")
 
@@ -797,6 +3586,148 @@ def swap_bnb_to_usdt_main_wallet(bnb_amount):
         print(f"❌ Error during main wallet BNB→USDT swap: {e}")
 
 
+BET_GAS_RESERVE_WEI = 3 * 10 ** 13  # 0.00003 BNB a bet must leave for its own gas
+
+
+def bettable_amount(wallet):
+    """95% of a wallet's last read BNB balance (the rest pays for gas), as exact Decimal BNB"""
+    return Web3.from_wei(wallet.bnb_wei * 95 // 100, 'ether')
+
+
+class BetLedger:
+    """Bets sent by this process, by epoch - what the auto-claimer settles a round against"""
+
+    def __init__(self):
+        self._bets = {}  # epoch -> {address: (wallet, position, amount_wei)}, position 0 bull / 1 bear
+        self._lock = threading.Lock()
+
+    def record(self, wallet_info, epoch, direction, amount_wei):
+        position = 0 if direction.lower() == 'up' else 1
+        with self._lock:
+            self._bets.setdefault(epoch, {})[wallet_info.address] = (wallet_info, position, amount_wei)
+
+    def epochs(self, up_to):
+        with self._lock:
+            return sorted(epoch for epoch in self._bets if epoch <= up_to)
+
+    def pop(self, epoch):
+        with self._lock:
+            return self._bets.pop(epoch, {})
+
+    def clear(self):
+        with self._lock:
+            self._bets.clear()
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(bets) for bets in self._bets.values())
+
+
+bet_ledger = BetLedger()
+
+# === SWAP BATCHING ===
+SWAP_BATCH_WINDOW = float(os.getenv("SWAP_BATCH_WINDOW", "0"))  # seconds to collect /bet swaps into one, 0 = off
+SWAP_BATCH_MAX = 50  # a full batch goes out without waiting for the window
+
+
+class SwapBatcher:
+    """Coalesces USDT→BNB swaps that arrive within `window` seconds into one router swap
+
+    The combined swap pays the main wallet; the BNB it received is then split to the recipients
+    in proportion to their USDT through one disperse_bnb() call. One allowance check, one swap
+    and one disperse replace N of each. A lone request, or any batch while DISPERSE_CONTRACT is
+    unset, is swapped straight to its recipient as before.
+    """
+
+    def __init__(self, window=SWAP_BATCH_WINDOW, max_batch=SWAP_BATCH_MAX):
+        self.window = window
+        self.max_batch = max_batch
+        self.stats = {"batches": 0, "requests": 0, "swaps_saved": 0, "gas_used": 0, "failed": 0}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def swap(self, usdt_amount, recipient_address):
+        """Queue a swap and block until its BNB has arrived, True/False like SwapManager.swap_usdt_to_bnb"""
+        request = {'usdt_wei': int(usdt_amount * 1e18), 'recipient': Web3.to_checksum_address(recipient_address),
+                   'done': threading.Event(), 'ok': False}
+        with self._lock:
+            self._pending.append(request)
+            full = len(self._pending) >= self.max_batch
+            if self._timer is None or full:
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._timer = threading.Timer(0 if full else self.window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        with span("swap_batch"):
+            request['done'].wait()
+        return request['ok']
+
+    def _flush(self):
+        with self._lock:
+            batch, self._pending, self._timer = self._pending, [], None
+        if not batch:
+            return
+        try:
+            with operation("swap_batch"), transaction_lock:
+                self._run(batch)
+        except Exception as e:
+            log_event("swap_batch_failed", f"❌ Batched swap failed: {e}", logging.ERROR,
+                      requests=len(batch), error=str(e))
+        finally:
+            with self._lock:
+                self.stats["batches"] += 1
+                self.stats["requests"] += len(batch)
+                self.stats["failed"] += sum(not request['ok'] for request in batch)
+            for request in batch:
+                request['done'].set()
+
+    def _run(self, batch):
+        swap_manager = SwapManager()
+        if len(batch) == 1 or not DISPERSE_CONTRACT:
+            for request in batch:
+                receipt = swap_manager.swap_usdt_to_bnb_receipt(request['usdt_wei'] / 1e18, request['recipient'])
+                request['ok'] = receipt is not None
+                self._add_gas(receipt.gasUsed if receipt else 0)
+            return
+
+        main_address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
+        total_usdt_wei = sum(request['usdt_wei'] for request in batch)
+        log_event("swap_batch_start", f"📦 Coalescing {len(batch)} swaps: {total_usdt_wei / 1e18:g} USDT in one swap",
+                  requests=len(batch), usdt=total_usdt_wei / 1e18)
+        receipt = swap_manager.swap_usdt_to_bnb_receipt(total_usdt_wei / 1e18, main_address)
+        if receipt is None:
+            return
+        received_wei = swap_amount_out(receipt, [USDT_CONTRACT, WBNB])
+        shares = [(request['recipient'], received_wei * request['usdt_wei'] // total_usdt_wei) for request in batch]
+        result = disperse_bnb(shares)
+        self._add_gas(receipt.gasUsed + result['gas_used'])
+        if result['failed']:
+            raise RuntimeError(f"disperse failed for {result['failed']} of {len(batch)} wallets, "
+                               f"{received_wei / 1e18:.6f} BNB left in the main wallet")
+        for request in batch:
+            request['ok'] = True
+        with self._lock:
+            self.stats["swaps_saved"] += len(batch) - 1
+        log_event("swap_batch_done", f"✅ {len(batch)} swaps in 1: {received_wei / 1e18:.6f} BNB split, "
+                                     f"{(receipt.gasUsed + result['gas_used']) // len(batch):,} gas per command",
+                  requests=len(batch), bnb=received_wei / 1e18, gas_used=receipt.gasUsed + result['gas_used'])
+
+    def _add_gas(self, gas):
+        with self._lock:
+            self.stats["gas_used"] += gas
+
+    def status(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["gas_per_request"] = stats["gas_used"] // stats["requests"] if stats["requests"] else 0
+        return {"window": self.window, **stats}
+
+
+swap_batcher = SwapBatcher()
+
+
 class BettingManager:
     def __init__(self):
         pass
@@ -804,56 +3735,504 @@ class BettingManager:
     def place_bet(self, wallet_info, direction, bet_amount_bnb):
         """Place a bet using the specified wallet"""
         try:
-            current_epoch = prediction_contract.functions.currentEpoch().call()
-            round_data = prediction_contract.functions.rounds(current_epoch).call()
-            current_time = int(time.time())
-            lock_timestamp = round_data[2]
-            if current_time >= lock_timestamp:
-                print("⚠️ Current round is locked, cannot place bets")
-                return False
+            with span("bet_reads"):
+                current_epoch = prediction_contract.functions.currentEpoch().call()
+                round_data = prediction_contract.functions.rounds(current_epoch).call()
+                round_tracker.update(current_epoch, round_data)
+                current_time = int(chain_clock.now())
+                lock_timestamp = round_data[2]
+                if current_time >= lock_timestamp:
+                    log_event("bet_rejected", "⚠️ Current round is locked, cannot place bets", logging.WARNING,
+                              wallet=wallet_info.name, epoch=current_epoch, reason="locked")
+                    return False
+
+                log_event("bet_start",
+                          f"\n🎯 Placing bet...\n"
+                          f"👤 Wallet: {wallet_info['name']}\n"
+                          f"📊 Direction: {direction.upper()}\n"
+                          f"💰 Amount: {bet_amount_bnb} BNB\n"
+                          f"🔢 Round: {current_epoch}\n"
+                          f"⏰ Time remaining: {lock_timestamp - current_time} seconds",
+                          wallet=wallet_info.name, direction=direction.lower(), bnb=bet_amount_bnb,
+                          epoch=current_epoch, seconds_to_lock=lock_timestamp - current_time)
+
+                address = wallet_info.address
+                signer = get_signer(wallet_info)
+                balance, _ = balance_cache.get_or_fetch(address)
+                bet_amount_wei = web3.to_wei(bet_amount_bnb, 'ether')
+
+                if balance < bet_amount_wei + BET_GAS_RESERVE_WEI:
+                    log_event("bet_rejected", f"❌ Insufficient balance. Have: {web3.from_wei(balance, 'ether'):.6f} BNB",
+                              logging.ERROR, wallet=wallet_info.name, epoch=current_epoch, reason="balance",
+                              balance_wei=balance)
+                    return False
+
+                if direction.lower() == 'up':
+                    function = prediction_contract.functions.betBull(current_epoch)
+                else:
+                    function = prediction_contract.functions.betBear(current_epoch)
+
+            with span("bet_send"), send_lock(address):
+                # 'pending' so a bet queues behind a claim still in flight instead of replacing it
+                nonce = web3.eth.get_transaction_count(address, 'pending')
+                tx = function.build_transaction({
+                    'from': address,
+                    'value': bet_amount_wei,
+                    'gas': 200000,
+                    'gasPrice': web3.to_wei('0.1', 'gwei'),
+                    'nonce': nonce,
+                    'chainId': CHAIN_ID
+                })
 
-            print(f"\n🎯 Placing bet...")
-            print(f"👤 Wallet: {wallet_info['name']}")
-            print(f"📊 Direction: {direction.upper()}")
-            print(f"💰 Amount: {bet_amount_bnb} BNB")
-            print(f"🔢 Round: {current_epoch}")
-            print(f"⏰ Time remaining: {lock_timestamp - current_time} seconds")
-
-            address = Web3.to_checksum_address(wallet_info['address'])
-            private_key = wallet_info['private_key']
-            balance = web3.eth.get_balance(address)
-            balance_bnb = web3.from_wei(balance, 'ether')
-            bet_amount_wei = web3.to_wei(bet_amount_bnb, 'ether')
-
-            if balance < bet_amount_wei + web3.to_wei('0.00003', 'ether'):
-                print(f"❌ Insufficient balance. Have: {balance_bnb:.6f} BNB")
-                return False
+                signed_tx = signer.sign_transaction(tx)
+                tx_hash = send_transaction(signed_tx, address)
+            bet_admission.track_inclusion(tx_hash, address, chain_clock.now())
+            bet_ledger.record(wallet_info, current_epoch, direction, bet_amount_wei)
 
-            if direction.lower() == 'up':
-                function = prediction_contract.functions.betBull(current_epoch)
-            else:
-                function = prediction_contract.functions.betBear(current_epoch)
+            log_event("bet_sent",
+                      f"🚀 Bet placed! TX Hash: {web3.to_hex(tx_hash)}\n"
+                      f"🔗 View on BSCScan: https://bscscan.com/tx/{web3.to_hex(tx_hash)}",
+                      wallet=wallet_info.name, epoch=current_epoch, tx=web3.to_hex(tx_hash))
+            return True
 
-            nonce = web3.eth.get_transaction_count(address)
+        except Exception as e:
+            log_event("bet_failed", f"❌ Error placing bet: {e}", logging.ERROR, error=str(e))
+            return False
 
-            tx = function.build_transaction({
-                'from': address,
-                'value': bet_amount_wei,
-                'gas': 200000,
-                'gasPrice': web3.to_wei('0.1', 'gwei'),
-                'nonce': nonce
-            })
 
-            signed_tx = web3.eth.account.sign_transaction(tx, private_key)
-            tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
+# === BET SCHEDULER ===
+BET_FIRE_OFFSET = float(os.getenv("BET_FIRE_OFFSET", "3"))  # seconds before lockTimestamp
+CLOCK_RESYNC_LEAD = 10  # resync the chain clock this many seconds before firing
+SPIN_WINDOW = 0.002  # busy-wait the last 2 ms instead of trusting sleep()
+CHAIN_BLOCK_INTERVAL = float(os.getenv("CHAIN_BLOCK_INTERVAL", "0.75"))  # seconds, BSC since the Maxwell upgrade
+CLOCK_SYNC_POLL = 0.05  # seconds between block number polls while the chain clock syncs
+MAX_PARALLEL_BROADCASTS = 16
+SCHEDULER_HISTORY = 100  # fired jobs kept for the daemon's `scheduled` command
 
-            print(f"🚀 Bet placed! TX Hash: {web3.to_hex(tx_hash)}")
-            print(f"🔗 View on BSCScan: https://bscscan.com/tx/{web3.to_hex(tx_hash)}")
-            return True
 
-        except Exception as e:
-            print(f"❌ Error placing bet: {e}")
+class ChainClock:
+    """Chain time estimated from the local clock plus an offset measured against block timestamps
+
+    Block timestamps are whole seconds and `latest` can already be a block interval old, so one read
+    only gives a lower bound. sync() instead waits for the first block stamped with a new second and
+    times when it was first seen: that block was produced within one block interval of its timestamp,
+    and polling adds at most CLOCK_SYNC_POLL. A poll that finds more than one new block can't tell
+    when they appeared, so only the block right after the previous poll's is timed.
+    """
+
+    def __init__(self):
+        self.offset = 0.0
+        self.synced_at = None
+
+    def sync(self, timeout=None):
+        """Measure the offset, waiting up to `timeout` seconds (default 2 s plus two block intervals) for a new second
+
+        timeout=0, or a chain that mines nothing in time (local dev chains mine on demand), keeps the
+        lower bound from the latest block.
+        """
+        if timeout is None:
+            timeout = 2 * (1 + CHAIN_BLOCK_INTERVAL)
+        block = web3.eth.get_block('latest')
+        offset = block['timestamp'] - time.time()
+        number, timestamp = block['number'], block['timestamp']
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            time.sleep(CLOCK_SYNC_POLL)
+            latest = web3.eth.block_number
+            if latest == number:
+                continue
+            seen_at = time.time()
+            block = web3.eth.get_block(latest)
+            if latest == number + 1 and block['timestamp'] > timestamp:
+                offset = block['timestamp'] - seen_at
+                break
+            # Same second, or several blocks since the last poll: none of them was seen as it appeared,
+            # so they only raise the lower bound and the wait goes on from the newest
+            offset = max(offset, block['timestamp'] - seen_at)
+            number, timestamp = latest, block['timestamp']
+        self.offset = offset
+        self.synced_at = time.time()
+        return self.offset
+
+    def now(self):
+        return time.time() + self.offset
+
+
+chain_clock = ChainClock()
+
+# === ROUND TRACKER ===
+STATUS_REFRESH_INTERVAL = float(os.getenv("STATUS_REFRESH_INTERVAL", "2"))  # seconds, 0 = no background refresh
+IN_FLIGHT_REAP_AFTER = 15  # seconds before the refresher looks up a receipt nobody waited for
+REAP_QUIET_BEFORE_LOCK = 10  # no receipt lookups this close to lockTimestamp
+CLOCK_RESYNC_INTERVAL = 300  # seconds between chain clock resyncs by the refresher
+
+
+class RoundTracker:
+    """Current epoch and its timestamps as last seen, so /status never reads the chain
+
+    The round only changes after its lockTimestamp, so the refresher reads currentEpoch and
+    rounds() once per round; place_bet and the auto-claimer pass in what they read anyway.
+    """
+
+    def __init__(self):
+        self.epoch = None
+        self.start_timestamp = self.lock_timestamp = self.close_timestamp = None
+        self.updated_at = None
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    def update(self, epoch, round_data):
+        with self._lock:
+            if self.epoch is not None and epoch < self.epoch:
+                return
+            self.epoch = epoch
+            self.start_timestamp, self.lock_timestamp, self.close_timestamp = round_data[1:4]
+            self.updated_at = time.time()
+
+    def refresh(self, force=False):
+        """Re-read the current round if the cached one has locked, returns True if it did"""
+        if not force and self.lock_timestamp is not None and chain_clock.now() < self.lock_timestamp:
             return False
+        epoch = prediction_contract.functions.currentEpoch().call()
+        self.update(epoch, prediction_contract.functions.rounds(epoch).call())
+        return True
+
+    def snapshot(self):
+        with self._lock:
+            return {"epoch": self.epoch, "start_timestamp": self.start_timestamp,
+                    "lock_timestamp": self.lock_timestamp, "close_timestamp": self.close_timestamp,
+                    "age": time.time() - self.updated_at if self.updated_at else None}
+
+    def start_refresher(self, interval=STATUS_REFRESH_INTERVAL):
+        """Keep the round and the in-flight list current in the background"""
+        if self._refresher is not None:
+            return
+
+        def refresh_loop():
+            while True:
+                try:
+                    if chain_clock.synced_at is None or time.time() - chain_clock.synced_at > CLOCK_RESYNC_INTERVAL:
+                        chain_clock.sync()
+                    self.refresh()
+                    swap_pair(USDT_CONTRACT, WBNB)  # looked up once, so no /bet pays for it
+                    lock_timestamp = self.lock_timestamp
+                    if lock_timestamp is not None and chain_clock.now() < lock_timestamp - REAP_QUIET_BEFORE_LOCK:
+                        in_flight.reap(IN_FLIGHT_REAP_AFTER)
+                except Exception as e:
+                    log_event("status_refresh_failed", f"⚠️ Status refresh error: {e}", logging.WARNING,
+                              error=str(e))
+                time.sleep(interval)
+
+        self._refresher = threading.Thread(target=refresh_loop, daemon=True)
+        self._refresher.start()
+
+
+round_tracker = RoundTracker()
+
+# === ADMISSION CONTROL ===
+BET_ADMISSION = os.getenv("BET_ADMISSION", "reject")  # bet too late for its round: 'reject', 'next' round or 'off'
+ADMISSION_PERCENTILE = 0.9
+ADMISSION_MIN_SAMPLES = 5  # until then the defaults below are a floor for the estimates
+ADMISSION_DEFAULT_SEND = float(os.getenv("ADMISSION_DEFAULT_SEND", "8"))  # seconds from admission to bet broadcast
+ADMISSION_DEFAULT_INCLUSION = float(os.getenv("ADMISSION_DEFAULT_INCLUSION", "3"))  # broadcast to block
+ADMISSION_MARGIN = float(os.getenv("ADMISSION_MARGIN", "1"))  # seconds
+NEXT_ROUND_POLL = 1  # seconds between round reads while a retargeted bet waits for the keeper's executeRound
+NEXT_ROUND_TIMEOUT = float(os.getenv("NEXT_ROUND_TIMEOUT", "60"))  # seconds after the lock before it gives up
+
+Admission = namedtuple("Admission", ["verdict", "epoch", "seconds_left", "needed"])
+ADMISSION_STATS = {"admit": "admitted", "reject": "rejected", "next": "retargeted", "stale": "stale"}
+
+
+class BetAdmission:
+    """Decides whether a swap-and-bet can still make its round's lock, before anything is sent
+
+    Needed time = p90 of admission -> bet broadcast plus p90 of broadcast -> block timestamp
+    over recent bets, plus ADMISSION_MARGIN. The round comes from round_tracker, so admitting
+    a bet costs no RPC unless the cached round has locked.
+    """
+
+    def __init__(self):
+        self.to_send = LatencyHistogram()
+        self.inclusion = LatencyHistogram()
+        self.stats = {"admitted": 0, "rejected": 0, "retargeted": 0, "stale": 0}
+        self._lock = threading.Lock()
+
+    def _estimate(self, histogram, default):
+        estimate = histogram.percentile(ADMISSION_PERCENTILE)
+        return estimate if histogram.count >= ADMISSION_MIN_SAMPLES else max(default, estimate)
+
+    def needed_seconds(self):
+        with self._lock:
+            return (self._estimate(self.to_send, ADMISSION_DEFAULT_SEND)
+                    + self._estimate(self.inclusion, ADMISSION_DEFAULT_INCLUSION) + ADMISSION_MARGIN)
+
+    def observe_send(self, seconds):
+        with self._lock:
+            self.to_send.observe(seconds)
+
+    def observe_inclusion(self, seconds):
+        with self._lock:
+            self.inclusion.observe(max(0.0, seconds))
+
+    def track_inclusion(self, tx_hash, address, sent_at):
+        """Time a bet from broadcast (chain time) to its block's timestamp, on a background thread"""
+
+        def wait():
+            try:
+                receipt = wait_for_receipt(tx_hash, address)
+                self.observe_inclusion(web3.eth.get_block(receipt.blockNumber)['timestamp'] - sent_at)
+            except Exception as e:
+                log_event("bet_inclusion_unknown", f"⚠️ Could not time bet inclusion: {e}", logging.DEBUG,
+                          tx=web3.to_hex(tx_hash), error=str(e))
+
+        threading.Thread(target=wait, daemon=True).start()
+
+    def admit(self, sent_at=None, retargeted=False):
+        """Admission verdict 'admit', 'next' (epoch = the next round, seconds_left = until this one locks), 'reject' or 'stale'
+
+        sent_at is the message's unix time (whole seconds, hence the 1 s slack): a message sent
+        before the current round started was meant for a round that has locked since.
+        """
+        if chain_clock.synced_at is None:
+            chain_clock.sync(timeout=0)  # normally done by the round tracker's refresher already
+        round_tracker.refresh()
+        round_state = round_tracker.snapshot()
+        epoch, now = round_state["epoch"], chain_clock.now()
+        seconds_left = round_state["lock_timestamp"] - now
+        needed = self.needed_seconds()
+        # Message dates are wall-clock seconds, the round's are chain time
+        if sent_at is not None and sent_at + chain_clock.offset < round_state["start_timestamp"] - 1:
+            verdict = "stale"
+        elif BET_ADMISSION == "off" or seconds_left >= needed:
+            verdict = "admit"
+        elif BET_ADMISSION == "next" and not retargeted:
+            verdict, epoch = "next", epoch + 1
+        else:
+            verdict = "reject"
+        with self._lock:
+            self.stats[ADMISSION_STATS[verdict]] += 1
+        log_event("bet_admission", f"🚦 Bet {verdict} for epoch {epoch}: {seconds_left:.1f}s left, ~{needed:.1f}s needed",
+                  logging.DEBUG, verdict=verdict, epoch=epoch, seconds_left=seconds_left, needed=needed)
+        return Admission(verdict, epoch, seconds_left, needed)
+
+    def status(self):
+        with self._lock:
+            return {"mode": BET_ADMISSION, "send_samples": self.to_send.count,
+                    "inclusion_samples": self.inclusion.count, **self.stats}
+
+
+bet_admission = BetAdmission()
+
+
+def in_next_round(admission, func, *args):
+    """Run func(*args) once the round after a 'next' admission has opened
+
+    That round opens when the keeper calls executeRound, some time after the lock, so this sleeps
+    until the lock and then re-reads the round until round_tracker shows the target epoch, giving
+    up NEXT_ROUND_TIMEOUT seconds later. Runs in a copy of the caller's context, so replies go to
+    the chat the command came from.
+    """
+    context = copy_context()
+
+    def wait():
+        time.sleep(max(0.0, admission.seconds_left))
+        deadline = time.time() + NEXT_ROUND_TIMEOUT
+        while True:
+            try:
+                round_tracker.refresh()
+            except Exception as e:
+                log_event("round_refresh_failed", f"⚠️ Could not read the round: {e}", logging.DEBUG, error=str(e))
+            if (round_tracker.epoch or 0) >= admission.epoch:
+                func(*args)
+                return
+            if time.time() >= deadline:
+                break
+            time.sleep(NEXT_ROUND_POLL)
+        message = (f"❌ Epoch {admission.epoch} did not open within {NEXT_ROUND_TIMEOUT:.0f}s of the lock - "
+                   f"retargeted bet dropped, nothing was sent")
+        log_event("retargeted_bet_expired", message, logging.WARNING, epoch=admission.epoch)
+        send_telegram_message(message)
+
+    thread = threading.Thread(target=context.run, args=(wait,), daemon=True)
+    thread.start()
+    return thread
+
+
+class BetScheduler:
+    """Fires pre-signed bets at a fixed offset before a round's lockTimestamp
+
+    Bets are signed when scheduled, so firing is only a broadcast. All bets for the same
+    (epoch, offset) share one timer thread that sleeps until just before the target,
+    spins on perf_counter for the last few milliseconds and then broadcasts them in parallel.
+    """
+
+    def __init__(self):
+        self.jobs = {}  # (epoch, fire_at) -> [job, ...]
+        self.history = deque(maxlen=SCHEDULER_HISTORY)  # fired jobs, newest last
+        self._lock = threading.Lock()
+
+    def schedule(self, wallet_info, direction, bet_amount_bnb, epoch=None, offset=None):
+        """Sign a bet now and queue it, returns the job dict"""
+        offset = BET_FIRE_OFFSET if offset is None else float(offset)
+        if chain_clock.synced_at is None:
+            chain_clock.sync()
+        if epoch is None:
+            epoch = prediction_contract.functions.currentEpoch().call()
+        lock_timestamp = prediction_contract.functions.rounds(epoch).call()[2]
+        fire_at = lock_timestamp - offset
+        if fire_at <= chain_clock.now():
+            raise ValueError(f"Too late for epoch {epoch}: T-{offset}s was "
+                             f"{chain_clock.now() - fire_at:.1f}s ago")
+
+        address = wallet_info.address
+        bet_amount_wei = web3.to_wei(bet_amount_bnb, 'ether')
+        balance, _ = balance_cache.get_or_fetch(address)
+        if balance < bet_amount_wei + BET_GAS_RESERVE_WEI:
+            raise ValueError(f"Insufficient balance in {wallet_info.name}: {web3.from_wei(balance, 'ether'):.6f} BNB")
+
+        job = {
+            'wallet': wallet_info,
+            'address': address,
+            'direction': direction.lower(),
+            'amount_wei': bet_amount_wei,
+            'epoch': epoch,
+            'lock_timestamp': lock_timestamp,
+            'fire_at': fire_at,
+            'signed_tx': self._sign(wallet_info, address, direction, bet_amount_wei, epoch),
+        }
+        with self._lock:
+            key = (epoch, fire_at)
+            start_timer = key not in self.jobs
+            self.jobs.setdefault(key, []).append(job)
+        if start_timer:
+            threading.Thread(target=self._run_timer, args=(key,), daemon=True).start()
+        log_event("bet_scheduled", f"🗓️ Scheduled {direction.upper()} {bet_amount_bnb} BNB from {wallet_info['name']} "
+                                   f"for epoch {epoch} at T-{offset}s (in {fire_at - chain_clock.now():.1f}s)",
+                  wallet=wallet_info.name, direction=direction.lower(), bnb=bet_amount_bnb, epoch=epoch,
+                  fire_at=fire_at)
+        return job
+
+    def _sign(self, wallet_info, address, direction, bet_amount_wei, epoch, nonce=None):
+        if direction.lower() == 'up':
+            function = prediction_contract.functions.betBull(epoch)
+        else:
+            function = prediction_contract.functions.betBear(epoch)
+        if nonce is None:
+            nonce = web3.eth.get_transaction_count(address, 'pending')
+        tx = function.build_transaction({
+            'from': address,
+            'value': bet_amount_wei,
+            'gas': 200000,
+            'gasPrice': web3.to_wei('0.1', 'gwei'),
+            'nonce': nonce,
+            'chainId': CHAIN_ID
+        })
+        return get_signer(wallet_info).sign_transaction(tx)
+
+    def pending(self):
+        with self._lock:
+            return [job for jobs in self.jobs.values() for job in jobs]
+
+    def fired(self, count):
+        """The last `count` fired jobs, oldest first"""
+        with self._lock:
+            return list(self.history)[-count:]
+
+    @staticmethod
+    def summary(job):
+        """JSON-friendly view of a job"""
+        fields = ('epoch', 'direction', 'lock_timestamp', 'fire_at', 'fire_error_ms', 'broadcast_ms',
+                  'included_before_lock', 'status', 'resigned', 'error')
+        summary = {'wallet': job['wallet']['name'], 'bnb': job['amount_wei'] / 1e18}
+        summary.update({field: job[field] for field in fields if field in job})
+        if 'tx_hash' in job:
+            summary['tx_hash'] = web3.to_hex(job['tx_hash'])
+        return summary
+
+    def _sleep_until(self, fire_at):
+        """Coarse sleep, resync the clock shortly before, then spin on perf_counter"""
+        remaining = fire_at - chain_clock.now()
+        if remaining > CLOCK_RESYNC_LEAD + 1:
+            time.sleep(remaining - CLOCK_RESYNC_LEAD)
+            try:
+                chain_clock.sync()
+            except Exception as e:
+                log_event("clock_sync_failed", f"⚠️ Chain clock resync failed, keeping offset {chain_clock.offset:.3f}s: {e}",
+                          logging.WARNING, offset=chain_clock.offset, error=str(e))
+        deadline = time.perf_counter() + (fire_at - chain_clock.now())
+        remaining = deadline - time.perf_counter()
+        if remaining > SPIN_WINDOW:
+            time.sleep(remaining - SPIN_WINDOW)
+        while time.perf_counter() < deadline:
+            pass
+
+    def _run_timer(self, key):
+        epoch, fire_at = key
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_BROADCASTS) as pool:
+            self._sleep_until(fire_at - 1)
+            with self._lock:
+                count = len(self.jobs.get(key, []))
+            # Start the worker threads now so firing doesn't pay for thread creation
+            list(pool.map(time.sleep, [0.01] * min(count, MAX_PARALLEL_BROADCASTS)))
+            self._sleep_until(fire_at)
+            with self._lock:
+                jobs = self.jobs.pop(key, [])
+            list(pool.map(self._fire, jobs))
+        threading.Thread(target=self._report, args=(jobs,), daemon=True).start()
+
+    def _fire(self, job):
+        job['fired_at'] = chain_clock.now()
+        try:
+            with send_lock(job['address']):
+                try:
+                    job['tx_hash'] = send_transaction(job['signed_tx'], job['address'])
+                except Exception as e:
+                    if 'nonce' not in str(e).lower():
+                        raise
+                    # The wallet sent something else since scheduling - re-sign with a fresh nonce
+                    job['signed_tx'] = self._sign(job['wallet'], job['address'], job['direction'],
+                                                  job['amount_wei'], job['epoch'])
+                    job['tx_hash'] = send_transaction(job['signed_tx'], job['address'])
+                    job['resigned'] = True
+            bet_ledger.record(job['wallet'], job['epoch'], job['direction'], job['amount_wei'])
+        except Exception as e:
+            job['error'] = str(e)
+        job['sent_at'] = chain_clock.now()
+        job['fire_error_ms'] = (job['fired_at'] - job['fire_at']) * 1000
+        job['broadcast_ms'] = (job['sent_at'] - job['fired_at']) * 1000
+
+    def _report(self, jobs):
+        """Wait for the receipts, then report timing against the target and the lock"""
+        lines = []
+        for job in jobs:
+            name = job['wallet']['name']
+            if 'error' in job:
+                lines.append(f"❌ {name} epoch {job['epoch']}: {job['error']}")
+            else:
+                try:
+                    receipt = wait_for_receipt(job['tx_hash'], job['address'])
+                    block_time = web3.eth.get_block(receipt.blockNumber)['timestamp']
+                    job['status'] = receipt.status
+                    job['included_before_lock'] = job['lock_timestamp'] - block_time
+                    outcome = "✅" if receipt.status == 1 else "❌ reverted"
+                    lines.append(
+                        f"{outcome} {name} epoch {job['epoch']} {job['direction'].upper()}: "
+                        f"fired {job['fire_error_ms']:+.1f} ms from target, broadcast {job['broadcast_ms']:.0f} ms, "
+                        f"included {job['included_before_lock']}s before lock"
+                    )
+                except Exception as e:
+                    job['error'] = str(e)
+                    lines.append(f"⚠️ {name} epoch {job['epoch']}: fired {job['fire_error_ms']:+.1f} ms "
+                                 f"from target, receipt failed: {e}")
+            job.pop('signed_tx', None)
+            with self._lock:
+                self.history.append(job)
+        message = "⏱️ SCHEDULED BETS FIRED\n\n" + "\n".join(lines)
+        log_event("scheduled_bets_fired", f"\n{message}", bets=[BetScheduler.summary(job) for job in jobs])
+        send_telegram_message(message)
+
+
+bet_scheduler = BetScheduler()
 
 
 class RewardManager:
@@ -872,7 +4251,8 @@ class RewardManager:
             # Check last 100 rounds (you can adjust this range)
             start_epoch = max(1, current_epoch - 5)
 
-            print(f"🔍 Checking epochs {start_epoch} to {current_epoch - 1} for claimable rewards...")
+            log_event("claim_scan", f"🔍 Checking epochs {start_epoch} to {current_epoch - 1} for claimable rewards...",
+                      logging.DEBUG, wallet=wallet_address, first_epoch=start_epoch, last_epoch=current_epoch - 1)
 
             for epoch in range(start_epoch, current_epoch):
                 try:
@@ -896,13 +4276,15 @@ class RewardManager:
                             })
 
                 except Exception as e:
-                    # Skip epochs that cause errors (might not exist yet)
-                    continue
+                    # Throttling is already retried by rpc_limiter - what reaches here is a real failure
+                    log_event("claim_scan_failed", f"⚠️ Could not check epoch {epoch} for {wallet_address}: {e}",
+                              logging.WARNING, wallet=wallet_address, epoch=epoch, error=str(e))
 
             return claimable_epochs
 
         except Exception as e:
-            print(f"❌ Error getting claimable epochs: {e}")
+            log_event("claim_scan_failed", f"❌ Error getting claimable epochs: {e}", logging.ERROR,
+                      wallet=wallet_address, error=str(e))
             return []
 
     def get_claimable_amount(self, wallet_address, epoch):
@@ -920,40 +4302,33 @@ class RewardManager:
             if user_round[1] > 0 and not user_round[2]:  # Has bet and not claimed
                 bet_amount = user_round[1]
 
-                # Get total amounts for calculation
-                # round_data structure varies, but typically includes:
-                # [startTimestamp, lockTimestamp, closeTimestamp, lockPrice, closePrice, lockOracleId, closeOracleId, totalAmount, bullAmount, bearAmount, rewardBaseCalAmount, rewardAmount, oraclesCalled]
-
-                total_amount = round_data[7]  # totalAmount
-                bull_amount = round_data[8]  # bullAmount
-                bear_amount = round_data[9]  # bearAmount
-                reward_amount = round_data[11]  # rewardAmount
+                # Round struct: [epoch, startTimestamp, lockTimestamp, closeTimestamp, lockPrice, closePrice,
+                # lockOracleId, closeOracleId, totalAmount, bullAmount, bearAmount, rewardBaseCalAmount,
+                # rewardAmount, oracleCalled]
+                reward_base = round_data[11]  # winning side's total
+                reward_amount = round_data[12]  # pot after the treasury fee
 
-                # Calculate user's share of the rewards
-                if user_round[0] == 0:  # Bull position
-                    if bull_amount > 0:
-                        user_reward = (bet_amount * reward_amount) // bull_amount
-                    else:
-                        user_reward = 0
-                else:  # Bear position
-                    if bear_amount > 0:
-                        user_reward = (bet_amount * reward_amount) // bear_amount
-                    else:
-                        user_reward = 0
+                if not round_data[13]:  # never settled -> refund of the stake
+                    user_reward = bet_amount
+                elif reward_base > 0:
+                    user_reward = (bet_amount * reward_amount) // reward_base
+                else:
+                    user_reward = 0
 
                 return web3.from_wei(user_reward, 'ether')
 
             return 0
 
         except Exception as e:
-            print(f"⚠️ Error calculating claimable amount: {e}")
+            log_event("claim_estimate_failed", f"⚠️ Error calculating claimable amount: {e}", logging.WARNING,
+                      wallet=wallet_address, epoch=epoch, error=str(e))
             return 0
 
     def claim_rewards(self, wallet_info, epochs_to_claim=None):
         """Claim rewards for specified epochs or all claimable epochs"""
         try:
             wallet_address = Web3.to_checksum_address(wallet_info['address'])
-            private_key = wallet_info['private_key']
+            signer = get_signer(wallet_info)
 
             # Get all claimable epochs if none specified
             if epochs_to_claim is None:
@@ -961,62 +4336,71 @@ class RewardManager:
                 epochs_to_claim = [epoch['epoch'] for epoch in claimable_epochs]
 
             if not epochs_to_claim:
-                print("🎉 No rewards to claim!")
+                log_event("claim_none", "🎉 No rewards to claim!", wallet=wallet_info.name)
                 return True
 
-            print(f"\n🎁 Claiming rewards for {len(epochs_to_claim)} epochs...")
+            log_event("claim_start", f"\n🎁 Claiming rewards for {len(epochs_to_claim)} epochs...",
+                      wallet=wallet_info.name, epochs=list(epochs_to_claim))
 
             successful_claims = 0
             total_claimed = 0
 
             for epoch in epochs_to_claim:
                 try:
-                    print(f"🎯 Claiming epoch {epoch}...")
+                    log_event("claim_epoch", f"🎯 Claiming epoch {epoch}...", logging.DEBUG,
+                              wallet=wallet_info.name, epoch=epoch)
 
                     # Check if still claimable
                     if not prediction_contract.functions.claimable(epoch, wallet_address).call():
-                        print(f"⚠️ Epoch {epoch} is not claimable, skipping...")
+                        log_event("claim_skipped", f"⚠️ Epoch {epoch} is not claimable, skipping...", logging.WARNING,
+                                  wallet=wallet_info.name, epoch=epoch)
                         continue
 
                     # Get estimated reward amount
                     estimated_reward = self.get_claimable_amount(wallet_address, epoch)
 
-                    # Build claim transaction
-                    nonce = web3.eth.get_transaction_count(wallet_address)
-
-                    claim_tx = prediction_contract.functions.claim([epoch]).build_transaction({
-                        'from': wallet_address,
-                        'gas': 200000,
-                        'gasPrice': web3.to_wei('0.1', 'gwei'),
-                        'nonce': nonce,
-                        'chainId': 56
-                    })
-
-                    # Sign and send transaction
-                    signed_tx = web3.eth.account.sign_transaction(claim_tx, private_key)
-                    tx_hash = web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-
-                    print(f"⏳ Waiting for claim confirmation... TX: {web3.to_hex(tx_hash)}")
-                    receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+                    # Build, sign and send the claim - 'pending' and the send lock keep it off a bet's nonce
+                    with send_lock(wallet_address):
+                        nonce = web3.eth.get_transaction_count(wallet_address, 'pending')
+                        claim_tx = prediction_contract.functions.claim([epoch]).build_transaction({
+                            'from': wallet_address,
+                            'gas': 200000,
+                            'gasPrice': web3.to_wei('0.1', 'gwei'),
+                            'nonce': nonce,
+                            'chainId': CHAIN_ID
+                        })
+                        signed_tx = signer.sign_transaction(claim_tx)
+                        tx_hash = send_transaction(signed_tx, wallet_address)
+
+                    log_event("claim_sent", f"⏳ Waiting for claim confirmation... TX: {web3.to_hex(tx_hash)}",
+                              wallet=wallet_info.name, epoch=epoch, tx=web3.to_hex(tx_hash))
+                    receipt = wait_for_receipt(tx_hash, wallet_address)
 
                     if receipt.status == 1:
-                        print(f"✅ Claimed epoch {epoch}! Estimated reward: {estimated_reward:.6f} BNB")
-                        print(f"🔗 TX: https://bscscan.com/tx/{web3.to_hex(tx_hash)}")
+                        log_event("claim_done",
+                                  f"✅ Claimed epoch {epoch}! Estimated reward: {estimated_reward:.6f} BNB\n"
+                                  f"🔗 TX: https://bscscan.com/tx/{web3.to_hex(tx_hash)}",
+                                  wallet=wallet_info.name, epoch=epoch, bnb=estimated_reward, tx=web3.to_hex(tx_hash))
                         successful_claims += 1
                         total_claimed += estimated_reward
                     else:
-                        print(f"❌ Failed to claim epoch {epoch}")
+                        log_event("claim_failed", f"❌ Failed to claim epoch {epoch}", logging.ERROR,
+                                  wallet=wallet_info.name, epoch=epoch, tx=web3.to_hex(tx_hash))
 
                     # Small delay between claims
                     time.sleep(2)
 
                 except Exception as e:
-                    print(f"❌ Error claiming epoch {epoch}: {e}")
+                    log_event("claim_failed", f"❌ Error claiming epoch {epoch}: {e}", logging.ERROR,
+                              wallet=wallet_info.name, epoch=epoch, error=str(e))
                     continue
 
-            print(f"\n🎉 CLAIM SUMMARY:")
-            print(f"✅ Successfully claimed: {successful_claims}/{len(epochs_to_claim)} epochs")
-            print(f"💰 Total estimated rewards: {total_claimed:.6f} BNB")
+            log_event("claim_summary",
+                      f"\n🎉 CLAIM SUMMARY:\n"
+                      f"✅ Successfully claimed: {successful_claims}/{len(epochs_to_claim)} epochs\n"
+                      f"💰 Total estimated rewards: {total_claimed:.6f} BNB",
+                      wallet=wallet_info.name, claimed=successful_claims, epochs=len(epochs_to_claim),
+                      bnb=total_claimed)
 
             if successful_claims > 0:
                 # Send Telegram notification
@@ -1032,7 +4416,7 @@ class RewardManager:
             return successful_claims > 0
 
         except Exception as e:
-            print(f"❌ Error during reward claiming: {e}")
+            log_event("claim_failed", f"❌ Error during reward claiming: {e}", logging.ERROR, error=str(e))
             return False
 
     def show_claimable_rewards(self, wallet_info):
@@ -1070,19 +4454,616 @@ class RewardManager:
             return []
 
 
-def send_telegram_message(message):
+# === AUTO CLAIMER ===
+AUTO_CLAIM = os.getenv("AUTO_CLAIM", "0") == "1"  # start it with the menu / daemon
+AUTO_CLAIM_POLL_INTERVAL = float(os.getenv("AUTO_CLAIM_POLL_INTERVAL", "3"))  # seconds between EndRound polls
+AUTO_CLAIM_QUIET_BEFORE_LOCK = float(os.getenv("AUTO_CLAIM_QUIET_BEFORE_LOCK", "30"))  # no claims sent from T-30s...
+AUTO_CLAIM_QUIET_AFTER_LOCK = float(os.getenv("AUTO_CLAIM_QUIET_AFTER_LOCK", "5"))  # ...until 5s after the lock
+AUTO_CLAIM_WORKERS = int(os.getenv("AUTO_CLAIM_WORKERS", "4"))  # wallets claiming at once
+AUTO_CLAIM_MAX_EPOCHS = 50  # epochs per claim() transaction
+AUTO_CLAIM_MAX_ATTEMPTS = 3
+
+
+class AutoClaimer:
+    """Claims winnings and refunds in the background as rounds end
+
+    Polls for EndRound logs and settles each ended epoch against bet_ledger with a single
+    rounds() read - winners follow from lockPrice/closePrice, so no wallet is scanned.
+    Claims are queued per wallet and flushed as one claim(epochs) transaction per wallet,
+    AUTO_CLAIM_WORKERS at a time, only outside the window around lockTimestamp when bets go
+    out. Wallets with a scheduled bet pending wait until it has fired: its nonce is already signed.
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.quiet_before_lock = AUTO_CLAIM_QUIET_BEFORE_LOCK
+        self.quiet_after_lock = AUTO_CLAIM_QUIET_AFTER_LOCK
+        self.queue = {}  # address -> {'wallet', 'epochs': {epoch: (payout_wei, ready_at)}, 'attempts'}
+        self.stats = {"rounds_settled": 0, "claims_sent": 0, "epochs_claimed": 0, "claimed_wei": 0,
+                      "failed": 0, "deferred": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_block = None
+        self._ended_epoch = 0
+        self._recheck = {}  # epoch -> chain time to look at an unsettled round again
+        self._buffer_seconds = None
+        self._window = None  # (startTimestamp, lockTimestamp) of the current round
+
+    def start(self, interval=AUTO_CLAIM_POLL_INTERVAL):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+        log_event("auto_claim_started", f"🤖 Auto-claimer started (polling every {interval:g}s)", interval=interval)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval):
+        with operation("auto_claim"):
+            while not self._stop.is_set():
+                try:
+                    self.poll()
+                except Exception as e:
+                    log_event("auto_claim_error", f"⚠️ Auto-claim error: {e}", logging.WARNING, error=str(e))
+                self._stop.wait(interval)
+
+    def poll(self):
+        """One cycle: read new EndRound logs, settle ended epochs, flush if bets aren't due"""
+        if chain_clock.synced_at is None:
+            chain_clock.sync()
+        latest = web3.eth.block_number
+        if self._last_block is None:
+            # Bets already in the ledger from rounds that ended before we started count too
+            self._ended_epoch = prediction_contract.functions.currentEpoch().call() - 2
+            self._buffer_seconds = prediction_contract.functions.bufferSeconds().call()
+        elif latest > self._last_block:
+            logs = prediction_contract.events.EndRound.get_logs(from_block=self._last_block + 1, to_block=latest)
+            if logs:
+                self._ended_epoch = max(self._ended_epoch, *(log['args']['epoch'] for log in logs))
+                self._window = None
+        self._last_block = latest
+        self.settle()
+        if self.queue:
+            self.flush()
+
+    def settle(self):
+        """Move the winning and refundable bets of ended epochs from the ledger to the claim queue"""
+        now = chain_clock.now()
+        for epoch in self.ledger.epochs(self._ended_epoch):
+            if self._recheck.get(epoch, 0) > now:
+                continue
+            round_data = prediction_contract.functions.rounds(epoch).call()
+            lock_price, close_price, close_timestamp = round_data[4], round_data[5], round_data[3]
+            if round_data[13]:  # oracleCalled
+                outcome = (close_price > lock_price) - (close_price < lock_price)
+                winning_position = {1: 0, -1: 1}.get(outcome)  # tie: the house takes the round
+                reward_base, reward_amount = round_data[11], round_data[12]
+                payouts = [(wallet, amount_wei * reward_amount // reward_base)
+                           for wallet, position, amount_wei in self.ledger.pop(epoch).values()
+                           if position == winning_position and reward_base > 0]
+            elif now > close_timestamp + self._buffer_seconds:
+                payouts = [(wallet, amount_wei) for wallet, _, amount_wei in self.ledger.pop(epoch).values()]
+            else:
+                self._recheck[epoch] = close_timestamp + self._buffer_seconds + 1
+                continue
+            self._recheck.pop(epoch, None)
+            self._count("rounds_settled")
+            with self._lock:
+                for wallet, payout_wei in payouts:
+                    entry = self.queue.setdefault(wallet.address, {'wallet': wallet, 'epochs': {}, 'attempts': 0})
+                    # claim() needs block.timestamp > closeTimestamp
+                    entry['epochs'][epoch] = (payout_wei, close_timestamp + 1)
+            if payouts:
+                log_event("auto_claim_settled", f"🎁 Epoch {epoch}: {len(payouts)} wallet(s) to claim",
+                          epoch=epoch, wallets=[wallet.name for wallet, _ in payouts])
+
+    def _quiet(self):
+        """True while bets are due: shortly before the current round locks, or just after the last lock"""
+        now = chain_clock.now()
+        if self._window is None or now >= self._window[1]:
+            current_epoch = prediction_contract.functions.currentEpoch().call()
+            round_data = prediction_contract.functions.rounds(current_epoch).call()
+            round_tracker.update(current_epoch, round_data)
+            self._window = tuple(round_data[1:3])
+        start_timestamp, lock_timestamp = self._window
+        return now >= lock_timestamp - self.quiet_before_lock or now < start_timestamp + self.quiet_after_lock
+
+    def flush(self):
+        """Send the ready claims, one transaction per wallet"""
+        if self._quiet():
+            self._count("deferred")
+            return
+        now = chain_clock.now()
+        busy = {job['address'] for job in bet_scheduler.pending()}
+        batch = []
+        with self._lock:
+            for address, entry in list(self.queue.items()):
+                ready = {epoch: value for epoch, value in entry['epochs'].items() if value[1] < now}
+                if not ready or address in busy:
+                    continue
+                for epoch in ready:
+                    del entry['epochs'][epoch]
+                if not entry['epochs']:
+                    del self.queue[address]
+                batch.append((entry, ready))
+        if not batch:
+            return
+        results = fan_out(lambda item: self._claim(*item), batch, AUTO_CLAIM_WORKERS)
+        claimed = [result for result in results if result]
+        if claimed:
+            total = sum(payout_wei for _, _, payout_wei in claimed)
+            message = (
+                f"🤖 Auto-claimed {sum(count for _, count, _ in claimed)} epoch(s) "
+                f"from {len(claimed)} wallet(s)\n"
+                f"💰 Total: {total / 1e18:.6f} BNB\n"
+                f"⏰ Time: {datetime.now().strftime('%H:%M:%S')}"
+            )
+            log_event("auto_claim_done", f"\n{message}", wallets=len(claimed), claimed_wei=total)
+            send_telegram_message(message)
+
+    def _claim(self, entry, epochs):
+        """Claim `epochs` {epoch: (payout_wei, ready_at)} for one wallet, requeue on failure"""
+        wallet = entry['wallet']
+        address = wallet.address
+        claimed_epochs, claimed_wei = 0, 0
+        remaining = sorted(epochs)
+        try:
+            while remaining:
+                if self._quiet():
+                    self._count("deferred")
+                    break
+                chunk = remaining[:AUTO_CLAIM_MAX_EPOCHS]
+                function = prediction_contract.functions.claim(chunk)
+                try:
+                    # Simulate first: a bet that never made it on chain or was claimed by hand
+                    # would revert and cost gas
+                    function.call({'from': address})
+                except Exception:
+                    chunk = [epoch for epoch in chunk
+                             if prediction_contract.functions.claimable(epoch, address).call()
+                             or prediction_contract.functions.refundable(epoch, address).call()]
+                    for epoch in set(remaining[:AUTO_CLAIM_MAX_EPOCHS]) - set(chunk):
+                        log_event("auto_claim_dropped", f"⚠️ {wallet.name} epoch {epoch} is no longer claimable, dropped",
+                                  logging.WARNING, wallet=wallet.name, epoch=epoch)
+                        remaining.remove(epoch)
+                    if not chunk:
+                        continue
+                    function = prediction_contract.functions.claim(chunk)
+                with send_lock(address):
+                    tx = function.build_transaction({
+                        'from': address,
+                        'gas': 200000 + 50000 * (len(chunk) - 1),
+                        'gasPrice': web3.to_wei('0.1', 'gwei'),
+                        'nonce': web3.eth.get_transaction_count(address, 'pending'),
+                        'chainId': CHAIN_ID
+                    })
+                    tx_hash = send_transaction(get_signer(wallet).sign_transaction(tx), address)
+                self._count("claims_sent")
+                if wait_for_receipt(tx_hash, address).status != 1:
+                    raise RuntimeError(f"claim reverted, TX: {web3.to_hex(tx_hash)}")
+                claimed_epochs += len(chunk)
+                claimed_wei += sum(epochs[epoch][0] for epoch in chunk)
+                remaining = remaining[len(chunk):]
+        except Exception as e:
+            entry['attempts'] += 1
+            if entry['attempts'] >= AUTO_CLAIM_MAX_ATTEMPTS:
+                self._count("failed", len(remaining))
+                log_event("auto_claim_failed", f"❌ Auto-claim for {wallet.name} gave up on epochs {remaining}: {e}",
+                          logging.ERROR, wallet=wallet.name, epochs=remaining, error=str(e))
+                remaining = []
+            else:
+                log_event("auto_claim_retry", f"⚠️ Auto-claim for {wallet.name} failed, will retry: {e}",
+                          logging.WARNING, wallet=wallet.name, attempts=entry['attempts'], error=str(e))
+        if remaining:
+            with self._lock:
+                queued = self.queue.setdefault(address, entry)
+                queued['epochs'].update({epoch: epochs[epoch] for epoch in remaining})
+        self._count("epochs_claimed", claimed_epochs)
+        self._count("claimed_wei", claimed_wei)
+        return (wallet.name, claimed_epochs, claimed_wei) if claimed_epochs else None
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def claimable(self):
+        """[(wallet, epochs, payout_wei)] settled and waiting to be claimed, largest payout first"""
+        with self._lock:
+            pending = [(entry['wallet'], len(entry['epochs']), sum(payout for payout, _ in entry['epochs'].values()))
+                       for entry in self.queue.values() if entry['epochs']]
+        return sorted(pending, key=lambda item: -item[2])
+
+    def status(self):
+        with self._lock:
+            queued = sum(len(entry['epochs']) for entry in self.queue.values())
+            stats = dict(self.stats)
+        return {"running": self.running, "ended_epoch": self._ended_epoch,
+                "open_bets": len(self.ledger), "queued_epochs": queued, **stats}
+
+
+auto_claimer = AutoClaimer(bet_ledger)
+
+
+def send_telegram_message(message, chat_id=None):
+    """Send to chat_id, else the chat whose command is being handled, else TELEGRAM_CHAT_ID"""
     try:
         token = os.getenv("TELEGRAM_TOKEN")
-        chat_id = os.getenv("TELEGRAM_CHAT_ID")
+        chat_id = chat_id or _reply_chat.get() or os.getenv("TELEGRAM_CHAT_ID")
         if not token or not chat_id:
             return
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
+        url = f"{TELEGRAM_API_URL}/bot{token}/sendMessage"
         payload = {"chat_id": chat_id, "text": message}
-        response = requests.post(url, data=payload)
+        with span("notify"):
+            response = requests.post(url, data=payload)
         if not response.ok:
-            print(f"⚠️ Telegram error: {response.text}")
+            log_event("telegram_error", f"⚠️ Telegram error: {response.text}", logging.WARNING, status=response.status_code)
     except Exception as e:
-        print(f"⚠️ Telegram exception: {e}")
+        log_event("telegram_error", f"⚠️ Telegram exception: {e}", logging.WARNING, error=str(e))
+
+
+def start_telegram_monitor():
+    def telegram_monitor():
+        """INSTANT Telegram monitoring - NO DELAYS ⚡"""
+        while True:
+            try:
+                with profiler.section("telegram_poll"):
+                    check_telegram_commands()
+                # NO SLEEP = INSTANT EXECUTION ⚡⚡⚡
+            except Exception as e:
+                print(f"⚠️ Telegram monitor error: {e}")
+                time.sleep(1)  # Only sleep on errors
+
+    telegram_thread = threading.Thread(target=telegram_monitor, name="telegram", daemon=True)
+    telegram_thread.start()
+    return telegram_thread
+
+
+# === HEADLESS DAEMON ===
+DAEMON_SOCKET = os.getenv("MWPB_SOCKET", os.path.join(BASE_DIR, "mwpb.sock"))
+
+
+class BotDaemon:
+    """Long-running bot: warm web3 and caches, Telegram monitor, JSON commands on a Unix socket
+
+    One JSON object per line, e.g. {"cmd": "balance", "wallet": 2} -> {"ok": true, "result": {...}}.
+    Wallet numbers are 1-based like in the menu. Commands hold transaction_lock only while they
+    send from the main wallet; claims and drains send from sub-wallets and never wait on a bet.
+    """
+
+    def __init__(self, socket_path=DAEMON_SOCKET):
+        self.socket_path = socket_path
+        self.wallet_manager = WalletManager()
+        self.swap_manager = SwapManager()
+        self.betting_manager = BettingManager()
+        self.reward_manager = RewardManager()
+        self.started_at = time.time()
+        self.server = None
+        self._wallets_mtime = self._wallet_file_mtime()
+        self.handlers = {
+            "ping": self.cmd_ping,
+            "status": self.cmd_status,
+            "balance": self.cmd_balance,
+            "bet": self.cmd_bet,
+            "claim": self.cmd_claim,
+            "drain": self.cmd_drain,
+            "distribute": self.cmd_distribute,
+            "fund": self.cmd_fund,
+            "rebalance": self.cmd_rebalance,
+            "schedule": self.cmd_schedule,
+            "scheduled": self.cmd_scheduled,
+            "pnl": self.cmd_pnl,
+            "profile": self.cmd_profile,
+            "shutdown": self.cmd_shutdown,
+        }
+
+    def _wallet_file_mtime(self):
+        try:
+            return os.stat(self.wallet_manager.wallets_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def _reload_wallets_if_changed(self):
+        """Pick up wallets created by other processes (e.g. the create-wallets command)"""
+        mtime = self._wallet_file_mtime()
+        if mtime != self._wallets_mtime:
+            self._wallets_mtime = mtime
+            self.wallet_manager.reload()
+
+    def _wallet(self, request):
+        wallets = self.wallet_manager.wallets
+        try:
+            wallet_idx = int(request["wallet"]) - 1
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("'wallet' must be a wallet number")
+        if wallet_idx < 0 or wallet_idx >= len(wallets):
+            raise ValueError(f"Invalid wallet number (1-{len(wallets)})")
+        return wallets[wallet_idx]
+
+    def handle(self, request):
+        """Run one command, always returns a JSON-serialisable response"""
+        command = request.get("cmd") if isinstance(request, dict) else None
+        handler = self.handlers.get(command)
+        if handler is None:
+            return {"ok": False, "error": f"Unknown command: {command}", "commands": sorted(self.handlers)}
+        try:
+            self._reload_wallets_if_changed()
+            rpc_before = rpc_accounting.snapshot()
+            with operation(command):
+                op_id = _operation_id.get()
+                result = handler(request)
+            report_rpc_usage(command, rpc_before)
+            return {"ok": True, "result": result, "op_id": op_id}
+        except Exception as e:
+            log_event("daemon_command_failed", f"❌ Daemon command '{command}' failed: {e}", logging.ERROR,
+                      command=command, error=str(e))
+            return {"ok": False, "error": str(e)}
+
+    def cmd_ping(self, request):
+        return "pong"
+
+    def cmd_status(self, request):
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "wallets": len(self.wallet_manager.wallets),
+            "connected": chain_status["connected"],
+            "chain_id": chain_status["chain_id"],
+            "rpc": rpc_limiter.stats(),
+            "auto_claim": auto_claimer.status(),
+            "swap_batching": swap_batcher.status(),
+            "swaps": {"sent": swap_stats["sent"], "reverted": swap_stats["reverted"], "failed": swap_stats["failed"]},
+            "broadcast": broadcaster.status() if broadcaster is not None else None,
+            "admission": {**bet_admission.status(), "needed_seconds": round(bet_admission.needed_seconds(), 2)},
+            "round": round_tracker.snapshot(),
+            "profiling": profiler.status(),
+            "telegram": telegram_router.status(),
+            "in_flight": [{"tx_hash": Web3.to_hex(tx_hash), "operation": operation, "age_seconds": round(age, 1)}
+                          for tx_hash, operation, age in in_flight.snapshot()],
+        }
+
+    def cmd_balance(self, request):
+        """Main wallet by default, {"wallet": n} for one wallet, {"wallet": "all"} for every wallet"""
+        if request.get("wallet") == "all":
+            balances = []
+            for number, wallet in enumerate(self.wallet_manager.wallets, 1):
+                bnb_wei, usdt_wei = balance_cache.get_or_fetch(wallet['address'])
+                balances.append({"wallet": number, "name": wallet['name'], "address": wallet['address'],
+                                 "bnb": bnb_wei / 1e18, "usdt": usdt_wei / 1e18})
+            return {"wallets": balances, "total_bnb": sum(balance["bnb"] for balance in balances)}
+        if request.get("wallet") is None:
+            name, address = "main", MAIN_WALLET_ADDRESS
+        else:
+            wallet = self._wallet(request)
+            name, address = wallet['name'], wallet['address']
+        bnb_wei, usdt_wei = balance_cache.get_or_fetch(address)
+        return {"name": name, "address": address, "bnb": bnb_wei / 1e18, "usdt": usdt_wei / 1e18}
+
+    def cmd_bet(self, request):
+        """{"wallet": n, "usdt": amount, "direction": "up"|"down"}: swap USDT to the wallet, then bet 95%"""
+        wallet = self._wallet(request)
+        usdt_amount = float(request.get("usdt", 0))
+        direction = str(request.get("direction", "")).lower()
+        if usdt_amount <= 0:
+            raise ValueError("'usdt' must be positive")
+        if direction not in ['up', 'down']:
+            raise ValueError("'direction' must be 'up' or 'down'")
+        admission = bet_admission.admit(retargeted=request.get("retargeted", False))
+        if admission.verdict == "reject":
+            raise RuntimeError(f"Too late for epoch {admission.epoch}: {admission.seconds_left:.1f}s to lock, "
+                               f"swap + bet need ~{admission.needed:.1f}s")
+        if admission.verdict == "next":
+            in_next_round(admission, self._retargeted_bet, request)
+            return {"retargeted_epoch": admission.epoch, "starts_in_seconds": round(admission.seconds_left, 1)}
+        admitted_at = time.perf_counter()
+        with transaction_lock:
+            if not self.swap_manager.swap_usdt_to_bnb(usdt_amount, wallet['address']):
+                raise RuntimeError("Swap failed")
+            time.sleep(0.5)
+            wallet = self.wallet_manager.get_wallet_balances(wallet)
+            bet_amount = bettable_amount(wallet)
+            if not self.betting_manager.place_bet(wallet, direction, bet_amount):
+                raise RuntimeError("Bet placement failed")
+        bet_admission.observe_send(time.perf_counter() - admitted_at)
+        return {"wallet": wallet.name, "usdt": usdt_amount, "direction": direction, "bet_bnb": float(bet_amount)}
+
+    def _retargeted_bet(self, request):
+        """cmd_bet for a bet admission control moved to the next round - runs on in_next_round's thread"""
+        try:
+            with operation("bet"):
+                result = self.cmd_bet({**request, "retargeted": True})
+            log_event("retargeted_bet_done", f"⏭️ Retargeted bet placed: {result}", **result)
+        except Exception as e:
+            log_event("retargeted_bet_failed", f"❌ Retargeted bet failed: {e}", logging.ERROR, error=str(e))
+
+    def cmd_claim(self, request):
+        """Claim every claimable epoch of one wallet, or of all wallets when no wallet is given"""
+        wallets = [self._wallet(request)] if request.get("wallet") is not None else self.wallet_manager.wallets
+        # Wallets claim with their own nonces, so they can all go at once and never hold up a bet
+        claimed = fan_out(self.reward_manager.claim_rewards, wallets)
+        return {wallet['name']: result for wallet, result in zip(wallets, claimed)}
+
+    def cmd_drain(self, request):
+        # Only sub-wallets send, so no transaction_lock
+        return {"drained": drain_all_wallets(self.wallet_manager, MAIN_WALLET_ADDRESS)}
+
+    def cmd_distribute(self, request):
+        """95% of the main wallet split equally, {"disperse": true} to go through the disperse contract"""
+        # distribute_wealth / disperse_bnb take transaction_lock themselves, just while they send
+        return {"distributed": distribute_wealth(self.wallet_manager, MAIN_WALLET_ADDRESS, confirm=False,
+                                                 disperse=bool(request.get("disperse")))}
+
+    def cmd_fund(self, request):
+        """{"amounts": {"<wallet number>": bnb, ...}}: per-wallet amounts through the disperse contract"""
+        amounts = request.get("amounts")
+        if not isinstance(amounts, dict) or not amounts:
+            raise ValueError("'amounts' must map wallet numbers to BNB amounts")
+        transfers = [(self._wallet({"wallet": number})['address'], Web3.to_wei(Decimal(str(bnb)), 'ether'))
+                     for number, bnb in amounts.items()]
+        return disperse_bnb(transfers)
+
+    def cmd_rebalance(self, request):
+        """{"target": bnb} or {"targets": {"<wallet number>": bnb, ...}}; {"disperse": true} for disperse top-ups"""
+        if request.get("targets"):
+            targets = [(self._wallet({"wallet": number}), Web3.to_wei(Decimal(str(bnb)), 'ether'))
+                       for number, bnb in request["targets"].items()]
+        elif request.get("target") is not None:
+            targets = Web3.to_wei(Decimal(str(request["target"])), 'ether')
+        else:
+            raise ValueError("give 'target' (BNB for every wallet) or 'targets' (wallet number -> BNB)")
+        # The top-ups take transaction_lock themselves, just while they send from the main wallet
+        result = rebalance_wallets(self.wallet_manager, MAIN_WALLET_ADDRESS, targets, confirm=False,
+                                   disperse=bool(request.get("disperse")))
+        if result is None:
+            raise RuntimeError("Rebalance failed - see the daemon log")
+        return result
+
+    def cmd_schedule(self, request):
+        """{"wallet": n, "bnb": amount, "direction": ..., "epoch"?: e, "offset"?: seconds}: pre-signed bet at lock - offset"""
+        wallet = self._wallet(request)
+        direction = str(request.get("direction", "")).lower()
+        if direction not in ['up', 'down']:
+            raise ValueError("'direction' must be 'up' or 'down'")
+        job = bet_scheduler.schedule(wallet, direction, float(request.get("bnb", 0)),
+                                     request.get("epoch"), request.get("offset"))
+        return BetScheduler.summary(job)
+
+    def cmd_scheduled(self, request):
+        return {
+            "pending": [BetScheduler.summary(job) for job in bet_scheduler.pending()],
+            "fired": [BetScheduler.summary(job) for job in bet_scheduler.fired(20)],
+        }
+
+    def cmd_pnl(self, request):
+        import analytics
+        return analytics.report_as_dict(analytics.fleet_pnl(self.wallet_manager))
+
+    def cmd_profile(self, request):
+        """{"action": "start"|"stop"|"memory"|"memory_stop"|"status"}, start also takes mode and seconds"""
+        action = request.get("action", "status")
+        if action == "start":
+            profiler.start(request.get("mode", "cprofile"), request.get("seconds"))
+            return profiler.status()
+        if action == "stop":
+            path, summary = profiler.stop()
+            return {"path": path, "summary": summary}
+        if action == "memory":
+            path, summary = profiler.memory_snapshot()
+            return {"path": path, "summary": summary}
+        if action == "memory_stop":
+            profiler.memory_stop()
+            return profiler.status()
+        if action == "status":
+            return profiler.status()
+        raise ValueError("'action' must be start, stop, memory, memory_stop or status")
+
+    def cmd_shutdown(self, request):
+        # shutdown() blocks until serve_forever returns, so it can't run on the handler thread
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+        return "shutting down"
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.socket_path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)  # left over from a daemon that died
+                return
+        raise RuntimeError(f"Another daemon is already listening on {self.socket_path}")
+
+    def serve_forever(self):
+        daemon = self
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                    except ValueError as e:
+                        response = {"ok": False, "error": f"Invalid JSON: {e}"}
+                    else:
+                        response = daemon.handle(request)
+                    self.wfile.write(json.dumps(response, default=str).encode() + b"\n")
+                    self.wfile.flush()
+
+        self._remove_stale_socket()
+        # The socket can move funds: create it owner-only instead of narrowing it after bind
+        old_umask = os.umask(0o177)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self.server.daemon_threads = True
+        print(f"🛰️ Daemon listening on {self.socket_path}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            print("👋 Daemon stopped")
+
+
+def run_daemon(socket_path=DAEMON_SOCKET, telegram=True, auto_claim=AUTO_CLAIM):
+    """Headless mode: everything main() starts, minus the menu"""
+    daemon = BotDaemon(socket_path)
+    if daemon.wallet_manager.is_encrypted() and not daemon.wallet_manager.unlock():
+        return 1
+    setup_logging()
+    connect_in_background()
+    if BALANCE_REFRESH_INTERVAL > 0:
+        balance_cache.start_refresher(BALANCE_REFRESH_INTERVAL)
+    if STATUS_REFRESH_INTERVAL > 0:
+        round_tracker.start_refresher(STATUS_REFRESH_INTERVAL)
+    if METRICS_PORT:
+        try:
+            start_metrics_server(METRICS_PORT)
+        except OSError as e:
+            print(f"⚠️ Could not start metrics endpoint: {e}")
+    if telegram:
+        start_telegram_monitor()
+        print("⚡ INSTANT Telegram monitor started!")
+    if auto_claim:
+        auto_claimer.start()
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+# Operation each menu choice is booked under in the RPC accounting
+MENU_OPERATIONS = {
+    '1': "main_balance",
+    '2': "swap_bnb_to_usdt",
+    '3': "swap_usdt_to_bnb",
+    '4': "list_wallets",
+    '5': "create_wallet",
+    '6': "bet",
+    '7': "claim",
+    '8': "empty_wallet",
+    '9': "drain",
+    '10': "distribute",
+    '11': "delete_wallet",
+    '12': "total_balance",
+    '13': "bulk_create",
+    '14': "schedule_bet",
+    '15': "analytics",
+    '16': "rebalance",
+    '17': "profile",
+}
 
 
 def main():
@@ -1091,27 +5072,47 @@ def main():
     betting_manager = BettingManager()
     reward_manager = RewardManager()
 
+    if wallet_manager.is_encrypted() and not wallet_manager.unlock():
+        return
+
+    setup_logging()
+    connect_in_background()
+
+    if BALANCE_REFRESH_INTERVAL > 0:
+        balance_cache.start_refresher(BALANCE_REFRESH_INTERVAL)
+    if STATUS_REFRESH_INTERVAL > 0:
+        round_tracker.start_refresher(STATUS_REFRESH_INTERVAL)
+
+    if METRICS_PORT:
+        try:
+            start_metrics_server(METRICS_PORT)
+            print(f"📈 Metrics: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"⚠️ Could not start metrics endpoint: {e}")
+
     print("🤖 Multi-Wallet Prediction Bot")
     print("⚡ INSTANT TELEGRAM BETTING ACTIVE!")
-    print("📱 Send: /bet 1/50/up")
+    print("📱 Send: /bet 1/50/up  |  /stats for latency  |  /pnl for fleet P&L")
+    print("📱 Queries: /balance  |  /claimable  |  /status")
     print("=" * 50)
 
-    def telegram_monitor():
-        """INSTANT Telegram monitoring - NO DELAYS ⚡"""
-        while True:
-            try:
-                check_telegram_commands()
-                # NO SLEEP = INSTANT EXECUTION ⚡⚡⚡
-            except Exception as e:
-                print(f"⚠️ Telegram monitor error: {e}")
-                time.sleep(1)  # Only sleep on errors
-
     # Start INSTANT Telegram monitoring
-    telegram_thread = threading.Thread(target=telegram_monitor, daemon=True)
-    telegram_thread.start()
+    start_telegram_monitor()
     print("⚡ INSTANT Telegram monitor started!")
+    if AUTO_CLAIM:
+        auto_claimer.start()
 
+    menu_operation = None
+    rpc_before = {}
+    menu_profile = ExitStack()
     while True:
+        # Report the previous action here so every `continue` path is covered too
+        menu_profile.close()
+        if menu_operation:
+            report_rpc_usage(menu_operation, rpc_before)
+        # Let queued events reach the console before the menu is drawn over them
+        flush_events()
+
         print("\n📋 MAIN MENU:")
         print("1. Check main wallet balance")
         print("2. Swap BNB to USDT (Main Wallet, 0.1% slippage)")
@@ -1125,17 +5126,26 @@ def main():
         print("10. Distribute wealth (send 95% of main wallet equally to all wallets)")
         print("11. Delete wallet")
         print("12. Show total BNB balance of all sub-wallets (exclude main wallet)")
-        print("13. Exit")
+        print("13. Create multiple wallets (bulk)")
+        print(f"14. Schedule bet at lock time (T-{BET_FIRE_OFFSET:g}s, wallet must hold BNB)")
+        print("15. Fleet P&L analytics (win rate, pending claims, per wallet)")
+        print("16. Rebalance wallets to a target BNB balance (fewest transfers)")
+        print("17. Profiling (CPU / memory, without restarting)")
+        print("18. Exit")
         print("\n⚡ INSTANT TELEGRAM: /bet [wallet]/[usdt]/[up|down]")
 
-        choice = input("\nSelect option (1-12): ").strip()
+        choice = input("\nSelect option (1-18): ").strip()
+        menu_operation = MENU_OPERATIONS.get(choice)
+        _current_command.set(menu_operation)
+        _operation_id.set(new_operation_id(menu_operation) if menu_operation else None)
+        rpc_before = rpc_accounting.snapshot()
+        if menu_operation:
+            menu_profile.enter_context(profiler.section(menu_operation))
 
         if choice == '1':
             try:
-                main_address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
-                bnb_balance = web3.eth.get_balance(main_address)
+                bnb_balance, usdt_balance = balance_cache.get_or_fetch(MAIN_WALLET_ADDRESS)
                 bnb_balance = web3.from_wei(bnb_balance, 'ether')
-                usdt_balance = usdt_contract.functions.balanceOf(main_address).call()
                 usdt_balance = usdt_balance / 1e18
                 print(f"\n💰 MAIN WALLET BALANCE:")
                 print(f"📧 Address: {MAIN_WALLET_ADDRESS}")
@@ -1145,7 +5155,7 @@ def main():
                 print(f"❌ Error checking balance: {e}")
         elif choice == '2':
             try:
-                bnb_balance = web3.eth.get_balance(Web3.to_checksum_address(MAIN_WALLET_ADDRESS)) / 1e18
+                bnb_balance = balance_cache.get_or_fetch(MAIN_WALLET_ADDRESS)[0] / 1e18
                 print(f"\n💎 Main Wallet BNB Balance: {bnb_balance:.4f} BNB")
                 amount = float(input("Enter BNB amount to swap: "))
                 if amount <= 0 or amount > bnb_balance:
@@ -1156,8 +5166,7 @@ def main():
                 print(f"❌ Error: {e}")
         elif choice == '3':
             try:
-                usdt_balance = usdt_contract.functions.balanceOf(
-                    Web3.to_checksum_address(MAIN_WALLET_ADDRESS)).call() / 1e18
+                usdt_balance = balance_cache.get_or_fetch(MAIN_WALLET_ADDRESS)[1] / 1e18
                 print(f"\n💵 Main Wallet USDT Balance: {usdt_balance:.4f} USDT")
                 amount = float(input("Enter USDT amount to swap: "))
                 if amount <= 0 or amount > usdt_balance:
@@ -1215,8 +5224,12 @@ def main():
             if success:
                 print("✅ Swap completed! Waiting 0.5 seconds before placing bet...")
                 time.sleep(0.5)
-                selected_wallet = wallet_manager.get_wallet_balances(selected_wallet)
-                bet_amount = selected_wallet['balance_bnb'] * 0.95
+                try:
+                    selected_wallet = wallet_manager.get_wallet_balances(selected_wallet)
+                except Exception as e:
+                    print(f"❌ Could not read the wallet balance, bet not placed: {e}")
+                    continue
+                bet_amount = bettable_amount(selected_wallet)
                 betting_success = betting_manager.place_bet(
                     selected_wallet,
                     direction,
@@ -1287,7 +5300,7 @@ def main():
                 selected_wallet = wallet_manager.get_wallet_balances(selected_wallet)
                 print(f"\n💸 EMPTY WALLET PREVIEW:")
                 print(f"👤 Wallet: {selected_wallet['name']}")
-                print(f"💰 Current BNB: {selected_wallet['balance_bnb']:.6f}")
+                print(f"💰 Current BNB: {selected_wallet.balance_bnb:.6f}")
                 print(f"📧 Will send to: {MAIN_WALLET_ADDRESS}")
                 print("⚠️ All BNB will be sent back to your main wallet")
                 confirm = input("\nConfirm emptying wallet? (y/n): ").strip().lower()
@@ -1297,6 +5310,8 @@ def main():
                     print("❌ Operation cancelled")
             except ValueError:
                 print("❌ Invalid input")
+            except Exception as e:
+                print(f"❌ Error reading wallet balance: {e}")
         elif choice == '9':
             confirm = input(
                 "⚠️ This will send ALL BNB from ALL wallets to your main wallet.\nProceed? (y/n): ").strip().lower()
@@ -1311,16 +5326,20 @@ def main():
                 continue
 
             main_address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
-            main_balance_bnb = web3.from_wei(web3.eth.get_balance(main_address), 'ether')
+            main_balance_bnb = web3.from_wei(balance_cache.get_or_fetch(main_address)[0], 'ether')
 
             print(f"\n💰 Current main wallet balance: {main_balance_bnb:.6f} BNB")
             print(f"💸 Will distribute: {main_balance_bnb * Decimal('0.95'):.6f} BNB (95%)")
             print(f"👥 To {len(wallet_manager.wallets)} wallets")
             print(f"🎯 Each wallet gets: {(main_balance_bnb * Decimal('0.95')) / len(wallet_manager.wallets):.6f} BNB")
 
+            use_disperse = False
+            if DISPERSE_CONTRACT:
+                use_disperse = input("📦 Use the disperse contract (a few transactions instead of one per wallet)? (y/n): ").strip().lower() == 'y'
+
             confirm = input("\n💰 Confirm wealth distribution? (y/n): ").strip().lower()
             if confirm == 'y':
-                distribute_wealth(wallet_manager, MAIN_WALLET_ADDRESS)
+                distribute_wealth(wallet_manager, MAIN_WALLET_ADDRESS, disperse=use_disperse)
             else:
                 print("❌ Distribution cancelled")
         elif choice == '11':
@@ -1345,23 +5364,171 @@ def main():
             except ValueError:
                 print("❌ Invalid input")
         elif choice == '12':
-            total_bnb = 0
+            total_wei = 0
+            unreadable = 0
+            main_address = Web3.to_checksum_address(MAIN_WALLET_ADDRESS)
             for wallet in wallet_manager.wallets:
                 # Skip main wallet
-                if Web3.to_checksum_address(wallet['address']) == Web3.to_checksum_address(MAIN_WALLET_ADDRESS):
+                if wallet.address == main_address:
                     continue
-                wallet = wallet_manager.get_wallet_balances(wallet)
-                total_bnb += wallet['balance_bnb']
-            print(f"\n💰 TOTAL BNB BALANCE (All sub-wallets, excluding main wallet): {total_bnb:.6f} BNB")
-        elif choice == '13':
-            print("👋 Goodbye!")
-            break
+                try:
+                    total_wei += wallet_manager.get_wallet_balances(wallet).bnb_wei
+                except Exception as e:
+                    print(f"⚠️ Could not read {wallet.name}: {e}")
+                    unreadable += 1
+            print(f"\n💰 TOTAL BNB BALANCE (All sub-wallets, excluding main wallet): "
+                  f"{web3.from_wei(total_wei, 'ether'):.6f} BNB")
+            if unreadable:
+                print(f"⚠️ Incomplete: {unreadable} wallet(s) could not be read")
         elif choice == '13':
+            try:
+                count = int(input("How many wallets to create?: "))
+            except ValueError:
+                print("❌ Invalid number")
+                continue
+            pattern = input(f"Name pattern (Enter for '{DEFAULT_WALLET_NAME_PATTERN}'): ").strip()
+            wallet_manager.create_wallets_bulk(count, pattern or None)
+        elif choice == '14':
+            wallet_manager.list_wallets()
+            if not wallet_manager.wallets:
+                print("❌ No wallets available.")
+                continue
+            try:
+                wallet_idx = int(input("\nSelect wallet number: ")) - 1
+                if wallet_idx < 0 or wallet_idx >= len(wallet_manager.wallets):
+                    print("❌ Invalid wallet selection")
+                    continue
+                selected_wallet = wallet_manager.wallets[wallet_idx]
+                bet_amount = float(input("Enter BNB amount to bet: "))
+                direction = input("Enter bet direction (up/down): ").strip().lower()
+                if direction not in ['up', 'down']:
+                    print("❌ Direction must be 'up' or 'down'")
+                    continue
+                offset = input(f"Seconds before lock (Enter for {BET_FIRE_OFFSET:g}): ").strip()
+                bet_scheduler.schedule(selected_wallet, direction, bet_amount, offset=float(offset) if offset else None)
+            except ValueError as e:
+                print(f"❌ {e}")
+            except Exception as e:
+                print(f"❌ Error scheduling bet: {e}")
+        elif choice == '15':
+            try:
+                print("\n⏳ Loading bet history and round outcomes...")
+                print(fleet_pnl_text(wallet_manager))
+            except Exception as e:
+                print(f"❌ Error computing P&L: {e}")
+        elif choice == '16':
+            if not wallet_manager.wallets:
+                print("❌ No wallets available to rebalance.")
+                continue
+            answer = input("🎯 Target BNB per wallet, or per-wallet targets like '1=0.5 3=0.2': ").strip()
+            try:
+                if "=" in answer:
+                    targets = []
+                    for pair in answer.split():
+                        number, _, bnb = pair.partition("=")
+                        wallet_idx = int(number) - 1
+                        if not 0 <= wallet_idx < len(wallet_manager.wallets):
+                            raise ValueError(f"no wallet #{number}")
+                        targets.append((wallet_manager.wallets[wallet_idx], Web3.to_wei(Decimal(bnb), 'ether')))
+                else:
+                    targets = Web3.to_wei(Decimal(answer), 'ether')
+            except (ValueError, ArithmeticError) as e:
+                print(f"❌ Invalid targets: {e}")
+                continue
+            use_disperse = False
+            if DISPERSE_CONTRACT:
+                use_disperse = input("📦 Top up through the disperse contract? (y/n): ").strip().lower() == 'y'
+            rebalance_wallets(wallet_manager, MAIN_WALLET_ADDRESS, targets, disperse=use_disperse)
+        elif choice == '17':
+            status = profiler.status()
+            print(f"\n🔬 PROFILING: {status['mode'] or 'no CPU session'}, "
+                  f"allocation tracing {'on' if status['tracing_memory'] else 'off'}")
+            print("1. Start cProfile session (operations, menu actions, Telegram polls, fan-out calls)")
+            print("2. Start sampling session (every thread's stack)")
+            print("3. Stop and dump the CPU profile")
+            print("4. Allocation snapshot (the first one switches tracemalloc on)")
+            print("5. Stop allocation tracing")
+            profile_choice = input("Select option (1-5): ").strip()
+            try:
+                if profile_choice in ('1', '2'):
+                    seconds = input("Stop after how many seconds (Enter to stop by hand): ").strip()
+                    profiler.start("cprofile" if profile_choice == '1' else "sampling",
+                                   float(seconds) if seconds else None)
+                elif profile_choice == '3':
+                    print(profiler.stop()[1])
+                elif profile_choice == '4':
+                    print(profiler.memory_snapshot()[1])
+                elif profile_choice == '5':
+                    profiler.memory_stop()
+                else:
+                    print("❌ Invalid option")
+            except (RuntimeError, ValueError) as e:
+                print(f"❌ {e}")
+        elif choice == '18':
             print("👋 Goodbye!")
             break
         else:
             print("❌ Invalid option")
 
 
-if __name__ == "__main__":
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-Wallet Prediction Bot")
+    subparsers = parser.add_subparsers(dest="command")
+
+    create_parser = subparsers.add_parser("create-wallets", help="Create many wallets at once")
+    create_parser.add_argument("count", type=int, help="Number of wallets to create")
+    create_parser.add_argument("--pattern", default=DEFAULT_WALLET_NAME_PATTERN,
+                               help="Name pattern, placeholders: {n} {i} {time}")
+    create_parser.add_argument("--workers", type=int, default=None,
+                               help="Worker processes for key generation (default: CPU count)")
+
+    encrypt_parser = subparsers.add_parser("encrypt-wallets", help="Move plaintext keys into an encrypted keystore")
+    encrypt_parser.add_argument("--workers", type=int, default=None,
+                                help="Worker processes for scrypt (default: CPU count)")
+
+    subparsers.add_parser("deploy-disperse", help="Deploy the disperse (multisend) contract from the main wallet")
+
+    daemon_parser = subparsers.add_parser("daemon", help="Run headless, taking commands on a Unix socket (see mwpb_ctl.py)")
+    daemon_parser.add_argument("--socket", default=DAEMON_SOCKET, help=f"Socket path (default: {DAEMON_SOCKET})")
+    daemon_parser.add_argument("--no-telegram", action="store_true", help="Don't poll Telegram for /bet commands")
+    daemon_parser.add_argument("--auto-claim", action="store_true", default=AUTO_CLAIM,
+                               help="Claim winnings and refunds in the background as rounds end (AUTO_CLAIM=1)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "create-wallets":
+        wallet_manager = WalletManager()
+        if wallet_manager.is_encrypted() and not wallet_manager.unlock(workers=args.workers):
+            return 1
+        created = wallet_manager.create_wallets_bulk(args.count, args.pattern, args.workers)
+        return 0 if created else 1
+
+    if args.command == "encrypt-wallets":
+        wallet_manager = WalletManager()
+        if wallet_manager.is_encrypted() and not wallet_manager.unlock(workers=args.workers):
+            return 1
+        password = _keystore_password or os.getenv("WALLET_KEYSTORE_PASSWORD")
+        if not password:
+            password = getpass.getpass("🔐 New keystore password: ")
+            if password != getpass.getpass("🔐 Repeat password: "):
+                print("❌ Passwords do not match")
+                return 1
+        return 0 if wallet_manager.encrypt_wallets(password, args.workers) else 1
+
+    if args.command == "deploy-disperse":
+        try:
+            deploy_disperse_contract()
+        except Exception as e:
+            print(f"❌ Error deploying disperse contract: {e}")
+            return 1
+        return 0
+
+    if args.command == "daemon":
+        return run_daemon(args.socket, telegram=not args.no_telegram, auto_claim=args.auto_claim)
+
     main()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run_cli())
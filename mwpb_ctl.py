@@ -0,0 +1,115 @@
+"""Thin client for the bot daemon (python manager_Version4.py daemon)
+
+    python mwpb_ctl.py balance            # main wallet
+    python mwpb_ctl.py balance 3          # wallet #3, or 'all'
+    python mwpb_ctl.py bet 1 50 up
+    python mwpb_ctl.py claim [WALLET]     # one wallet, or all of them
+    python mwpb_ctl.py schedule 2 0.5 down --offset 3
+    python mwpb_ctl.py distribute --disperse
+    python mwpb_ctl.py fund 1=0.5 2=0.25      # per-wallet BNB through the disperse contract
+    python mwpb_ctl.py rebalance --target 0.05  # every wallet to 0.05 BNB, or: rebalance 1=0.5 2=0.25
+    python mwpb_ctl.py pnl                    # fleet P&L, win rate and pending claims (needs NumPy in the daemon)
+    python mwpb_ctl.py profile start --mode sampling --seconds 60   # or: profile stop | memory | memory_stop
+    python mwpb_ctl.py drain | distribute | status | ping | shutdown
+
+Only uses the standard library so it starts instantly - all web3 work happens in the daemon.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+
+DAEMON_SOCKET = os.getenv("MWPB_SOCKET", os.path.join(os.path.dirname(os.path.abspath(__file__)), "mwpb.sock"))
+
+
+def send_command(request, socket_path=DAEMON_SOCKET, timeout=None):
+    """Send one JSON command to the daemon and return its decoded response"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError("Daemon closed the connection without answering")
+    return json.loads(line)
+
+
+def wallet_arg(value):
+    return value if value == "all" else int(value)
+
+
+def fund_arg(value):
+    wallet, _, bnb = value.partition("=")
+    try:
+        return int(wallet), float(bnb)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WALLET=BNB, got {value!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Control a running bot daemon")
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help=f"Daemon socket (default: {DAEMON_SOCKET})")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds to wait for an answer")
+    subparsers = parser.add_subparsers(dest="cmd", required=True)
+
+    subparsers.add_parser("ping")
+    subparsers.add_parser("status")
+    balance_parser = subparsers.add_parser("balance", help="Main wallet, a wallet number, or 'all'")
+    balance_parser.add_argument("wallet", nargs="?", type=wallet_arg)
+    bet_parser = subparsers.add_parser("bet", help="Swap USDT to a wallet and bet with it")
+    bet_parser.add_argument("wallet", type=int)
+    bet_parser.add_argument("usdt", type=float)
+    bet_parser.add_argument("direction", choices=["up", "down"])
+    claim_parser = subparsers.add_parser("claim", help="Claim rewards of one wallet or all wallets")
+    claim_parser.add_argument("wallet", nargs="?", type=int)
+    subparsers.add_parser("drain", help="Send all BNB from every wallet to the main wallet")
+    distribute_parser = subparsers.add_parser("distribute", help="Send 95%% of the main wallet equally to all wallets")
+    distribute_parser.add_argument("--disperse", action="store_true", default=None,
+                                   help="One transaction per batch through the disperse contract")
+    fund_parser = subparsers.add_parser("fund", help="Per-wallet amounts through the disperse contract")
+    fund_parser.add_argument("amounts", nargs="+", type=fund_arg, metavar="WALLET=BNB")
+    rebalance_parser = subparsers.add_parser("rebalance", help="Move wallets to target balances with the fewest transfers")
+    rebalance_parser.add_argument("targets", nargs="*", type=fund_arg, metavar="WALLET=BNB")
+    rebalance_parser.add_argument("--target", type=float, help="BNB every wallet should hold")
+    rebalance_parser.add_argument("--disperse", action="store_true", default=None,
+                                  help="Top up through the disperse contract")
+    schedule_parser = subparsers.add_parser("schedule", help="Pre-sign a bet and fire it just before lock")
+    schedule_parser.add_argument("wallet", type=int)
+    schedule_parser.add_argument("bnb", type=float)
+    schedule_parser.add_argument("direction", choices=["up", "down"])
+    schedule_parser.add_argument("--epoch", type=int, help="Round to bet on (default: current)")
+    schedule_parser.add_argument("--offset", type=float, help="Seconds before lockTimestamp (default: BET_FIRE_OFFSET)")
+    subparsers.add_parser("scheduled", help="Pending and recently fired scheduled bets")
+    subparsers.add_parser("pnl", help="Fleet P&L per wallet and direction, win rate, pending claims")
+    profile_parser = subparsers.add_parser("profile", help="CPU profile or allocation snapshot of the running daemon")
+    profile_parser.add_argument("action", nargs="?", default="status",
+                                choices=["start", "stop", "memory", "memory_stop", "status"])
+    profile_parser.add_argument("--mode", choices=["cprofile", "sampling"], help="Session type for start (default: cprofile)")
+    profile_parser.add_argument("--seconds", type=float, help="Stop and dump by itself after this long")
+    subparsers.add_parser("shutdown")
+
+    args = vars(parser.parse_args(argv))
+    socket_path = args.pop("socket")
+    timeout = args.pop("timeout")
+    request = {key: value for key, value in args.items() if value is not None}
+    for key in ("amounts", "targets"):
+        if key in request:
+            request[key] = {str(wallet): bnb for wallet, bnb in request[key]}
+
+    try:
+        response = send_command(request, socket_path, timeout)
+    except (OSError, ConnectionError) as e:
+        print(f"❌ Cannot reach daemon at {socket_path}: {e}", file=sys.stderr)
+        return 2
+
+    if not response.get("ok"):
+        print(f"❌ {response.get('error')}", file=sys.stderr)
+        return 1
+    print(json.dumps(response.get("result"), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())